@@ -5,13 +5,67 @@ AI任务拆解API接口
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from services.ai_service import AIService
-from models.user import User
+from services.ai_service import get_ai_service
+from services.catalog import catalog, PRIVATE_CACHE_CONTROL
+from services.rate_limiter import rate_limit
+from services.user_cache import user_cache, premium_from_claims
 
 ai_bp = Blueprint('ai', __name__)
 
+# 基础模板
+BASIC_TEMPLATES = [
+    {
+        'id': 1,
+        'title': '学习新技能',
+        'description': '系统性学习一项新技能的通用模板',
+        'example': '学习Python编程',
+        'category': 'learning',
+        'is_premium': False
+    },
+    {
+        'id': 2,
+        'title': '日常生活任务',
+        'description': '处理日常生活事务的模板',
+        'example': '整理房间',
+        'category': 'daily',
+        'is_premium': False
+    },
+    {
+        'id': 3,
+        'title': '工作项目',
+        'description': '完成工作项目的结构化模板',
+        'example': '准备项目汇报',
+        'category': 'work',
+        'is_premium': False
+    }
+]
+
+# 付费用户专享模板
+PREMIUM_TEMPLATES = [
+    {
+        'id': 4,
+        'title': '深度学习计划',
+        'description': '高级学习计划模板，包含复习和测试环节',
+        'example': '掌握机器学习算法',
+        'category': 'learning',
+        'is_premium': True
+    },
+    {
+        'id': 5,
+        'title': '创业项目规划',
+        'description': '创业项目的完整规划模板',
+        'example': '开发移动应用',
+        'category': 'business',
+        'is_premium': True
+    }
+]
+
+catalog.register('ai_templates', lambda: {'templates': BASIC_TEMPLATES})
+catalog.register('ai_templates_premium', lambda: {'templates': BASIC_TEMPLATES + PREMIUM_TEMPLATES})
+
 @ai_bp.route('/decompose', methods=['POST'])
 @jwt_required()
+@rate_limit('ai')
 def decompose_task():
     """AI任务拆解接口"""
     try:
@@ -25,8 +79,8 @@ def decompose_task():
         if not task_description:
             return jsonify({'error': '任务描述不能为空'}), 400
         
-        # 获取用户信息（用于个性化拆解）
-        user = User.query.get(current_user_id)
+        # 获取用户快照（用于个性化拆解）
+        user = user_cache.get(current_user_id)
         if not user:
             return jsonify({'error': '用户不存在'}), 404
         
@@ -34,7 +88,7 @@ def decompose_task():
         is_premium = user.is_premium_active()
         
         # 使用AI服务进行任务拆解
-        ai_service = AIService()
+        ai_service = get_ai_service()
         steps = ai_service.decompose_task(
             task_description, 
             context=data.get('context', ''),
@@ -59,6 +113,7 @@ def decompose_task():
 
 @ai_bp.route('/suggest', methods=['POST'])
 @jwt_required()
+@rate_limit('ai')
 def suggest_improvements():
     """AI建议任务改进"""
     try:
@@ -86,64 +141,13 @@ def suggest_improvements():
 @ai_bp.route('/templates', methods=['GET'])
 @jwt_required()
 def get_task_templates():
-    """获取任务模板"""
+    """获取任务模板（基础版与付费版各预编码一份，按用户权限选择）"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        
-        # 基础模板
-        templates = [
-            {
-                'id': 1,
-                'title': '学习新技能',
-                'description': '系统性学习一项新技能的通用模板',
-                'example': '学习Python编程',
-                'category': 'learning',
-                'is_premium': False
-            },
-            {
-                'id': 2,
-                'title': '日常生活任务',
-                'description': '处理日常生活事务的模板',
-                'example': '整理房间',
-                'category': 'daily',
-                'is_premium': False
-            },
-            {
-                'id': 3,
-                'title': '工作项目',
-                'description': '完成工作项目的结构化模板',
-                'example': '准备项目汇报',
-                'category': 'work',
-                'is_premium': False
-            }
-        ]
-        
-        # 付费用户专享模板
-        if user and user.is_premium_active():
-            premium_templates = [
-                {
-                    'id': 4,
-                    'title': '深度学习计划',
-                    'description': '高级学习计划模板，包含复习和测试环节',
-                    'example': '掌握机器学习算法',
-                    'category': 'learning',
-                    'is_premium': True
-                },
-                {
-                    'id': 5,
-                    'title': '创业项目规划',
-                    'description': '创业项目的完整规划模板',
-                    'example': '开发移动应用',
-                    'category': 'business',
-                    'is_premium': True
-                }
-            ]
-            templates.extend(premium_templates)
         
-        return jsonify({
-            'templates': templates
-        }), 200
+        # 会员状态取自令牌声明，无需查询用户
+        name = 'ai_templates_premium' if premium_from_claims(current_user_id) else 'ai_templates'
+        return catalog.respond(name, cache_control=PRIVATE_CACHE_CONTROL)
         
     except Exception as e:
         return jsonify({'error': f'获取模板失败: {str(e)}'}), 500
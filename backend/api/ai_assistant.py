@@ -6,6 +6,7 @@ import json
 import os
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.rate_limiter import rate_limit
 
 # 创建蓝图
 ai_bp = Blueprint('ai', __name__)
@@ -52,6 +53,7 @@ def create_task_breakdown_prompt(user_task):
 
 @ai_bp.route('/breakdown-task', methods=['POST'])
 @jwt_required()
+@rate_limit('ai')
 def breakdown_task():
     """AI任务拆分接口"""
     try:
@@ -162,6 +164,7 @@ def breakdown_task():
         }), 500
 
 @ai_bp.route('/test-connection', methods=['GET'])
+@rate_limit('ai_anonymous')
 def test_ai_connection():
     """测试AI连接状态"""
     try:
@@ -192,6 +195,7 @@ def test_ai_connection():
         }), 500
 
 @ai_bp.route('/test-breakdown', methods=['POST'])
+@rate_limit('ai_anonymous')
 def test_task_breakdown():
     """测试AI任务拆分功能（不需要JWT认证）"""
     try:
@@ -7,6 +7,7 @@ import json
 import os
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+from services.rate_limiter import rate_limit
 
 # 创建蓝图
 ai_simple_bp = Blueprint('ai_simple', __name__)
@@ -105,6 +106,7 @@ def create_task_breakdown_prompt(user_task):
 请严格按照JSON格式返回，不要包含其他文字。"""
 
 @ai_simple_bp.route('/breakdown', methods=['POST'])
+@rate_limit('ai_anonymous')
 def simple_breakdown_task():
     """简单的AI任务拆分接口 - 无需认证"""
     try:
@@ -222,6 +224,7 @@ def simple_breakdown_task():
         }), 500
 
 @ai_simple_bp.route('/chat', methods=['POST'])
+@rate_limit('ai_anonymous')
 def simple_chat():
     """简单的AI聊天接口"""
     try:
@@ -296,6 +299,7 @@ def simple_chat():
         })
 
 @ai_simple_bp.route('/test', methods=['GET'])
+@rate_limit('ai_anonymous')
 def test_connection():
     """测试AI连接状态"""
     try:
@@ -6,13 +6,35 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from werkzeug.exceptions import BadRequest
+from sqlalchemy.exc import IntegrityError
 from models.user import User, db
 from services.auth_service import AuthService
+from services.preferences_service import preferences_service
+from services.bootstrap_service import bootstrap_service
+from services.password_hasher import HasherBusy
+from services.rate_limiter import rate_limit, client_ip, get_rate_limiter, too_many_requests
+from services.user_cache import user_cache, user_claims
 import re
 
 auth_bp = Blueprint('auth', __name__)
 
+def duplicate_user_error(e):
+    """把唯一索引冲突映射为对应的提示（SQLite与PostgreSQL错误信息的首行包含列名或索引名，不含用户输入）"""
+    message = str(e.orig).splitlines()[0].lower()
+    if 'email' in message:
+        return jsonify({'error': '邮箱已被注册'}), 409
+    if 'username' in message:
+        return jsonify({'error': '用户名已存在'}), 409
+    return None
+
+def busy_response(e):
+    """密码哈希进程池排队已满时快速拒绝"""
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit('register', identity=lambda: f'ip:{client_ip()}')
 def register():
     """用户注册"""
     try:
@@ -40,36 +62,42 @@ def register():
         if len(password) < 6:
             return jsonify({'error': '密码长度不能少于6个字符'}), 400
         
-        # 检查用户是否已存在
-        if User.query.filter_by(username=username).first():
-            return jsonify({'error': '用户名已存在'}), 409
-        
-        if User.query.filter_by(email=email).first():
-            return jsonify({'error': '邮箱已被注册'}), 409
-        
-        # 创建新用户
+        # 创建新用户：不预先查询，由用户名、邮箱的唯一索引保证并发注册的正确性
         user = User(username=username, email=email, password=password)
         user.nickname = data.get('nickname', username)
         
         db.session.add(user)
-        db.session.commit()
+        db.session.flush()
         
-        # 生成JWT token
-        access_token = create_access_token(identity=user.id)
+        # 提交前序列化，避免提交后属性过期再查询一次
+        user_data = user.to_dict()
+        access_token = create_access_token(identity=user.id, additional_claims=user_claims(user))
         refresh_token = create_refresh_token(identity=user.id)
         
+        db.session.commit()
+        
         return jsonify({
             'message': '注册成功',
-            'user': user.to_dict(),
+            'user': user_data,
             'access_token': access_token,
             'refresh_token': refresh_token
         }), 201
         
+    except IntegrityError as e:
+        db.session.rollback()
+        duplicate = duplicate_user_error(e)
+        if duplicate:
+            return duplicate
+        return jsonify({'error': f'注册失败: {str(e)}'}), 500
+    except HasherBusy as e:
+        db.session.rollback()
+        return busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'注册失败: {str(e)}'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit('login', identity=lambda: f'ip:{client_ip()}')
 def login():
     """用户登录"""
     try:
@@ -81,22 +109,38 @@ def login():
         login_field = data['login'].strip()
         password = data['password']
         
+        # 同一账户在同一IP下的密码错误次数单独限制：校验密码（CPU密集）前只查看不消耗，
+        # 只有密码错误才计数，他人无法靠故意输错把账户锁住
+        account_key = f'login:{login_field.lower()}:ip:{client_ip()}'
+        limited = get_rate_limiter().peek('login_account', account_key)
+        if not limited.allowed:
+            return too_many_requests(limited)
+        
         # 支持用户名或邮箱登录
         user = User.query.filter(
             (User.username == login_field) | (User.email == login_field.lower())
         ).first()
         
         if not user or not user.check_password(password):
+            get_rate_limiter().check('login_account', account_key)
             return jsonify({'error': '用户名/邮箱或密码错误'}), 401
         
         if not user.is_active:
             return jsonify({'error': '账户已被禁用'}), 403
         
-        # 更新最后登录时间
+        # 哈希参数已过时则用本次明文重新哈希
+        if user.needs_rehash():
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except HasherBusy:
+                pass  # 繁忙时跳过，下次登录再升级
+        
+        # 更新最后登录时间（批量异步写入，不占用登录请求）
         user.update_last_login()
         
         # 生成JWT token
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=user.id, additional_claims=user_claims(user))
         refresh_token = create_refresh_token(identity=user.id)
         
         return jsonify({
@@ -106,6 +150,8 @@ def login():
             'refresh_token': refresh_token
         }), 200
         
+    except HasherBusy as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({'error': f'登录失败: {str(e)}'}), 500
 
@@ -115,12 +161,12 @@ def refresh():
     """刷新访问令牌"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = user_cache.get(current_user_id)
         
         if not user or not user.is_active:
             return jsonify({'error': '用户不存在或已被禁用'}), 404
         
-        new_access_token = create_access_token(identity=current_user_id)
+        new_access_token = create_access_token(identity=current_user_id, additional_claims=user_claims(user))
         
         return jsonify({
             'access_token': new_access_token
@@ -132,16 +178,16 @@ def refresh():
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
-    """获取用户资料"""
+    """获取用户资料（与启动数据共用资料分区缓存，用户行变更提交后自动失效）"""
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        profile = bootstrap_service.build(current_user_id, ['profile'])['sections']['profile']
         
-        if not user:
+        if not profile:
             return jsonify({'error': '用户不存在'}), 404
         
         return jsonify({
-            'user': user.to_dict(include_sensitive=True)
+            'user': profile
         }), 200
         
     except Exception as e:
@@ -175,6 +221,8 @@ def update_profile():
                 return jsonify({'error': '主题偏好只能是business或cute'}), 400
         
         db.session.commit()
+        preferences_service.invalidate(current_user_id)
+        bootstrap_service.invalidate(current_user_id, 'profile', 'daily_quote')
         
         return jsonify({
             'message': '资料更新成功',
@@ -185,6 +233,22 @@ def update_profile():
         db.session.rollback()
         return jsonify({'error': f'更新资料失败: {str(e)}'}), 500
 
+@auth_bp.route('/preferences', methods=['GET'])
+@jwt_required()
+def get_preferences():
+    """获取用户偏好聚合（主题、番茄钟设置、通知开关、语言）"""
+    try:
+        current_user_id = get_jwt_identity()
+        preferences = preferences_service.get(current_user_id)
+        
+        if not preferences:
+            return jsonify({'error': '用户不存在'}), 404
+        
+        return jsonify({'preferences': preferences}), 200
+        
+    except Exception as e:
+        return jsonify({'error': f'获取用户偏好失败: {str(e)}'}), 500
+
 @auth_bp.route('/change-password', methods=['PUT'])
 @jwt_required()
 def change_password():
@@ -217,6 +281,9 @@ def change_password():
         
         return jsonify({'message': '密码修改成功'}), 200
         
+    except HasherBusy as e:
+        db.session.rollback()
+        return busy_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'修改密码失败: {str(e)}'}), 500
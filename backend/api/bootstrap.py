@@ -0,0 +1,45 @@
+"""
+应用启动数据API接口
+一次请求返回首页所需的全部数据
+"""
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.bootstrap_service import bootstrap_service, fingerprint, SECTIONS
+
+bootstrap_bp = Blueprint('bootstrap', __name__)
+
+@bootstrap_bp.route('', methods=['GET'])
+@jwt_required()
+def get_bootstrap():
+    """
+    获取应用启动数据
+    
+    可选参数 sections=profile,task_stats 只返回指定分区；
+    响应中的 versions 为各分区内容指纹，整体 ETag 命中时返回304。
+    """
+    try:
+        current_user_id = get_jwt_identity()
+        
+        sections = None
+        if request.args.get('sections'):
+            sections = [s.strip() for s in request.args['sections'].split(',') if s.strip()]
+            invalid = [s for s in sections if s not in SECTIONS]
+            if invalid:
+                return jsonify({'error': f'无效的分区: {", ".join(invalid)}'}), 400
+        
+        data = bootstrap_service.build(current_user_id, sections)
+        if data['sections'].get('profile', True) is None:
+            return jsonify({'error': '用户不存在'}), 404
+        
+        response = jsonify({
+            'success': True,
+            'data': data['sections'],
+            'versions': data['versions']
+        })
+        response.set_etag(fingerprint(data['versions']))
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({'error': f'获取启动数据失败: {str(e)}'}), 500
@@ -0,0 +1,34 @@
+"""
+用户仪表盘API接口
+返回由写路径同步维护的汇总行，一次按用户ID的读取
+"""
+
+from datetime import date
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db
+from models.dashboard import UserDashboard
+
+dashboard_bp = Blueprint('dashboard', __name__)
+
+@dashboard_bp.route('', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    """获取用户仪表盘（完成率、近7天完成、专注时长、拖延次数、连续天数）"""
+    try:
+        current_user_id = get_jwt_identity()
+
+        dashboard = UserDashboard.query.filter_by(user_id=current_user_id).first()
+        if not dashboard:
+            # 首次访问时根据历史数据回填
+            dashboard = UserDashboard.get_or_create(current_user_id)
+            db.session.commit()
+
+        return jsonify({
+            'success': True,
+            'data': dashboard.to_dict(today=date.today())
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'获取仪表盘失败: {str(e)}'}), 500
@@ -0,0 +1,58 @@
+"""
+数据导出API接口
+流式导出用户的任务、拖延日记和番茄钟历史记录
+"""
+
+from datetime import datetime
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from services.export_service import export_service, ExportService, SUPPORTED_FORMATS
+
+export_bp = Blueprint('export', __name__)
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+@export_bp.route('', methods=['GET'])
+@export_bp.route('/', methods=['GET'])
+@jwt_required()
+def export_history():
+    """
+    导出历史数据
+
+    查询参数:
+        types: 逗号分隔的数据类型（tasks,diary,pomodoro），默认全部
+        format: jsonl（默认）或 csv
+        gzip: 1 时对响应做gzip压缩
+    """
+    try:
+        current_user_id = get_jwt_identity()
+
+        fmt = request.args.get('format', 'jsonl').lower()
+        if fmt not in SUPPORTED_FORMATS:
+            return jsonify({'error': f'不支持的导出格式: {fmt}'}), 400
+
+        try:
+            types = ExportService.parse_types(request.args.get('types', ''))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        use_gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+        filename = f"export_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{fmt}"
+        headers = {'X-Accel-Buffering': 'no'}  # 关闭反向代理缓冲，保证逐块下发
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+        headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+        body = export_service.generate(current_user_id, types, fmt, use_gzip)
+        return Response(
+            stream_with_context(body),
+            content_type=CONTENT_TYPES[fmt],
+            headers=headers
+        )
+
+    except Exception as e:
+        return jsonify({'error': f'导出数据失败: {str(e)}'}), 500
@@ -5,8 +5,14 @@
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.user import User
-from models.pomodoro import PomodoroSession, PomodoroSettings, db
+from models.pomodoro import PomodoroSession, PomodoroSettings, PomodoroStats, db
+from models.streak import ActivityStreak
+from models.focus_heatmap import FocusHeatmap
+from services.pomodoro_state import active_sessions, record_completed_session
+from services.session_sweeper import session_sweeper
+from services.preferences_service import preferences_service
+from services.bootstrap_service import bootstrap_service
+from services.user_cache import user_cache
 from datetime import datetime, timedelta
 import json
 
@@ -15,29 +21,17 @@ pomodoro_bp = Blueprint('pomodoro', __name__)
 @pomodoro_bp.route('/settings', methods=['GET'])
 @jwt_required()
 def get_pomodoro_settings():
-    """获取用户番茄钟设置"""
+    """获取用户番茄钟设置（无记录时返回默认设置，不写库）"""
     try:
         current_user_id = get_jwt_identity()
         
-        settings = PomodoroSettings.query.filter_by(
-            user_id=current_user_id
-        ).first()
-        
-        if not settings:
-            # 创建默认设置
-            settings = PomodoroSettings(
-                user_id=current_user_id,
-                work_duration=25,  # 25分钟工作时间
-                short_break_duration=5,  # 5分钟短休息
-                long_break_duration=15,  # 15分钟长休息
-                sessions_until_long_break=4  # 4个番茄钟后长休息
-            )
-            db.session.add(settings)
-            db.session.commit()
+        preferences = preferences_service.get(current_user_id)
+        if not preferences:
+            return jsonify({'error': '用户不存在'}), 404
         
         return jsonify({
             'success': True,
-            'data': settings.to_dict()
+            'data': preferences['pomodoro']
         })
         
     except Exception as e:
@@ -95,6 +89,8 @@ def update_pomodoro_settings():
         settings.updated_at = datetime.utcnow()
         db.session.commit()
         
+        preferences_service.invalidate(current_user_id)
+        
         return jsonify({
             'success': True,
             'data': settings.to_dict(),
@@ -102,6 +98,7 @@ def update_pomodoro_settings():
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'更新番茄钟设置失败: {str(e)}'}), 500
 
 @pomodoro_bp.route('/start', methods=['POST'])
@@ -116,46 +113,43 @@ def start_pomodoro_session():
         if session_type not in ['work', 'short_break', 'long_break']:
             return jsonify({'error': '无效的会话类型'}), 400
         
-        # 获取用户设置
-        settings = PomodoroSettings.query.filter_by(
-            user_id=current_user_id
-        ).first()
+        # 获取用户设置（优先读缓存，无记录时为默认设置）
+        preferences = preferences_service.get(current_user_id)
         
-        if not settings:
-            return jsonify({'error': '请先配置番茄钟设置'}), 400
+        if not preferences:
+            return jsonify({'error': '用户不存在'}), 404
+        
+        settings = preferences['pomodoro']
         
         # 确定会话时长
         duration_map = {
-            'work': settings.work_duration,
-            'short_break': settings.short_break_duration,
-            'long_break': settings.long_break_duration
+            'work': settings['work_duration'],
+            'short_break': settings['short_break_duration'],
+            'long_break': settings['long_break_duration']
         }
         duration = duration_map[session_type]
         
         # 创建新会话
-        session = PomodoroSession(
-            user_id=current_user_id,
-            session_type=session_type,
-            planned_duration=duration,
-            start_time=datetime.utcnow()
-        )
-        
-        db.session.add(session)
+        session_data = active_sessions.start(current_user_id, session_type, duration)
         db.session.commit()
+        active_sessions.set_active(current_user_id, session_data)
+        session_sweeper.track(session_data)
         
+        start_time = datetime.fromisoformat(session_data['start_time'])
         return jsonify({
             'success': True,
             'data': {
-                'session_id': session.id,
-                'type': session.session_type,
-                'duration': session.planned_duration,
-                'start_time': session.start_time.isoformat(),
-                'end_time': (session.start_time + timedelta(minutes=duration)).isoformat()
+                'session_id': session_data['id'],
+                'type': session_data['session_type'],
+                'duration': session_data['planned_duration'],
+                'start_time': session_data['start_time'],
+                'end_time': (start_time + timedelta(minutes=duration)).isoformat()
             },
             'message': f'番茄钟会话已开始 ({duration}分钟)'
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'开始番茄钟会话失败: {str(e)}'}), 500
 
 @pomodoro_bp.route('/complete/<int:session_id>', methods=['POST'])
@@ -165,31 +159,50 @@ def complete_pomodoro_session(session_id):
     try:
         current_user_id = get_jwt_identity()
         
-        session = PomodoroSession.query.filter_by(
-            id=session_id,
-            user_id=current_user_id
-        ).first()
-        
-        if not session:
-            return jsonify({'error': '会话不存在'}), 404
-        
-        if session.is_completed:
-            return jsonify({'error': '会话已完成'}), 400
-        
-        # 标记会话完成
-        session.end_time = datetime.utcnow()
-        session.is_completed = True
-        session.actual_duration = int((session.end_time - session.start_time).total_seconds() / 60)
+        # 快速路径：缓存命中时一条UPDATE完成状态切换
+        session_data = active_sessions.complete(current_user_id, session_id)
+        
+        if session_data is None:
+            session = PomodoroSession.query.filter_by(
+                id=session_id,
+                user_id=current_user_id
+            ).first()
+            
+            if not session:
+                return jsonify({'error': '会话不存在'}), 404
+            
+            if session.is_completed:
+                return jsonify({'error': '会话已完成'}), 400
+            
+            if session.is_expired:
+                return jsonify({'error': '会话已过期'}), 400
+            
+            # 标记会话完成
+            session.end_time = datetime.utcnow()
+            session.is_completed = True
+            session.actual_duration = int((session.end_time - session.start_time).total_seconds() / 60)
+            session_data = session.to_dict()
+        
+        record_completed_session(
+            current_user_id,
+            session_data['session_type'],
+            datetime.fromisoformat(session_data['start_time']),
+            session_data['actual_duration'] or session_data['planned_duration']
+        )
         
         db.session.commit()
+        active_sessions.set_active(current_user_id, None)
+        bootstrap_service.invalidate(current_user_id, 'pomodoro_stats')
         
         return jsonify({
             'success': True,
-            'data': session.to_dict(),
+            'data': session_data,
             'message': '番茄钟会话已完成'
         })
         
     except Exception as e:
+        db.session.rollback()
+        active_sessions.invalidate(get_jwt_identity())
         return jsonify({'error': f'完成番茄钟会话失败: {str(e)}'}), 500
 
 @pomodoro_bp.route('/pause/<int:session_id>', methods=['POST'])
@@ -199,29 +212,38 @@ def pause_pomodoro_session(session_id):
     try:
         current_user_id = get_jwt_identity()
         
-        session = PomodoroSession.query.filter_by(
-            id=session_id,
-            user_id=current_user_id
-        ).first()
-        
-        if not session:
-            return jsonify({'error': '会话不存在'}), 404
-        
-        if session.is_completed:
-            return jsonify({'error': '已完成的会话无法暂停'}), 400
-        
-        session.is_paused = True
-        session.pause_time = datetime.utcnow()
+        # 快速路径：缓存命中时一条UPDATE完成状态切换
+        session_data = active_sessions.pause(current_user_id, session_id)
+        
+        if session_data is None:
+            session = PomodoroSession.query.filter_by(
+                id=session_id,
+                user_id=current_user_id
+            ).first()
+            
+            if not session:
+                return jsonify({'error': '会话不存在'}), 404
+            
+            if session.is_completed:
+                return jsonify({'error': '已完成的会话无法暂停'}), 400
+            
+            session.is_paused = True
+            session.pause_time = datetime.utcnow()
+            session_data = session.to_dict()
         
         db.session.commit()
+        active_sessions.set_active(current_user_id, session_data)
+        session_sweeper.track(session_data)
         
         return jsonify({
             'success': True,
-            'data': session.to_dict(),
+            'data': session_data,
             'message': '番茄钟会话已暂停'
         })
         
     except Exception as e:
+        db.session.rollback()
+        active_sessions.invalidate(get_jwt_identity())
         return jsonify({'error': f'暂停番茄钟会话失败: {str(e)}'}), 500
 
 @pomodoro_bp.route('/resume/<int:session_id>', methods=['POST'])
@@ -231,36 +253,71 @@ def resume_pomodoro_session(session_id):
     try:
         current_user_id = get_jwt_identity()
         
-        session = PomodoroSession.query.filter_by(
-            id=session_id,
-            user_id=current_user_id
-        ).first()
-        
-        if not session:
-            return jsonify({'error': '会话不存在'}), 404
-        
-        if not session.is_paused:
-            return jsonify({'error': '会话未暂停'}), 400
-        
-        # 计算暂停时长并调整开始时间
-        if session.pause_time:
-            pause_duration = datetime.utcnow() - session.pause_time
-            session.start_time += pause_duration
-        
-        session.is_paused = False
-        session.pause_time = None
+        # 快速路径：缓存命中时一条UPDATE完成状态切换
+        session_data = active_sessions.resume(current_user_id, session_id)
+        
+        if session_data is None:
+            session = PomodoroSession.query.filter_by(
+                id=session_id,
+                user_id=current_user_id
+            ).first()
+            
+            if not session:
+                return jsonify({'error': '会话不存在'}), 404
+            
+            if not session.is_paused:
+                return jsonify({'error': '会话未暂停'}), 400
+            
+            if session.is_expired:
+                return jsonify({'error': '会话已过期'}), 400
+            
+            # 计算暂停时长并调整开始时间
+            if session.pause_time:
+                pause_duration = datetime.utcnow() - session.pause_time
+                session.start_time += pause_duration
+            
+            session.is_paused = False
+            session.pause_time = None
+            session_data = session.to_dict()
         
         db.session.commit()
+        active_sessions.set_active(current_user_id, session_data)
+        session_sweeper.track(session_data)
         
         return jsonify({
             'success': True,
-            'data': session.to_dict(),
+            'data': session_data,
             'message': '番茄钟会话已恢复'
         })
         
     except Exception as e:
+        db.session.rollback()
+        active_sessions.invalidate(get_jwt_identity())
         return jsonify({'error': f'恢复番茄钟会话失败: {str(e)}'}), 500
 
+@pomodoro_bp.route('/active', methods=['GET'])
+@jwt_required()
+def get_active_pomodoro_session():
+    """获取当前进行中的番茄钟会话（由活跃会话注册表提供）"""
+    try:
+        current_user_id = get_jwt_identity()
+        session_data = active_sessions.get_active(current_user_id)
+        
+        if session_data:
+            start_time = datetime.fromisoformat(session_data['start_time'])
+            session_data = dict(
+                session_data,
+                planned_end_time=(start_time + timedelta(minutes=session_data['planned_duration'])).isoformat()
+            )
+        
+        return jsonify({
+            'success': True,
+            'data': session_data
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'获取当前番茄钟会话失败: {str(e)}'}), 500
+
 @pomodoro_bp.route('/stats', methods=['GET'])
 @jwt_required()
 def get_pomodoro_stats():
@@ -271,31 +328,27 @@ def get_pomodoro_stats():
         # 获取查询参数
         period = request.args.get('period', 'today')  # today, week, month, all
         
-        # 构建查询
-        query = PomodoroSession.query.filter_by(
-            user_id=current_user_id,
-            is_completed=True
-        )
-        
-        # 时间过滤
+        # 时间过滤（按每日汇总的日期粒度）
         now = datetime.utcnow()
+        start_date = None
         if period == 'today':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            query = query.filter(PomodoroSession.start_time >= start_date)
+            start_date = now.date()
         elif period == 'week':
-            start_date = now - timedelta(days=7)
-            query = query.filter(PomodoroSession.start_time >= start_date)
+            start_date = (now - timedelta(days=7)).date()
         elif period == 'month':
-            start_date = now - timedelta(days=30)
-            query = query.filter(PomodoroSession.start_time >= start_date)
-        
-        sessions = query.all()
-        
-        # 统计数据
-        total_sessions = len(sessions)
-        work_sessions = len([s for s in sessions if s.session_type == 'work'])
-        break_sessions = len([s for s in sessions if s.session_type in ['short_break', 'long_break']])
-        total_minutes = sum([s.actual_duration or s.planned_duration for s in sessions])
+            start_date = (now - timedelta(days=30)).date()
+        
+        # 从每日汇总表求和，不再逐条加载会话
+        summary = PomodoroStats.summarize(current_user_id, start_date)
+        total_sessions = summary['total_sessions']
+        work_sessions = summary['work_sessions']
+        break_sessions = summary['break_sessions']
+        total_minutes = summary['total_minutes']
+        
+        # 专注日连续天数（只读，记录由完成会话的写路径创建）
+        focus_streak = ActivityStreak.query.filter_by(
+            user_id=current_user_id, kind=ActivityStreak.KIND_FOCUS
+        ).first()
         
         return jsonify({
             'success': True,
@@ -306,9 +359,33 @@ def get_pomodoro_stats():
                 'break_sessions': break_sessions,
                 'total_minutes': total_minutes,
                 'total_hours': round(total_minutes / 60, 1),
-                'average_session_length': round(total_minutes / total_sessions, 1) if total_sessions > 0 else 0
+                'average_session_length': round(total_minutes / total_sessions, 1) if total_sessions > 0 else 0,
+                'focus_streak': focus_streak.to_dict(today=now.date()) if focus_streak
+                                else ActivityStreak.empty_dict(ActivityStreak.KIND_FOCUS)
             }
         })
         
     except Exception as e:
         return jsonify({'error': f'获取番茄钟统计失败: {str(e)}'}), 500
+
+@pomodoro_bp.route('/heatmap', methods=['GET'])
+@jwt_required()
+def get_focus_heatmap():
+    """获取专注热力图（7×24，按用户时区）"""
+    try:
+        current_user_id = get_jwt_identity()
+        
+        user = user_cache.get(current_user_id)
+        tz_name = request.args.get('timezone') or (user.timezone if user else None)
+        
+        heatmap = FocusHeatmap.query.filter_by(user_id=current_user_id).first()
+        if not heatmap:
+            heatmap = FocusHeatmap(user_id=current_user_id)
+        
+        return jsonify({
+            'success': True,
+            'data': heatmap.to_dict(tz_name)
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'获取专注热力图失败: {str(e)}'}), 500
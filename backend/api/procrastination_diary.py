@@ -12,23 +12,30 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.procrastination_diary import ProcrastinationDiary, ProcrastinationStats, ProcrastinationReason
-from models.task import Task
+from models.task import Task, TaskStatus
+from models.dashboard import UserDashboard
+from models.focus_heatmap import FocusHeatmap, WEEKDAY_NAMES
 from models import db
-from services.ai_service import AIService
+from services.ai_service import get_ai_service
+from services.analytics_service import analytics_service
+from services.catalog import catalog
+from services.bootstrap_service import bootstrap_service
+from services.user_cache import user_cache
 import requests
 import json
 
 procrastination_bp = Blueprint('procrastination', __name__)
 
+catalog.register('procrastination_reasons', lambda: {
+    'success': True,
+    'data': ProcrastinationDiary.get_available_reasons()
+})
+
 @procrastination_bp.route('/reasons', methods=['GET'])
 def get_procrastination_reasons():
     """获取所有可用的拖延借口选项"""
     try:
-        reasons = ProcrastinationDiary.get_available_reasons()
-        return jsonify({
-            'success': True,
-            'data': reasons
-        }), 200
+        return catalog.respond('procrastination_reasons')
     except Exception as e:
         return jsonify({
             'success': False,
@@ -98,10 +105,14 @@ def record_procrastination():
         
         stats.update_stats(diary_entry.procrastination_date, reason_type)
         
+        dashboard = UserDashboard.get_or_create(user_id, for_update=True)
+        dashboard.add_procrastination(stats)
+        
         db.session.commit()
+        bootstrap_service.invalidate(user_id, 'procrastination_stats')
         
         # 生成单次拖延分析
-        ai_service = AIService()
+        ai_service = get_ai_service()
         analysis = ai_service.analyze_single_procrastination(
             task_title=data['task_title'],
             reason_type=reason_type.value,
@@ -251,6 +262,21 @@ def get_procrastination_stats():
             'message': f'获取统计数据失败: {str(e)}'
         }), 500
 
+@procrastination_bp.route('/insights', methods=['GET'])
+def get_cohort_insights():
+    """获取群体拖延洞察（由 flask compute-insights 离线计算）"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': analytics_service.get_insights()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取群体洞察失败: {str(e)}'
+        }), 500
+
 @procrastination_bp.route('/ai-analysis', methods=['GET'])
 def get_ai_analysis():
     """获取AI智能分析"""
@@ -314,8 +340,10 @@ def get_ai_analysis():
         records_data = [record.to_dict() for record in recent_records]
         
         # 使用AI服务生成深度分析
-        ai_service = AIService()
-        analysis_result = ai_service.analyze_procrastination_patterns(records_data, task_repetition)
+        ai_service = get_ai_service()
+        analysis_result = ai_service.analyze_procrastination_patterns(
+            records_data, task_repetition, analytics_service.get_prompt_highlights(), get_focus_hint(user_id)
+        )
         
         return jsonify({
             'success': True,
@@ -328,6 +356,20 @@ def get_ai_analysis():
             'message': f'AI分析失败: {str(e)}'
         }), 500
 
+def get_focus_hint(user_id):
+    """根据专注热力图描述用户的专注高峰时段"""
+    try:
+        heatmap = FocusHeatmap.query.filter_by(user_id=user_id).first()
+        if not heatmap or not heatmap.total_minutes:
+            return None
+        
+        user = user_cache.get(user_id)
+        peaks = heatmap.peak_hours(user.timezone if user else None)
+        return '、'.join(f"{WEEKDAY_NAMES[day]}{hour}点" for day, hour, _ in peaks) or None
+    except Exception as e:
+        print(f"读取专注热力图失败: {str(e)}")
+        return None
+
 def generate_mock_analysis(top_reasons):
     """生成模拟的AI分析结果"""
     # 这是临时的模拟分析，后续会替换为真实的AI API调用
@@ -410,8 +452,8 @@ def check_overdue_tasks():
         
         overdue_tasks = Task.query.filter(
             Task.user_id == user_id,
-            Task.completed == False,
-            func.date(Task.created_at) <= yesterday
+            Task.status.in_([TaskStatus.PENDING, TaskStatus.IN_PROGRESS]),
+            Task.created_at < datetime.combine(yesterday + timedelta(days=1), datetime.min.time())
         ).all()
         
         procrastination_records = []
@@ -12,6 +12,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from models.push_token import UserPushToken, PlatformType
 from models import db
 from services.notification_service import notification_service
+from services.preferences_service import preferences_service
 
 push_notifications_bp = Blueprint('push_notifications', __name__)
 
@@ -49,6 +50,7 @@ def register_push_token():
             device_id=data.get('device_id'),
             device_name=data.get('device_name')
         )
+        preferences_service.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -117,6 +119,7 @@ def update_notification_settings():
             evening_reminder=data.get('enable_evening_reminder'),
             procrastination_reminder=data.get('enable_procrastination_reminder')
         )
+        preferences_service.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -160,6 +163,7 @@ def deactivate_push_token():
         
         # 停用token
         push_token.deactivate()
+        preferences_service.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -188,7 +192,7 @@ def test_notification():
             message = '晚间提醒测试'
         elif notification_type == 'procrastination':
             task_title = data.get('task_title', '测试任务')
-            success = notification_service.send_procrastination_reminder(user_id, task_title)
+            success = notification_service.send_procrastination_reminder(user_id, task_title)['success']
             message = '拖延提醒测试'
         else:
             return jsonify({
@@ -198,8 +202,8 @@ def test_notification():
         
         return jsonify({
             'success': success,
-            'message': f'{message}{"成功" if success else "失败"}'
-        }), 200 if success else 500
+            'message': f'{message}{"已加入发送队列" if success else "失败：没有可用的推送设备"}'
+        }), 200 if success else 400
         
     except Exception as e:
         return jsonify({
@@ -8,7 +8,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, date, timedelta
 from models.task import Task, TaskStep, TaskStatus, TaskPriority, db
 from models.user import User
-from services.ai_service import AIService
+from services.ai_service import get_ai_service
+from services.bootstrap_service import bootstrap_service
 
 tasks_bp = Blueprint('tasks', __name__)
 
@@ -116,9 +117,10 @@ def create_task():
         
         db.session.add(task)
         db.session.commit()
+        bootstrap_service.invalidate(current_user_id, 'today_tasks', 'task_stats')
         
         # 使用AI服务生成任务步骤
-        ai_service = AIService()
+        ai_service = get_ai_service()
         steps = ai_service.decompose_task(title, description)
         
         if steps:
@@ -179,6 +181,7 @@ def update_task(task_id):
                 task.due_date = None
         
         db.session.commit()
+        bootstrap_service.invalidate(current_user_id, 'today_tasks', 'task_stats')
         
         return jsonify({
             'message': '任务更新成功',
@@ -202,6 +205,7 @@ def delete_task(task_id):
         
         db.session.delete(task)
         db.session.commit()
+        bootstrap_service.invalidate(current_user_id, 'today_tasks', 'task_stats')
         
         return jsonify({'message': '任务删除成功'}), 200
         
@@ -223,6 +227,7 @@ def complete_step(task_id, step_id):
         success = task.mark_step_completed(step_id)
         if not success:
             return jsonify({'error': '步骤不存在或已完成'}), 400
+        bootstrap_service.invalidate(current_user_id, 'today_tasks', 'task_stats')
         
         return jsonify({
             'message': '步骤标记完成',
@@ -255,6 +260,7 @@ def uncomplete_step(task_id, step_id):
                 task.completed_at = None
             
             db.session.commit()
+            bootstrap_service.invalidate(current_user_id, 'today_tasks', 'task_stats')
         
         return jsonify({
             'message': '取消步骤完成标记',
@@ -272,50 +278,8 @@ def get_task_stats():
     try:
         current_user_id = get_jwt_identity()
         
-        # 总任务数
-        total_tasks = Task.query.filter_by(user_id=current_user_id).count()
-        
-        # 各状态任务数
-        pending_tasks = Task.query.filter_by(
-            user_id=current_user_id, 
-            status=TaskStatus.PENDING
-        ).count()
-        
-        in_progress_tasks = Task.query.filter_by(
-            user_id=current_user_id, 
-            status=TaskStatus.IN_PROGRESS
-        ).count()
-        
-        completed_tasks = Task.query.filter_by(
-            user_id=current_user_id, 
-            status=TaskStatus.COMPLETED
-        ).count()
-        
-        # 今日任务数
-        today = date.today()
-        today_tasks = Task.query.filter(
-            Task.user_id == current_user_id,
-            db.func.date(Task.created_at) == today
-        ).count()
-        
-        # 本周完成任务数
-        week_ago = date.today() - timedelta(days=7)
-        week_completed = Task.query.filter(
-            Task.user_id == current_user_id,
-            Task.status == TaskStatus.COMPLETED,
-            Task.completed_at >= week_ago
-        ).count()
-        
         return jsonify({
-            'stats': {
-                'total_tasks': total_tasks,
-                'pending_tasks': pending_tasks,
-                'in_progress_tasks': in_progress_tasks,
-                'completed_tasks': completed_tasks,
-                'today_tasks': today_tasks,
-                'week_completed': week_completed,
-                'completion_rate': round(completed_tasks / total_tasks * 100, 1) if total_tasks > 0 else 0
-            }
+            'stats': Task.get_stats(current_user_id)
         }), 200
         
     except Exception as e:
@@ -7,74 +7,118 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.user import User
 from models.theme import UserTheme, ThemeColor, db
+from services.catalog import catalog
+from services.preferences_service import preferences_service
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
 from datetime import datetime
 
 themes_bp = Blueprint('themes', __name__)
 
+# 内置颜色方案（theme_colors 表为空时使用）
+DEFAULT_THEME_COLORS = [
+    {
+        'id': 'pink',
+        'name': '粉色',
+        'primary': '#FF6B9D',
+        'secondary': '#FFB3D1',
+        'accent': '#FF8FA3',
+        'background': '#FFF5F8',
+        'surface': '#FFFFFF',
+        'description': '温柔浪漫的粉色主题'
+    },
+    {
+        'id': 'blue',
+        'name': '蓝色',
+        'primary': '#2196F3',
+        'secondary': '#64B5F6',
+        'accent': '#42A5F5',
+        'background': '#F3F9FF',
+        'surface': '#FFFFFF',
+        'description': '专业稳重的蓝色主题'
+    },
+    {
+        'id': 'purple',
+        'name': '紫色',
+        'primary': '#9C27B0',
+        'secondary': '#BA68C8',
+        'accent': '#AB47BC',
+        'background': '#F8F5FF',
+        'surface': '#FFFFFF',
+        'description': '神秘优雅的紫色主题'
+    },
+    {
+        'id': 'green',
+        'name': '绿色',
+        'primary': '#4CAF50',
+        'secondary': '#81C784',
+        'accent': '#66BB6A',
+        'background': '#F5FFF5',
+        'surface': '#FFFFFF',
+        'description': '清新自然的绿色主题'
+    },
+    {
+        'id': 'yellow',
+        'name': '黄色',
+        'primary': '#FF9800',
+        'secondary': '#FFB74D',
+        'accent': '#FFA726',
+        'background': '#FFFBF0',
+        'surface': '#FFFFFF',
+        'description': '活力阳光的黄色主题'
+    }
+]
+
+
+def _build_theme_colors():
+    """从 theme_colors 表构建颜色目录"""
+    rows = ThemeColor.query.filter_by(is_active=True).order_by(ThemeColor.id).all()
+    colors = [{
+        'id': row.color_scheme.value,
+        'name': row.name,
+        'primary': row.primary_color,
+        'secondary': row.secondary_color,
+        'accent': row.accent_color,
+        'background': row.background_color,
+        'surface': row.surface_color,
+        'description': row.description
+    } for row in rows] or DEFAULT_THEME_COLORS
+    
+    return {
+        'success': True,
+        'data': {
+            'colors': colors,
+            'total': len(colors)
+        }
+    }
+
+def _build_theme_color_map():
+    """颜色方案 -> 颜色详情"""
+    return {color['id']: color for color in catalog.payload('theme_colors')['data']['colors']}
+
+catalog.register('theme_colors', _build_theme_colors)
+catalog.register('theme_color_map', _build_theme_color_map)
+
+@event.listens_for(ThemeColor, 'after_insert')
+@event.listens_for(ThemeColor, 'after_update')
+@event.listens_for(ThemeColor, 'after_delete')
+def _mark_theme_colors_changed(mapper, connection, target):
+    """颜色配置变化时标记，事务提交后再使目录失效"""
+    session = object_session(target)
+    if session is not None:
+        session.info['theme_colors_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_theme_colors(session):
+    if session.info.pop('theme_colors_changed', False):
+        catalog.invalidate('theme_colors')
+        catalog.invalidate('theme_color_map')
+
 @themes_bp.route('/colors', methods=['GET'])
 def get_available_colors():
-    """获取可用的主题颜色列表"""
+    """获取可用的主题颜色列表（预编码，支持ETag）"""
     try:
-        colors = [
-            {
-                'id': 'pink',
-                'name': '粉色',
-                'primary': '#FF6B9D',
-                'secondary': '#FFB3D1',
-                'accent': '#FF8FA3',
-                'background': '#FFF5F8',
-                'surface': '#FFFFFF',
-                'description': '温柔浪漫的粉色主题'
-            },
-            {
-                'id': 'blue',
-                'name': '蓝色',
-                'primary': '#2196F3',
-                'secondary': '#64B5F6',
-                'accent': '#42A5F5',
-                'background': '#F3F9FF',
-                'surface': '#FFFFFF',
-                'description': '专业稳重的蓝色主题'
-            },
-            {
-                'id': 'purple',
-                'name': '紫色',
-                'primary': '#9C27B0',
-                'secondary': '#BA68C8',
-                'accent': '#AB47BC',
-                'background': '#F8F5FF',
-                'surface': '#FFFFFF',
-                'description': '神秘优雅的紫色主题'
-            },
-            {
-                'id': 'green',
-                'name': '绿色',
-                'primary': '#4CAF50',
-                'secondary': '#81C784',
-                'accent': '#66BB6A',
-                'background': '#F5FFF5',
-                'surface': '#FFFFFF',
-                'description': '清新自然的绿色主题'
-            },
-            {
-                'id': 'yellow',
-                'name': '黄色',
-                'primary': '#FF9800',
-                'secondary': '#FFB74D',
-                'accent': '#FFA726',
-                'background': '#FFFBF0',
-                'surface': '#FFFFFF',
-                'description': '活力阳光的黄色主题'
-            }
-        ]
-        
-        return jsonify({
-            'success': True,
-            'data': {
-                'colors': colors,
-                'total': len(colors)
-            }
-        })
+        return catalog.respond('theme_colors')
         
     except Exception as e:
         return jsonify({'error': f'获取主题颜色失败: {str(e)}'}), 500
@@ -82,36 +126,25 @@ def get_available_colors():
 @themes_bp.route('/current', methods=['GET'])
 @jwt_required()
 def get_current_theme():
-    """获取用户当前主题设置"""
+    """获取用户当前主题设置（无记录时返回默认主题，不写库）"""
     try:
         current_user_id = get_jwt_identity()
         
-        user_theme = UserTheme.query.filter_by(
-            user_id=current_user_id
-        ).first()
-        
-        if not user_theme:
-            # 如果用户没有主题设置，创建默认主题
-            user_theme = UserTheme(
-                user_id=current_user_id,
-                color_scheme='blue',  # 默认蓝色主题
-                is_dark_mode=False
-            )
-            db.session.add(user_theme)
-            db.session.commit()
+        preferences = preferences_service.get(current_user_id)
+        if not preferences:
+            return jsonify({'error': '用户不存在'}), 404
         
-        # 获取主题颜色详情
-        color_details = _get_color_details(user_theme.color_scheme)
+        theme = preferences['theme']
         
         return jsonify({
             'success': True,
             'data': {
-                'id': user_theme.id,
-                'color_scheme': user_theme.color_scheme,
-                'is_dark_mode': user_theme.is_dark_mode,
-                'custom_settings': user_theme.custom_settings or {},
-                'color_details': color_details,
-                'last_updated': user_theme.updated_at.isoformat() if user_theme.updated_at else None
+                'id': theme['id'],
+                'color_scheme': theme['color_scheme'],
+                'is_dark_mode': theme['is_dark_mode'],
+                'custom_settings': theme['custom_settings'],
+                'color_details': _get_color_details(theme['color_scheme']),
+                'last_updated': theme['updated_at']
             }
         })
         
@@ -132,8 +165,7 @@ def update_theme():
         # 验证颜色方案
         color_scheme = data.get('color_scheme')
         if color_scheme:
-            valid_colors = ['pink', 'blue', 'purple', 'green', 'yellow']
-            if color_scheme not in valid_colors:
+            if color_scheme not in catalog.payload('theme_color_map'):
                 return jsonify({'error': '无效的颜色方案'}), 400
         
         # 获取或创建用户主题设置
@@ -157,6 +189,7 @@ def update_theme():
         
         user_theme.updated_at = datetime.utcnow()
         db.session.commit()
+        preferences_service.invalidate(current_user_id)
         
         # 获取更新后的主题详情
         color_details = _get_color_details(user_theme.color_scheme)
@@ -175,6 +208,7 @@ def update_theme():
         })
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'更新主题设置失败: {str(e)}'}), 500
 
 @themes_bp.route('/preview', methods=['POST'])
@@ -188,9 +222,7 @@ def preview_theme():
             return jsonify({'error': '请提供要预览的颜色方案'}), 400
         
         color_scheme = data['color_scheme']
-        valid_colors = ['pink', 'blue', 'purple', 'green', 'yellow']
-        
-        if color_scheme not in valid_colors:
+        if color_scheme not in catalog.payload('theme_color_map'):
             return jsonify({'error': '无效的颜色方案'}), 400
         
         # 获取主题颜色详情
@@ -212,57 +244,5 @@ def preview_theme():
 
 def _get_color_details(color_scheme):
     """获取颜色方案详情"""
-    color_map = {
-        'pink': {
-            'id': 'pink',
-            'name': '粉色',
-            'primary': '#FF6B9D',
-            'secondary': '#FFB3D1',
-            'accent': '#FF8FA3',
-            'background': '#FFF5F8',
-            'surface': '#FFFFFF',
-            'description': '温柔浪漫的粉色主题'
-        },
-        'blue': {
-            'id': 'blue',
-            'name': '蓝色',
-            'primary': '#2196F3',
-            'secondary': '#64B5F6',
-            'accent': '#42A5F5',
-            'background': '#F3F9FF',
-            'surface': '#FFFFFF',
-            'description': '专业稳重的蓝色主题'
-        },
-        'purple': {
-            'id': 'purple',
-            'name': '紫色',
-            'primary': '#9C27B0',
-            'secondary': '#BA68C8',
-            'accent': '#AB47BC',
-            'background': '#F8F5FF',
-            'surface': '#FFFFFF',
-            'description': '神秘优雅的紫色主题'
-        },
-        'green': {
-            'id': 'green',
-            'name': '绿色',
-            'primary': '#4CAF50',
-            'secondary': '#81C784',
-            'accent': '#66BB6A',
-            'background': '#F5FFF5',
-            'surface': '#FFFFFF',
-            'description': '清新自然的绿色主题'
-        },
-        'yellow': {
-            'id': 'yellow',
-            'name': '黄色',
-            'primary': '#FF9800',
-            'secondary': '#FFB74D',
-            'accent': '#FFA726',
-            'background': '#FFFBF0',
-            'surface': '#FFFFFF',
-            'description': '活力阳光的黄色主题'
-        }
-    }
-    
-    return color_map.get(color_scheme, color_map['blue'])
+    color_map = catalog.payload('theme_color_map')
+    return color_map.get(color_scheme) or color_map.get('blue') or DEFAULT_THEME_COLORS[1]
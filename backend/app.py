@@ -8,8 +8,10 @@ from dotenv import load_dotenv
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 from models import db
+from services.catalog import catalog
 
 # 加载根目录下的环境变量文件
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
@@ -19,6 +21,15 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # 经过反向代理时按可信跳数还原客户端地址（限流按IP计数依赖 remote_addr）
+    if Config.TRUSTED_PROXY_COUNT > 0:
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app,
+            x_for=Config.TRUSTED_PROXY_COUNT,
+            x_proto=Config.TRUSTED_PROXY_COUNT,
+            x_host=Config.TRUSTED_PROXY_COUNT
+        )
+    
     # 初始化数据库
     db.init_app(app)
     
@@ -28,6 +39,10 @@ def create_app():
     # 启用CORS支持前端跨域请求
     CORS(app)
     
+    # 注册命令行命令
+    from commands import register_commands
+    register_commands(app)
+    
     # 注册蓝图（路由）
     from api.auth import auth_bp
     from api.tasks import tasks_bp
@@ -38,6 +53,9 @@ def create_app():
     from api.pomodoro import pomodoro_bp
     from api.procrastination_diary import procrastination_bp
     from api.push_notifications import push_notifications_bp
+    from api.export import export_bp
+    from api.bootstrap import bootstrap_bp
+    from api.dashboard import dashboard_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(tasks_bp, url_prefix='/api/tasks')
@@ -48,6 +66,9 @@ def create_app():
     app.register_blueprint(pomodoro_bp, url_prefix='/api/pomodoro')
     app.register_blueprint(procrastination_bp, url_prefix='/api/procrastination')
     app.register_blueprint(push_notifications_bp, url_prefix='/api/notifications')
+    app.register_blueprint(export_bp, url_prefix='/api/export')
+    app.register_blueprint(bootstrap_bp, url_prefix='/api/bootstrap')
+    app.register_blueprint(dashboard_bp, url_prefix='/api/dashboard')
 
     
     # 健康检查端点
@@ -58,21 +79,36 @@ def create_app():
             'message': '拖延症AI助手服务运行正常'
         })
     
+    # 进程内指标（Prometheus文本格式）
+    @app.route('/metrics')
+    def metrics_endpoint():
+        from services.metrics import metrics
+        return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+    
     # 根路径
+    catalog.register('index', lambda: {
+        'message': '欢迎使用拖延症AI助手',
+        'version': '1.0.0',
+        'endpoints': {
+            'auth': '/api/auth',
+            'tasks': '/api/tasks',
+            'ai': '/api/ai',
+            'quotes': '/api/quotes',
+            'themes': '/api/themes',
+            'pomodoro': '/api/pomodoro',
+            'export': '/api/export',
+            'bootstrap': '/api/bootstrap',
+            'dashboard': '/api/dashboard'
+        }
+    })
+    
     @app.route('/')
     def index():
-        return jsonify({
-            'message': '欢迎使用拖延症AI助手',
-            'version': '1.0.0',
-            'endpoints': {
-                'auth': '/api/auth',
-                'tasks': '/api/tasks',
-                'ai': '/api/ai',
-                'quotes': '/api/quotes',
-                'themes': '/api/themes',
-                'pomodoro': '/api/pomodoro'
-            }
-        })
+        return catalog.respond('index')
+    
+    # 预先序列化静态目录
+    with app.app_context():
+        catalog.warm()
     
     return app
 
@@ -198,9 +234,17 @@ if __name__ == '__main__':
     # 自动初始化数据库
     auto_init_database()
     
-    # 启动定时任务调度器（暂时禁用，避免依赖问题）
-    # from scheduler import init_scheduler
-    # init_scheduler(app)
+    # 定时任务调度器以独立进程运行：flask run-scheduler（多进程同时运行时只有选主成功的进程执行任务）
+    
+    # 启动番茄钟会话清理器
+    if Config.SESSION_SWEEPER_ENABLED:
+        from services.session_sweeper import init_session_sweeper
+        init_session_sweeper(app)
+    
+    # 启动推送发件箱worker
+    if Config.OUTBOX_WORKER_ENABLED:
+        from services.notification_outbox import init_notification_outbox
+        init_notification_outbox(app)
     
     # Railway部署时使用PORT环境变量，本地开发使用5001
     port = int(os.environ.get('PORT', 5001))
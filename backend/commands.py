@@ -0,0 +1,144 @@
+"""
+Flask命令行命令
+通过 `flask <命令>` 执行离线批处理任务
+"""
+
+import time
+import click
+
+
+def register_commands(app):
+    """注册命令行命令"""
+
+    @app.cli.command('compute-insights')
+    @click.option('--chunk-size', default=5000, show_default=True, help='每批读取的行数')
+    def compute_insights(chunk_size):
+        """批量计算跨用户拖延洞察并写入 cohort_insights 表"""
+        from services.analytics_service import analytics_service
+
+        started = time.perf_counter()
+        sizes = analytics_service.compute(chunk_size=chunk_size)
+        elapsed = time.perf_counter() - started
+
+        for key, size in sizes.items():
+            print(f"📊 {key}: {size} 条记录")
+        print(f"✅ 群体洞察计算完成，耗时 {elapsed:.2f} 秒")
+
+    @app.cli.command('backfill-pomodoro-stats')
+    @click.option('--user-id', type=int, default=None, help='只重建指定用户（默认全部用户）')
+    def backfill_pomodoro_stats(user_id):
+        """根据历史番茄钟会话重建 pomodoro_stats 每日汇总"""
+        from models.pomodoro import PomodoroStats
+
+        started = time.perf_counter()
+        written = PomodoroStats.rebuild(user_id=user_id)
+        elapsed = time.perf_counter() - started
+
+        print(f"✅ 已写入 {written} 条每日汇总，耗时 {elapsed:.2f} 秒")
+
+    @app.cli.command('rebuild-focus-heatmap')
+    @click.option('--chunk-size', default=1000, show_default=True, help='每批读取的会话数')
+    @click.option('--batch-users', default=500, show_default=True, help='每次提交的用户数')
+    def rebuild_focus_heatmap(chunk_size, batch_users):
+        """根据历史工作会话重建所有用户的专注热力图"""
+        from models.focus_heatmap import FocusHeatmap
+
+        started = time.perf_counter()
+        users = FocusHeatmap.rebuild(chunk_size=chunk_size, batch_users=batch_users)
+        elapsed = time.perf_counter() - started
+
+        print(f"✅ 已重建 {users} 个用户的专注热力图，耗时 {elapsed:.2f} 秒")
+
+    @app.cli.command('sweep-sessions')
+    def sweep_sessions():
+        """立即清理一次超时或暂停过久的番茄钟会话"""
+        from services.session_sweeper import session_sweeper
+
+        started = time.perf_counter()
+        tracked = session_sweeper.seed()
+        result = session_sweeper.sweep()
+        elapsed = time.perf_counter() - started
+
+        print(f"📋 未完成会话: {tracked} 个")
+        print(f"✅ 自动完成 {result['completed']} 个，标记过期 {result['expired']} 个，耗时 {elapsed:.2f} 秒")
+
+    @app.cli.command('reconcile-dashboards')
+    @click.option('--user-id', type=int, default=None, help='只对账指定用户（默认全部用户）')
+    def reconcile_dashboards(user_id):
+        """按源数据表重算用户仪表盘，修正写路径遗漏造成的偏差"""
+        from models.dashboard import UserDashboard
+
+        started = time.perf_counter()
+        checked, fixed = UserDashboard.reconcile(user_id=user_id)
+        elapsed = time.perf_counter() - started
+
+        print(f"📋 已检查 {checked} 个用户")
+        print(f"✅ 修正 {fixed} 行仪表盘，耗时 {elapsed:.2f} 秒")
+
+    @app.cli.command('purge-rate-limits')
+    @click.option('--idle-hours', default=24, show_default=True, help='删除多久未访问的令牌桶')
+    def purge_rate_limits(idle_hours):
+        """清理数据库限流后端中长时间未访问的令牌桶"""
+        from models.rate_limit import RateLimitBucket
+
+        deleted = RateLimitBucket.purge(idle_seconds=idle_hours * 3600)
+        print(f"✅ 已删除 {deleted} 个闲置令牌桶")
+
+    @app.cli.command('process-outbox')
+    @click.option('--batch-size', type=int, default=None, help='每次认领的行数（默认取配置）')
+    @click.option('--until-empty/--once', default=True, show_default=True, help='处理到没有到期通知为止，或只处理一批')
+    def process_outbox(batch_size, until_empty):
+        """发送推送发件箱中到期的通知"""
+        from models.notification_outbox import NotificationOutbox
+        from services.notification_outbox import notification_outbox
+
+        started = time.perf_counter()
+        totals = {'claimed': 0, 'sent': 0, 'retried': 0, 'dead': 0, 'invalid_tokens': 0}
+        while True:
+            result = notification_outbox.process_batch(limit=batch_size)
+            for key, value in result.items():
+                totals[key] += value
+            if not until_empty or not result['claimed']:
+                break
+        elapsed = time.perf_counter() - started
+
+        print(f"📤 认领 {totals['claimed']} 行：送达 {totals['sent']}，重试 {totals['retried']}，放弃 {totals['dead']}")
+        print(f"🧹 停用失效token {totals['invalid_tokens']} 个")
+        print(f"📋 发件箱状态: {NotificationOutbox.counts()}")
+        print(f"✅ 发件箱处理完成，耗时 {elapsed:.2f} 秒")
+
+    @app.cli.command('purge-outbox')
+    @click.option('--days', default=7, show_default=True, help='删除多少天前已发送或已放弃的通知')
+    def purge_outbox(days):
+        """清理推送发件箱中已处理完的旧通知"""
+        from models.notification_outbox import NotificationOutbox
+
+        deleted = NotificationOutbox.purge(days=days)
+        print(f"✅ 已删除 {deleted} 条发件箱记录")
+
+    @app.cli.command('run-scheduler')
+    def run_scheduler():
+        """以独立进程运行定时任务调度器（可启动多个实例，只有主进程执行任务）"""
+        from config import Config
+        from scheduler import scheduler
+
+        scheduler.init_app(app)
+        print(f"🚀 调度器进程 {scheduler.lock.holder} 已启动，每 {Config.SCHEDULER_TICK_SECONDS} 秒检查一次，Ctrl+C 退出")
+        scheduler.run_forever()
+
+    @app.cli.command('job-history')
+    @click.option('--limit', default=20, show_default=True, help='显示最近多少次执行')
+    @click.option('--job', 'job_name', default=None, help='只显示指定任务')
+    def job_history(limit, job_name):
+        """查看定时任务的执行历史"""
+        from models.job_run import JobRun
+
+        query = JobRun.query
+        if job_name:
+            query = query.filter_by(job_name=job_name)
+        for run in query.order_by(JobRun.started_at.desc()).limit(limit):
+            item = run.to_dict()
+            duration = f"{item['duration']:.2f} 秒" if item['duration'] is not None else '-'
+            print(f"📋 {item['run_key']} [{item['status']}] 开始 {item['started_at']}，耗时 {duration}，"
+                  f"处理 {item['rows_processed']} 行，执行者 {item['holder']}"
+                  + (f"，错误: {item['error']}" if item['error'] else ''))
@@ -32,6 +32,7 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    USER_SNAPSHOT_TTL = int(os.environ.get('USER_SNAPSHOT_TTL') or 60)  # 用户快照缓存秒数
     
     # AI服务配置 - 通义千问
     DASHSCOPE_API_KEY = os.environ.get('DASHSCOPE_API_KEY')
@@ -48,6 +49,37 @@ class Config:
     # 缓存配置
     CACHE_TYPE = 'simple'
     CACHE_DEFAULT_TIMEOUT = 300  # 5分钟
+    REDIS_URL = os.environ.get('REDIS_URL')  # 配置后多个worker共享缓存
+    
+    # 番茄钟会话清理配置
+    SESSION_SWEEPER_ENABLED = os.environ.get('SESSION_SWEEPER_ENABLED', 'true').lower() in ['true', 'on', '1']
+    SESSION_SWEEP_INTERVAL = int(os.environ.get('SESSION_SWEEP_INTERVAL') or 30)  # 秒
+    SESSION_RESEED_INTERVAL = int(os.environ.get('SESSION_RESEED_INTERVAL') or 600)  # 秒，定期从数据库重建索引
+    SESSION_GRACE_MINUTES = int(os.environ.get('SESSION_GRACE_MINUTES') or 5)  # 超过计划时长多久后自动完成
+    PAUSED_SESSION_TTL_MINUTES = int(os.environ.get('PAUSED_SESSION_TTL_MINUTES') or 120)  # 暂停多久后视为过期
+    
+    # 定时任务调度器（多进程选主，只有主进程执行任务）
+    SCHEDULER_TICK_SECONDS = int(os.environ.get('SCHEDULER_TICK_SECONDS') or 20)  # 调度循环间隔，同时也是续期间隔
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS') or 90)  # 非Postgres下主进程失联多久后由其他进程接管
+    SCHEDULER_RUN_TIMEOUT_SECONDS = int(os.environ.get('SCHEDULER_RUN_TIMEOUT_SECONDS') or 600)  # 执行记录运行中超过多久视为主进程已退出，由其他进程接管重试（应小于30分钟补跑窗口）
+    
+    # 用户活跃时间批量写入间隔（秒）
+    ACTIVITY_FLUSH_INTERVAL = int(os.environ.get('ACTIVITY_FLUSH_INTERVAL') or 30)
+    
+    # 启动数据接口并发查询线程数（SQLite下始终顺序执行）
+    BOOTSTRAP_WORKERS = int(os.environ.get('BOOTSTRAP_WORKERS') or 4)
+    
+    # 密码哈希配置（进程池执行，排队满时登录/注册返回429）
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)  # 0 表示在请求线程内执行
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT') or 32)
+    PASSWORD_HASH_TIMEOUT = int(os.environ.get('PASSWORD_HASH_TIMEOUT') or 10)  # 秒
+    
+    # 频率限制后端：auto（有Redis用Redis，否则进程内）/ redis / database / memory
+    RATE_LIMIT_BACKEND = (os.environ.get('RATE_LIMIT_BACKEND') or 'auto').lower()
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']  # 压测时可关闭
+    # 应用前面可信的反向代理层数（Railway 部署有一层），X-Forwarded-For 只信任最右侧这么多个地址；0 表示直连
+    TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT') or (1 if DATABASE_URL else 0))
     
     # 邮件配置（用于用户验证）
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
@@ -62,7 +94,19 @@ class Config:
     
     # Firebase推送通知配置
     FCM_SERVER_KEY = os.environ.get('FCM_SERVER_KEY', 'YOUR_FCM_SERVER_KEY_HERE')
-    FCM_URL = "https://fcm.googleapis.com/fcm/send"
+    FCM_URL = os.environ.get('FCM_URL') or "https://fcm.googleapis.com/fcm/send"  # 测试时可指向本地模拟服务
+    FCM_BATCH_SIZE = 1000  # 单次 registration_ids 的token上限（FCM 旧版HTTP接口限制）
+    FCM_MAX_PARALLEL = int(os.environ.get('FCM_MAX_PARALLEL') or 8)  # 并发发送的批次数（同时也是连接池大小）
+    FCM_TIMEOUT = int(os.environ.get('FCM_TIMEOUT') or 10)  # 秒
+    
+    # 推送发件箱配置（后台worker认领批次发送，失败按指数退避重试）
+    OUTBOX_WORKER_ENABLED = os.environ.get('OUTBOX_WORKER_ENABLED', 'true').lower() in ['true', 'on', '1']
+    OUTBOX_POLL_INTERVAL = int(os.environ.get('OUTBOX_POLL_INTERVAL') or 5)  # 秒
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE') or 50)  # 每次认领的行数（每行最多1000个token）
+    OUTBOX_LEASE_SECONDS = int(os.environ.get('OUTBOX_LEASE_SECONDS') or 120)  # 认领后多久未完成视为worker失联
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS') or 6)
+    OUTBOX_RETRY_BASE_SECONDS = int(os.environ.get('OUTBOX_RETRY_BASE_SECONDS') or 30)  # 第n次重试等待 base * 2^(n-1)
+    OUTBOX_RETRY_MAX_SECONDS = int(os.environ.get('OUTBOX_RETRY_MAX_SECONDS') or 3600)
     
     # APNs配置（iOS推送）
     APNS_KEY_ID = os.environ.get('APNS_KEY_ID', 'YOUR_APNS_KEY_ID')
@@ -9,6 +9,13 @@ from models.quote import DailyQuote, CustomQuote
 from models.theme import UserTheme, ThemeColor, ColorScheme
 from models.pomodoro import PomodoroSettings, PomodoroSession, PomodoroStats
 from models.procrastination_diary import ProcrastinationDiary, ProcrastinationStats
+from models.streak import ActivityStreak
+from models.insight import CohortInsight
+from models.focus_heatmap import FocusHeatmap
+from models.dashboard import UserDashboard
+from models.rate_limit import RateLimitBucket
+from models.notification_outbox import NotificationOutbox
+from models.job_run import JobLease, JobRun
 
 def upgrade():
     """升级数据库结构"""
@@ -116,7 +123,15 @@ def downgrade():
         'theme_colors',
         'pomodoro_settings',
         'pomodoro_sessions',
-        'pomodoro_stats'
+        'pomodoro_stats',
+        'activity_streaks',
+        'cohort_insights',
+        'focus_heatmaps',
+        'user_dashboards',
+        'rate_limit_buckets',
+        'notification_outbox',
+        'job_leases',
+        'job_runs'
     ]
     
     for table_name in tables_to_drop:
@@ -0,0 +1,46 @@
+"""
+数据库迁移脚本 - 番茄钟会话过期标记
+为 pomodoro_sessions 添加 is_expired 列及未完成会话索引（已有表不会被 db.create_all 修改）
+"""
+
+from sqlalchemy import inspect, text
+from models import db
+
+def upgrade():
+    """升级数据库结构"""
+    
+    inspector = inspect(db.engine)
+    columns = [column['name'] for column in inspector.get_columns('pomodoro_sessions')]
+    indexes = [index['name'] for index in inspector.get_indexes('pomodoro_sessions')]
+    
+    with db.engine.begin() as conn:
+        if 'is_expired' not in columns:
+            conn.execute(text(
+                'ALTER TABLE pomodoro_sessions ADD COLUMN is_expired BOOLEAN NOT NULL DEFAULT FALSE'
+            ))
+            print("已添加列: pomodoro_sessions.is_expired")
+        
+        if 'idx_session_open' not in indexes:
+            conn.execute(text(
+                'CREATE INDEX idx_session_open ON pomodoro_sessions (is_completed, is_expired)'
+            ))
+            print("已创建索引: idx_session_open")
+    
+    print("数据库迁移完成：会话过期标记已添加")
+
+def downgrade():
+    """降级数据库结构"""
+    
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP INDEX IF EXISTS idx_session_open'))
+        conn.execute(text('ALTER TABLE pomodoro_sessions DROP COLUMN is_expired'))
+    
+    print("数据库降级完成")
+
+if __name__ == '__main__':
+    # 直接运行此脚本进行迁移
+    from app import create_app
+    
+    app = create_app()
+    with app.app_context():
+        upgrade()
@@ -0,0 +1,36 @@
+"""
+数据库迁移脚本 - 用户时区索引
+为 users.timezone 创建索引，定时提醒按时区分片只扫描当前分片的用户（已有表不会被 db.create_all 修改）
+"""
+
+from sqlalchemy import inspect, text
+from models import db
+
+def upgrade():
+    """升级数据库结构"""
+    
+    inspector = inspect(db.engine)
+    indexes = [index['name'] for index in inspector.get_indexes('users')]
+    
+    with db.engine.begin() as conn:
+        if 'ix_users_timezone' not in indexes:
+            conn.execute(text('CREATE INDEX ix_users_timezone ON users (timezone)'))
+            print("已创建索引: ix_users_timezone")
+    
+    print("数据库迁移完成：用户时区索引已添加")
+
+def downgrade():
+    """降级数据库结构"""
+    
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP INDEX IF EXISTS ix_users_timezone'))
+    
+    print("数据库降级完成")
+
+if __name__ == '__main__':
+    # 直接运行此脚本进行迁移
+    from app import create_app
+    
+    app = create_app()
+    with app.app_context():
+        upgrade()
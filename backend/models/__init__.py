@@ -14,6 +14,13 @@ def init_models():
     from .task import Task, TaskStep
     from .theme import Theme, UserTheme, ThemeColor
     from .procrastination_diary import ProcrastinationDiary, ProcrastinationStats
+    from .streak import ActivityStreak
+    from .insight import CohortInsight
+    from .focus_heatmap import FocusHeatmap
+    from .dashboard import UserDashboard
+    from .rate_limit import RateLimitBucket
+    from .notification_outbox import NotificationOutbox
+    from .job_run import JobLease, JobRun
     
     # 返回模型类
     return {
@@ -23,7 +30,15 @@ def init_models():
         'UserTheme': UserTheme,
         'ThemeColor': ThemeColor,
         'ProcrastinationDiary': ProcrastinationDiary,
-        'ProcrastinationStats': ProcrastinationStats
+        'ProcrastinationStats': ProcrastinationStats,
+        'ActivityStreak': ActivityStreak,
+        'CohortInsight': CohortInsight,
+        'FocusHeatmap': FocusHeatmap,
+        'UserDashboard': UserDashboard,
+        'RateLimitBucket': RateLimitBucket,
+        'NotificationOutbox': NotificationOutbox,
+        'JobLease': JobLease,
+        'JobRun': JobRun
     }
 
 __all__ = ['db', 'init_models']
@@ -0,0 +1,315 @@
+"""
+用户仪表盘汇总模型
+任务、番茄钟、拖延日记的写路径在同一事务内更新该行，首页各项派生数字只需一次按用户ID的读取
+"""
+
+from datetime import datetime, date, timedelta
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from . import db
+
+RECENT_DAYS = 8  # 保留最近8天的完成数，足够计算「近7天完成」
+
+
+class UserDashboard(db.Model):
+    """用户仪表盘汇总"""
+
+    __tablename__ = 'user_dashboards'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True, index=True)
+
+    # 任务
+    total_tasks = db.Column(db.Integer, default=0)
+    completed_tasks = db.Column(db.Integer, default=0)
+    recent_completions = db.Column(db.JSON, nullable=False, default=dict)  # {'YYYY-MM-DD': 完成数}
+
+    # 番茄钟
+    total_pomodoros = db.Column(db.Integer, default=0)  # 完成的工作会话数
+    total_focus_minutes = db.Column(db.Integer, default=0)
+    focus_streak = db.Column(db.Integer, default=0)
+    focus_last_date = db.Column(db.Date, nullable=True)
+
+    # 拖延日记
+    total_procrastinations = db.Column(db.Integer, default=0)
+    procrastination_streak = db.Column(db.Integer, default=0)
+    procrastination_last_date = db.Column(db.Date, nullable=True)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.total_tasks = 0
+        self.completed_tasks = 0
+        self.recent_completions = {}
+        self.total_pomodoros = 0
+        self.total_focus_minutes = 0
+        self.focus_streak = 0
+        self.total_procrastinations = 0
+        self.procrastination_streak = 0
+
+    # ==================== 增量更新（由调用方提交事务） ====================
+
+    def add_completion(self, completed_at, delta=1):
+        """记录（或撤销）一次任务完成"""
+        self.completed_tasks = max((self.completed_tasks or 0) + delta, 0)
+        if not completed_at:
+            return
+
+        cutoff = date.today() - timedelta(days=RECENT_DAYS - 1)
+        day = completed_at.date() if isinstance(completed_at, datetime) else completed_at
+        recent = {d: n for d, n in (self.recent_completions or {}).items() if date.fromisoformat(d) >= cutoff}
+        if day >= cutoff:
+            count = recent.get(day.isoformat(), 0) + delta
+            if count > 0:
+                recent[day.isoformat()] = count
+            else:
+                recent.pop(day.isoformat(), None)
+        # JSON列需整体赋值新对象才会被标记为已修改
+        self.recent_completions = recent
+
+    @staticmethod
+    def record_focus_session(user_id, minutes, streak):
+        """记录一次完成的工作会话，同步专注连续天数"""
+        dashboard = UserDashboard.query.filter_by(user_id=user_id).with_for_update().first()
+        if not dashboard:
+            # 回填查询前会自动flush，结果已包含本次会话与连续天数
+            db.session.add(UserDashboard.compute(user_id))
+            return
+
+        dashboard.total_pomodoros = (dashboard.total_pomodoros or 0) + 1
+        dashboard.total_focus_minutes = (dashboard.total_focus_minutes or 0) + max(int(minutes or 0), 0)
+        dashboard.focus_streak = streak.current_streak or 0
+        dashboard.focus_last_date = streak.last_active_date
+
+    def add_procrastination(self, stats):
+        """记录一条拖延日记，同步拖延统计"""
+        self.total_procrastinations = stats.total_procrastinations or 0
+        self.procrastination_streak = stats.current_streak or 0
+        self.procrastination_last_date = stats.last_procrastination_date
+
+    # ==================== 读取 ====================
+
+    def week_completed(self, today: date = None) -> int:
+        """近7天完成的任务数"""
+        cutoff = (today or date.today()) - timedelta(days=7)
+        return sum(n for d, n in (self.recent_completions or {}).items() if date.fromisoformat(d) >= cutoff)
+
+    @staticmethod
+    def _current(streak, last_date, today):
+        """已中断（最后活跃日早于昨天）的连续记录按0计"""
+        if not last_date or last_date < today - timedelta(days=1):
+            return 0
+        return streak or 0
+
+    def to_dict(self, today: date = None):
+        """转换为字典格式"""
+        today = today or date.today()
+        total_tasks = self.total_tasks or 0
+        completed_tasks = self.completed_tasks or 0
+        return {
+            'user_id': self.user_id,
+            'total_tasks': total_tasks,
+            'completed_tasks': completed_tasks,
+            'completion_rate': round(completed_tasks / total_tasks * 100, 1) if total_tasks > 0 else 0,
+            'week_completed': self.week_completed(today),
+            'total_pomodoros': self.total_pomodoros or 0,
+            'total_focus_minutes': self.total_focus_minutes or 0,
+            'total_focus_hours': round((self.total_focus_minutes or 0) / 60, 1),
+            'focus_streak': self._current(self.focus_streak, self.focus_last_date, today),
+            'total_procrastinations': self.total_procrastinations or 0,
+            'procrastination_streak': self._current(self.procrastination_streak, self.procrastination_last_date, today),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    # ==================== 创建与对账 ====================
+
+    @staticmethod
+    def get_or_create(user_id, for_update=False):
+        """获取用户仪表盘，不存在时根据历史数据一次性回填"""
+        for pending in db.session.new:
+            if isinstance(pending, UserDashboard) and int(pending.user_id) == int(user_id):
+                return pending
+
+        query = UserDashboard.query.filter_by(user_id=user_id)
+        if for_update:
+            query = query.with_for_update()
+        dashboard = query.first()
+        if not dashboard:
+            dashboard = UserDashboard.compute(user_id)
+            db.session.add(dashboard)
+        return dashboard
+
+    @staticmethod
+    def backfill(user_ids):
+        """
+        为还没有仪表盘的用户按历史数据回填（不提交）
+
+        批量完成会话前调用：回填只统计此前已完成的会话，本批会话随后逐条累加，不会重复计数。
+        """
+        user_ids = {int(uid) for uid in user_ids}
+        if not user_ids:
+            return
+        existing = {row[0] for row in db.session.query(UserDashboard.user_id).filter(
+            UserDashboard.user_id.in_(user_ids)
+        )}
+        for uid in user_ids - existing:
+            db.session.add(UserDashboard.compute(uid))
+
+    @staticmethod
+    def compute(user_id):
+        """从源数据表重新计算单个用户的仪表盘（不写库）"""
+        return UserDashboard._compute_all(user_id).get(int(user_id)) or UserDashboard(user_id=int(user_id))
+
+    @staticmethod
+    def _compute_all(user_id=None):
+        """按用户分组聚合源数据表，返回 {user_id: UserDashboard}"""
+        from .task import Task, TaskStatus
+        from .pomodoro import PomodoroSession
+        from .procrastination_diary import ProcrastinationStats
+        from .streak import ActivityStreak
+
+        def scoped(query, column):
+            return query.filter(column == user_id) if user_id is not None else query
+
+        dashboards = {}
+
+        def get(uid):
+            if uid not in dashboards:
+                dashboards[uid] = UserDashboard(user_id=uid)
+            return dashboards[uid]
+
+        completed = db.case((Task.status == TaskStatus.COMPLETED, 1), else_=0)
+        rows = scoped(db.session.query(
+            Task.user_id, db.func.count(Task.id), db.func.coalesce(db.func.sum(completed), 0)
+        ), Task.user_id).group_by(Task.user_id)
+        for uid, total, done in rows:
+            dashboard = get(uid)
+            dashboard.total_tasks, dashboard.completed_tasks = int(total), int(done)
+
+        cutoff = date.today() - timedelta(days=RECENT_DAYS - 1)
+        rows = scoped(db.session.query(Task.user_id, Task.completed_at), Task.user_id).filter(
+            Task.status == TaskStatus.COMPLETED,
+            Task.completed_at >= datetime.combine(cutoff, datetime.min.time())
+        )
+        recent = {}
+        for uid, completed_at in rows:
+            days = recent.setdefault(uid, {})
+            days[completed_at.date().isoformat()] = days.get(completed_at.date().isoformat(), 0) + 1
+        for uid, days in recent.items():
+            get(uid).recent_completions = days
+
+        # 与写路径一致：实际时长为0（不足1分钟完成）时按计划时长计
+        minutes = db.func.coalesce(db.func.nullif(PomodoroSession.actual_duration, 0), PomodoroSession.planned_duration, 0)
+        rows = scoped(db.session.query(
+            PomodoroSession.user_id, db.func.count(PomodoroSession.id), db.func.coalesce(db.func.sum(minutes), 0)
+        ), PomodoroSession.user_id).filter(
+            PomodoroSession.session_type == 'work',
+            PomodoroSession.is_completed == True
+        ).group_by(PomodoroSession.user_id)
+        for uid, sessions, total_minutes in rows:
+            dashboard = get(uid)
+            dashboard.total_pomodoros, dashboard.total_focus_minutes = int(sessions), int(total_minutes)
+
+        for streak in scoped(ActivityStreak.query, ActivityStreak.user_id).filter_by(kind=ActivityStreak.KIND_FOCUS):
+            dashboard = get(streak.user_id)
+            dashboard.focus_streak, dashboard.focus_last_date = streak.current_streak or 0, streak.last_active_date
+
+        for stats in scoped(ProcrastinationStats.query, ProcrastinationStats.user_id):
+            get(stats.user_id).add_procrastination(stats)
+
+        return dashboards
+
+    @staticmethod
+    def reconcile(user_id=None):
+        """
+        对账：按源数据表重算仪表盘并修正偏差的行
+
+        Returns:
+            tuple: (检查的用户数, 修正的行数)
+        """
+        fields = (
+            'total_tasks', 'completed_tasks', 'recent_completions', 'total_pomodoros', 'total_focus_minutes',
+            'focus_streak', 'focus_last_date', 'total_procrastinations', 'procrastination_streak',
+            'procrastination_last_date'
+        )
+        expected = UserDashboard._compute_all(user_id)
+        query = UserDashboard.query
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+
+        fixed = 0
+        existing = set()
+        for dashboard in query:
+            existing.add(dashboard.user_id)
+            target = expected.get(dashboard.user_id) or UserDashboard(user_id=dashboard.user_id)
+            if any(getattr(dashboard, f) != getattr(target, f) for f in fields):
+                for f in fields:
+                    setattr(dashboard, f, getattr(target, f))
+                fixed += 1
+
+        for uid, dashboard in expected.items():
+            if uid not in existing:
+                db.session.add(dashboard)
+                fixed += 1
+
+        db.session.commit()
+        return len(existing | set(expected)), fixed
+
+    def __repr__(self):
+        return f'<UserDashboard {self.user_id}>'
+
+
+@event.listens_for(Session, 'before_flush')
+def _apply_task_changes(session, flush_context, instances):
+    """任务的新增、删除与完成状态变化在同一次flush中同步到仪表盘"""
+    from .task import Task, TaskStatus
+
+    def old_value(state, name, current):
+        deleted = state.attrs[name].history.deleted
+        return deleted[0] if deleted else current
+
+    changes = {}  # {user_id: [任务数增量, [(完成时间, 完成数增量)]]}
+
+    def change(user_id):
+        return changes.setdefault(int(user_id), [0, []])
+
+    for task in session.new:
+        if isinstance(task, Task):
+            entry = change(task.user_id)
+            entry[0] += 1
+            if task.status == TaskStatus.COMPLETED:
+                entry[1].append((task.completed_at, 1))
+
+    for task in session.deleted:
+        if isinstance(task, Task):
+            state = inspect(task)
+            entry = change(task.user_id)
+            entry[0] -= 1
+            if old_value(state, 'status', task.status) == TaskStatus.COMPLETED:
+                entry[1].append((old_value(state, 'completed_at', task.completed_at), -1))
+
+    for task in session.dirty:
+        if not isinstance(task, Task) or not session.is_modified(task):
+            continue
+        state = inspect(task)
+        old_status = old_value(state, 'status', task.status)
+        old_completed_at = old_value(state, 'completed_at', task.completed_at)
+        was_done = old_status == TaskStatus.COMPLETED
+        is_done = task.status == TaskStatus.COMPLETED
+        if was_done and is_done and old_completed_at == task.completed_at:
+            continue
+        if was_done:
+            change(task.user_id)[1].append((old_completed_at, -1))
+        if is_done:
+            change(task.user_id)[1].append((task.completed_at, 1))
+
+    with session.no_autoflush:
+        for user_id, (task_delta, done) in changes.items():
+            if not task_delta and not done:
+                continue
+            # 新回填的行基于flush前的数据库状态计算，叠加本次变化后即为最新值
+            dashboard = UserDashboard.get_or_create(user_id, for_update=True)
+            dashboard.total_tasks = max((dashboard.total_tasks or 0) + task_delta, 0)
+            for completed_at, delta in done:
+                dashboard.add_completion(completed_at, delta)
@@ -0,0 +1,179 @@
+"""
+专注热力图模型
+按「星期 × 小时」(7×24) 统计用户的专注分钟数，以定长整数数组存储
+"""
+
+from array import array
+from datetime import datetime
+from . import db
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+HOURS_PER_WEEK = 7 * 24
+WEEKDAY_NAMES = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+
+
+def hour_of_week(moment: datetime) -> int:
+    """周一0点为0，周日23点为167"""
+    return moment.weekday() * 24 + moment.hour
+
+
+def timezone_offset_hours(tz_name: str, at: datetime = None) -> int:
+    """时区相对UTC的整小时偏移（无法识别的时区按UTC处理）"""
+    if not tz_name or ZoneInfo is None:
+        return 0
+    try:
+        offset = (at or datetime.utcnow()).replace(tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo(tz_name)).utcoffset()
+    except Exception:
+        return 0
+    return int(offset.total_seconds() // 3600) if offset else 0
+
+
+class FocusHeatmap(db.Model):
+    """用户专注热力图（UTC星期小时，读取时按用户时区旋转）"""
+
+    __tablename__ = 'focus_heatmaps'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True, index=True)
+
+    # 168个uint32，下标为UTC下的 hour_of_week，值为专注分钟数
+    minutes = db.Column(db.LargeBinary, nullable=False)
+    total_minutes = db.Column(db.Integer, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __init__(self, user_id, counts=None):
+        self.user_id = user_id
+        self.set_counts(counts or array('I', bytes(4 * HOURS_PER_WEEK)))
+
+    def get_counts(self) -> array:
+        """解码为定长数组"""
+        counts = array('I')
+        counts.frombytes(self.minutes)
+        return counts
+
+    def set_counts(self, counts: array):
+        """写回数组（整体赋值以标记列已修改）"""
+        self.minutes = counts.tobytes()
+        self.total_minutes = sum(counts)
+
+    def add_session(self, start_time: datetime, minutes: int):
+        """累加一次专注会话（按开始时间所在的小时计入）"""
+        counts = self.get_counts()
+        counts[hour_of_week(start_time)] += max(int(minutes or 0), 0)
+        self.set_counts(counts)
+
+    def local_grid(self, tz_name: str = None):
+        """按用户时区旋转后的 7×24 网格（行=星期，列=小时）"""
+        counts = self.get_counts().tolist()
+        shift = timezone_offset_hours(tz_name) % HOURS_PER_WEEK
+        if shift:
+            # 本地 hour_of_week = UTC + 偏移，向右旋转
+            counts = counts[-shift:] + counts[:-shift]
+        return [counts[day * 24:(day + 1) * 24] for day in range(7)]
+
+    def peak_hours(self, tz_name: str = None, top: int = 3):
+        """专注分钟数最多的若干个时段，返回 [(星期序号, 小时, 分钟数)]"""
+        grid = self.local_grid(tz_name)
+        cells = [(day, hour, grid[day][hour]) for day in range(7) for hour in range(24) if grid[day][hour]]
+        cells.sort(key=lambda cell: cell[2], reverse=True)
+        return cells[:top]
+
+    def to_dict(self, tz_name: str = None):
+        """转换为字典格式"""
+        return {
+            'user_id': self.user_id,
+            'timezone': tz_name or 'UTC',
+            'weekdays': WEEKDAY_NAMES,
+            'grid': self.local_grid(tz_name),
+            'total_minutes': self.total_minutes or 0,
+            'peak_hours': [
+                {'weekday': WEEKDAY_NAMES[day], 'hour': hour, 'minutes': minutes}
+                for day, hour, minutes in self.peak_hours(tz_name)
+            ],
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    @staticmethod
+    def get_or_create(user_id, for_update=False):
+        """获取用户热力图，不存在时创建空图"""
+        query = FocusHeatmap.query.filter_by(user_id=user_id)
+        if for_update:
+            query = query.with_for_update()
+        heatmap = query.first()
+        if not heatmap:
+            heatmap = FocusHeatmap(user_id=user_id)
+            db.session.add(heatmap)
+        return heatmap
+
+    @staticmethod
+    def rebuild(chunk_size=1000, batch_users=500):
+        """
+        根据历史工作会话重建全部热力图
+
+        按用户ID分批：每批分块流式读取这些用户的会话（按用户排序），用户ID变化时即写回上一个用户的热力图，
+        每批提交一次。内存中只保留一个用户的计数，重建期间其他用户的热力图照常可读。
+
+        Returns:
+            int: 重建的用户数
+        """
+        from .pomodoro import PomodoroSession
+
+        completed_work = db.and_(PomodoroSession.session_type == 'work', PomodoroSession.is_completed == True)
+        rebuilt, last_user_id = 0, None
+        while True:
+            users_stmt = db.select(PomodoroSession.user_id).where(completed_work).distinct().order_by(
+                PomodoroSession.user_id
+            ).limit(batch_users)
+            if last_user_id is not None:
+                users_stmt = users_stmt.where(PomodoroSession.user_id > last_user_id)
+            user_ids = db.session.execute(users_stmt).scalars().all()
+            if not user_ids:
+                break
+
+            existing = {heatmap.user_id: heatmap for heatmap in
+                        FocusHeatmap.query.filter(FocusHeatmap.user_id.in_(user_ids))}
+
+            def emit(user_id, counts):
+                heatmap = existing.get(user_id)
+                if heatmap is None:
+                    db.session.add(FocusHeatmap(user_id=user_id, counts=counts))
+                else:
+                    heatmap.set_counts(counts)
+
+            stmt = db.select(
+                PomodoroSession.user_id,
+                PomodoroSession.start_time,
+                PomodoroSession.actual_duration,
+                PomodoroSession.planned_duration
+            ).where(completed_work, PomodoroSession.user_id.in_(user_ids)).order_by(PomodoroSession.user_id)
+
+            current, counts = None, None
+            result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+            for rows in result.partitions():
+                for user_id, start_time, actual, planned in rows:
+                    if user_id != current:
+                        if current is not None:
+                            emit(current, counts)
+                        current, counts = user_id, array('I', bytes(4 * HOURS_PER_WEEK))
+                    counts[hour_of_week(start_time)] += max(int(actual or planned or 0), 0)
+            if current is not None:
+                emit(current, counts)
+
+            db.session.commit()
+            rebuilt += len(user_ids)
+            last_user_id = user_ids[-1]
+
+        # 已没有完成的工作会话的用户（会话被删除）不再保留热力图
+        FocusHeatmap.query.filter(~db.exists().where(
+            PomodoroSession.user_id == FocusHeatmap.user_id, completed_work
+        )).delete(synchronize_session=False)
+        db.session.commit()
+        return rebuilt
+
+    def __repr__(self):
+        return f'<FocusHeatmap {self.user_id}: {self.total_minutes}min>'
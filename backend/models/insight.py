@@ -0,0 +1,57 @@
+"""
+群体洞察模型
+保存离线批量分析得到的跨用户统计结果，供API和AI提示词直接读取
+"""
+
+from datetime import datetime
+from . import db
+
+
+class CohortInsight(db.Model):
+    """群体洞察汇总表（每个统计项一行）"""
+
+    __tablename__ = 'cohort_insights'
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(50), nullable=False, unique=True, index=True)  # 统计项名称
+    payload = db.Column(db.JSON, nullable=False)  # 统计结果
+    sample_size = db.Column(db.Integer, default=0)  # 参与统计的记录数
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __init__(self, key, payload, sample_size=0):
+        self.key = key
+        self.payload = payload
+        self.sample_size = sample_size
+
+    @staticmethod
+    def save(key, payload, sample_size=0):
+        """写入或覆盖统计项（由调用方提交事务）"""
+        insight = CohortInsight.query.filter_by(key=key).first()
+        if insight:
+            insight.payload = payload
+            insight.sample_size = sample_size
+            insight.computed_at = datetime.utcnow()
+        else:
+            insight = CohortInsight(key=key, payload=payload, sample_size=sample_size)
+            db.session.add(insight)
+        return insight
+
+    @staticmethod
+    def get_payloads(keys=None):
+        """读取统计结果，返回 {key: payload}"""
+        query = CohortInsight.query
+        if keys:
+            query = query.filter(CohortInsight.key.in_(keys))
+        return {insight.key: insight.payload for insight in query.all()}
+
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'key': self.key,
+            'payload': self.payload,
+            'sample_size': self.sample_size,
+            'computed_at': self.computed_at.isoformat() if self.computed_at else None
+        }
+
+    def __repr__(self):
+        return f'<CohortInsight {self.key}: {self.sample_size}>'
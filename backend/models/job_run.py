@@ -0,0 +1,112 @@
+"""
+定时任务运行模型
+JobLease：调度器选主用的租约（非Postgres数据库使用，Postgres 用 advisory lock）
+JobRun：每次任务执行的记录（开始、结束、处理行数）；run_key 唯一，同一任务同一分片同一天只会执行一次
+"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from . import db
+
+RUN_RUNNING = 'running'
+RUN_SUCCEEDED = 'succeeded'
+RUN_FAILED = 'failed'
+
+
+class JobLease(db.Model):
+    """调度器租约"""
+
+    __tablename__ = 'job_leases'
+
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)  # 主机名:进程号:随机串
+    lease_until = db.Column(db.DateTime, nullable=False)
+    renewed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<JobLease {self.name}: {self.holder} until {self.lease_until}>'
+
+
+class JobRun(db.Model):
+    """定时任务执行记录"""
+
+    __tablename__ = 'job_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False, index=True)
+    run_key = db.Column(db.String(200), nullable=False, unique=True)  # 任务名:分片:本地日期
+    holder = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=RUN_RUNNING)
+    rows_processed = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    @staticmethod
+    def begin(job_name: str, run_key: str, holder: str, stale_after: int = None) -> Optional['JobRun']:
+        """
+        登记一次执行并提交
+
+        run_key 已存在时说明其他进程（或切换前的主进程）已执行过或正在执行，返回None；
+        上次执行失败的记录、以及开始超过 stale_after 秒仍为运行中的记录（执行中的主进程已退出）
+        会被重新置为运行中，允许重试。UPDATE 条件中重新校验状态，并发接管时只有一个进程成功。
+        """
+        now = datetime.utcnow()
+        run = JobRun(job_name=job_name, run_key=run_key, holder=holder, status=RUN_RUNNING, started_at=now)
+        db.session.add(run)
+        try:
+            db.session.commit()
+            return run
+        except IntegrityError:
+            db.session.rollback()
+
+        retryable = JobRun.status == RUN_FAILED
+        if stale_after:
+            retryable = db.or_(retryable, db.and_(
+                JobRun.status == RUN_RUNNING,
+                JobRun.started_at < now - timedelta(seconds=stale_after)
+            ))
+        retried = JobRun.query.filter(JobRun.run_key == run_key, retryable).update({
+            'holder': holder,
+            'status': RUN_RUNNING,
+            'error': None,
+            'started_at': now,
+            'finished_at': None
+        }, synchronize_session=False)
+        db.session.commit()
+        return JobRun.query.filter_by(run_key=run_key).first() if retried else None
+
+    @staticmethod
+    def is_succeeded(run_key: str) -> bool:
+        """该 run_key 是否已成功执行"""
+        return JobRun.query.filter_by(run_key=run_key, status=RUN_SUCCEEDED).first() is not None
+
+    @staticmethod
+    def finish(run_id: int, rows_processed: int = None, error: str = None):
+        """记录执行结果并提交"""
+        JobRun.query.filter_by(id=run_id).update({
+            'status': RUN_FAILED if error else RUN_SUCCEEDED,
+            'rows_processed': rows_processed,
+            'error': error,
+            'finished_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def to_dict(self):
+        """转换为字典格式"""
+        return {
+            'id': self.id,
+            'job_name': self.job_name,
+            'run_key': self.run_key,
+            'holder': self.holder,
+            'status': self.status,
+            'rows_processed': self.rows_processed,
+            'error': self.error,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration': (self.finished_at - self.started_at).total_seconds() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<JobRun {self.run_key}: {self.status}>'
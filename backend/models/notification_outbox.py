@@ -0,0 +1,135 @@
+"""
+推送通知发件箱模型
+请求处理和定时任务只把待发送的通知写入发件箱，由后台worker认领批次后发送；
+发送失败按指数退避重试，多个进程同时处理时通过租约（Postgres 上另加 SKIP LOCKED）保证每行只被一个worker发送。
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+from . import db
+
+STATUS_PENDING = 'pending'  # 等待发送或等待重试
+STATUS_SENT = 'sent'        # 已发送
+STATUS_DEAD = 'dead'        # 重试次数用尽，不再发送
+
+CHANNEL_FCM = 'fcm'
+CHANNEL_APNS = 'apns'
+
+
+class NotificationOutbox(db.Model):
+    """推送通知发件箱"""
+
+    __tablename__ = 'notification_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)  # 多用户合并的批次为空
+    notification_type = db.Column(db.String(50), nullable=False)
+    channel = db.Column(db.String(20), nullable=False)  # fcm（Android/Web）/ apns（iOS）
+    title = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.String(500), nullable=False)
+    data = db.Column(db.JSON, nullable=True)
+    tokens = db.Column(db.JSON, nullable=False)  # 目标token列表（不超过FCM单次上限），重试时只保留未送达的token
+
+    # 投递状态
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lease_until = db.Column(db.DateTime, nullable=True)  # 认领后在此之前其他worker不会再认领
+    claimed_by = db.Column(db.String(36), nullable=True, index=True)  # 本次认领的标识
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    @staticmethod
+    def rows_for(notification_type, channel, title, body, tokens, user_id=None, data=None, chunk_size=1000) -> List[dict]:
+        """把一条通知按token上限切分为发件箱行（字典形式，供批量INSERT）"""
+        tokens = list(dict.fromkeys(tokens))
+        now = datetime.utcnow()
+        return [{
+            'user_id': user_id,
+            'notification_type': notification_type,
+            'channel': channel,
+            'title': title,
+            'body': body,
+            'data': data,
+            'tokens': tokens[i:i + chunk_size],
+            'status': STATUS_PENDING,
+            'attempts': 0,
+            'next_attempt_at': now,
+            'created_at': now
+        } for i in range(0, len(tokens), chunk_size)]
+
+    @staticmethod
+    def add_rows(rows: List[dict]) -> int:
+        """批量写入发件箱（不提交，随调用方事务一起提交）"""
+        if rows:
+            db.session.execute(db.insert(NotificationOutbox), rows)
+        return len(rows)
+
+    @staticmethod
+    def claim(limit: int, lease_seconds: int) -> List['NotificationOutbox']:
+        """
+        认领一批到期的通知并提交租约
+
+        到期条件：待发送、已到重试时间、没有未过期的租约（worker崩溃后租约过期，行会被重新认领）。
+        Postgres 上候选行用 FOR UPDATE SKIP LOCKED 选出，并发的worker互不等待；
+        其他数据库依靠 UPDATE 条件中重新校验租约，只有一个worker能认领成功。
+        """
+        now = datetime.utcnow()
+        claimable = db.and_(
+            NotificationOutbox.status == STATUS_PENDING,
+            NotificationOutbox.next_attempt_at <= now,
+            db.or_(NotificationOutbox.lease_until.is_(None), NotificationOutbox.lease_until < now)
+        )
+
+        candidates = db.select(NotificationOutbox.id).where(claimable).order_by(
+            NotificationOutbox.next_attempt_at
+        ).limit(limit)
+        if db.session.get_bind().dialect.name == 'postgresql':
+            candidates = candidates.with_for_update(skip_locked=True)
+
+        ids = db.session.execute(candidates).scalars().all()
+        if not ids:
+            db.session.commit()
+            return []
+
+        claim_id = str(uuid.uuid4())
+        db.session.execute(
+            db.update(NotificationOutbox).where(
+                NotificationOutbox.id.in_(ids), claimable
+            ).values(
+                lease_until=now + timedelta(seconds=lease_seconds),
+                claimed_by=claim_id,
+                attempts=NotificationOutbox.attempts + 1
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        return NotificationOutbox.query.filter_by(claimed_by=claim_id).order_by(NotificationOutbox.id).all()
+
+    @staticmethod
+    def purge(days: int = 7) -> int:
+        """删除早于指定天数的已发送和已放弃的通知"""
+        deleted = NotificationOutbox.query.filter(
+            NotificationOutbox.status.in_([STATUS_SENT, STATUS_DEAD]),
+            NotificationOutbox.created_at < datetime.utcnow() - timedelta(days=days)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    @staticmethod
+    def counts() -> dict:
+        """各状态的通知数"""
+        rows = db.session.query(
+            NotificationOutbox.status, db.func.count(NotificationOutbox.id)
+        ).group_by(NotificationOutbox.status).all()
+        return {status: count for status, count in rows}
+
+    def __repr__(self):
+        return f'<NotificationOutbox {self.id}: {self.notification_type} {self.status} x{len(self.tokens or [])}>'
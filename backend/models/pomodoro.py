@@ -68,6 +68,7 @@ class PomodoroSession(db.Model):
     # 状态
     is_completed = db.Column(db.Boolean, default=False)
     is_paused = db.Column(db.Boolean, default=False)
+    is_expired = db.Column(db.Boolean, default=False, nullable=False, server_default=db.false())  # 暂停过久被清理
     
     # 关联任务（可选）
     task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=True)
@@ -82,6 +83,7 @@ class PomodoroSession(db.Model):
     __table_args__ = (
         db.Index('idx_user_session', 'user_id', 'start_time'),
         db.Index('idx_session_type', 'session_type'),
+        db.Index('idx_session_open', 'is_completed', 'is_expired'),
     )
     
     def __repr__(self):
@@ -100,6 +102,7 @@ class PomodoroSession(db.Model):
             'pause_time': self.pause_time.isoformat() if self.pause_time else None,
             'is_completed': self.is_completed,
             'is_paused': self.is_paused,
+            'is_expired': bool(self.is_expired),
             'task_id': self.task_id,
             'created_at': self.created_at.isoformat()
         }
@@ -134,6 +137,108 @@ class PomodoroStats(db.Model):
     def __repr__(self):
         return f'<PomodoroStats {self.user_id}-{self.date}>'
     
+    @staticmethod
+    def record_session(user_id, day, session_type, minutes):
+        """
+        将一次已完成的会话累加到当日汇总（单条UPSERT，由调用方提交事务）
+        
+        Args:
+            user_id: 用户ID
+            day: 会话所属日期（UTC）
+            session_type: work, short_break, long_break
+            minutes: 会话时长（分钟）
+        """
+        from models.upsert import increment_upsert
+        
+        is_work = session_type == 'work'
+        increment_upsert(
+            PomodoroStats,
+            {'user_id': user_id, 'date': day},
+            {
+                'total_sessions': 1,
+                'work_sessions': 1 if is_work else 0,
+                'break_sessions': 0 if is_work else 1,
+                'total_minutes': minutes or 0,
+                'completed_sessions': 1
+            },
+            updated_at=datetime.utcnow()
+        )
+    
+    @staticmethod
+    def summarize(user_id, start_date=None):
+        """汇总指定日期（含）之后的每日统计"""
+        query = db.session.query(
+            db.func.coalesce(db.func.sum(PomodoroStats.total_sessions), 0),
+            db.func.coalesce(db.func.sum(PomodoroStats.work_sessions), 0),
+            db.func.coalesce(db.func.sum(PomodoroStats.break_sessions), 0),
+            db.func.coalesce(db.func.sum(PomodoroStats.total_minutes), 0)
+        ).filter(PomodoroStats.user_id == user_id)
+        
+        if start_date:
+            query = query.filter(PomodoroStats.date >= start_date)
+        
+        total_sessions, work_sessions, break_sessions, total_minutes = query.one()
+        return {
+            'total_sessions': int(total_sessions),
+            'work_sessions': int(work_sessions),
+            'break_sessions': int(break_sessions),
+            'total_minutes': int(total_minutes)
+        }
+    
+    @staticmethod
+    def rebuild(user_id=None, chunk_size=1000):
+        """
+        根据历史会话重建每日汇总
+        
+        Args:
+            user_id: 只重建指定用户，None 表示全部用户
+            chunk_size: 每批写入的汇总行数
+        
+        Returns:
+            int: 写入的汇总行数
+        """
+        day = db.func.date(PomodoroSession.start_time)
+        is_work = db.case((PomodoroSession.session_type == 'work', 1), else_=0)
+        minutes = db.func.coalesce(db.func.nullif(PomodoroSession.actual_duration, 0), PomodoroSession.planned_duration)
+        
+        stmt = db.select(
+            PomodoroSession.user_id,
+            day.label('day'),
+            db.func.count(PomodoroSession.id),
+            db.func.sum(is_work),
+            db.func.sum(minutes)
+        ).filter_by(is_completed=True).group_by(PomodoroSession.user_id, day)
+        
+        delete_query = PomodoroStats.query
+        if user_id is not None:
+            stmt = stmt.filter(PomodoroSession.user_id == user_id)
+            delete_query = delete_query.filter_by(user_id=user_id)
+        delete_query.delete(synchronize_session=False)
+        
+        now = datetime.utcnow()
+        written = 0
+        result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            db.session.execute(PomodoroStats.__table__.insert(), [
+                {
+                    'user_id': row[0],
+                    # SQLite 的 date() 返回字符串
+                    'date': row[1] if not isinstance(row[1], str) else datetime.strptime(row[1], '%Y-%m-%d').date(),
+                    'total_sessions': row[2],
+                    'work_sessions': row[3] or 0,
+                    'break_sessions': row[2] - (row[3] or 0),
+                    'total_minutes': row[4] or 0,
+                    'completed_sessions': row[2],
+                    'created_at': now,
+                    'updated_at': now
+                }
+                for row in rows
+            ])
+            written += len(rows)
+        
+        db.session.commit()
+        return written
+    
     def to_dict(self):
         """转换为字典格式"""
         return {
@@ -138,19 +138,16 @@ class ProcrastinationStats(db.Model):
             
         self.total_procrastinations += 1
         
-        # 更新连续拖延天数
-        if (self.last_procrastination_date and 
-            (procrastination_date - self.last_procrastination_date).days == 1):
-            self.current_streak += 1
-        else:
-            self.current_streak = 1
-        
-        if self.current_streak > self.longest_streak:
-            self.longest_streak = self.current_streak
+        # 更新连续拖延天数（按日期区间计算，补录或乱序日期同样正确）
+        from .streak import ActivityStreak
+        streak = ActivityStreak.get_or_create(self.user_id, ActivityStreak.KIND_PROCRASTINATION)
+        streak.add_day(procrastination_date)
+        self.current_streak = streak.current_streak
+        self.longest_streak = streak.longest_streak
         
         # 更新最常用借口（简化版，实际应该查询数据库统计）
         self.most_common_reason = reason_type
-        self.last_procrastination_date = procrastination_date
+        self.last_procrastination_date = streak.last_active_date
     
     def to_dict(self):
         """转换为字典格式"""
@@ -147,5 +147,29 @@ class UserPushToken(db.Model):
             db.session.commit()
             return new_token
     
+    @staticmethod
+    def deactivate_tokens(tokens, chunk_size=500):
+        """
+        批量停用推送服务报告失效的token
+        
+        Returns:
+            set: 受影响的用户ID（调用方据此使偏好缓存失效）
+        """
+        tokens = list(set(tokens))
+        user_ids = set()
+        for i in range(0, len(tokens), chunk_size):
+            chunk = tokens[i:i + chunk_size]
+            user_ids.update(
+                row[0] for row in db.session.query(UserPushToken.user_id).filter(
+                    UserPushToken.token.in_(chunk),
+                    UserPushToken.is_active == True
+                ).distinct()
+            )
+            UserPushToken.query.filter(
+                UserPushToken.token.in_(chunk)
+            ).update({'is_active': False}, synchronize_session=False)
+        db.session.commit()
+        return user_ids
+    
     def __repr__(self):
         return f'<UserPushToken {self.id}: {self.platform.value} - {self.token[:20]}...>'
@@ -0,0 +1,30 @@
+"""
+频率限制令牌桶模型
+未配置Redis时多个worker共享的限流状态，每个限流键一行，检查只需一条按主键的UPSERT
+"""
+
+import time
+from . import db
+
+
+class RateLimitBucket(db.Model):
+    """限流令牌桶"""
+
+    __tablename__ = 'rate_limit_buckets'
+
+    key = db.Column(db.String(200), primary_key=True)  # 策略名:user:ID 或 策略名:ip:地址
+    tokens = db.Column(db.Float, nullable=False)       # 上次更新后剩余的令牌数
+    updated_at = db.Column(db.Float, nullable=False, index=True)  # 上次更新的Unix时间戳（秒）
+    allowed = db.Column(db.Boolean, nullable=False, default=True)  # 最近一次请求是否放行
+
+    @staticmethod
+    def purge(idle_seconds: int = 86400) -> int:
+        """删除长时间未访问的令牌桶（已回满，删除不影响限流结果）"""
+        deleted = RateLimitBucket.query.filter(
+            RateLimitBucket.updated_at < time.time() - idle_seconds
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def __repr__(self):
+        return f'<RateLimitBucket {self.key}: {self.tokens:.2f}>'
@@ -0,0 +1,242 @@
+"""
+连续天数模型
+以游程编码的日期区间保存用户的活跃日，支持任意日期乱序插入与即时查询连续天数
+"""
+
+from bisect import bisect_right
+from datetime import datetime, date
+from typing import List, Optional
+from sqlalchemy.orm.attributes import flag_modified
+from . import db
+
+
+class StreakTracker:
+    """
+    连续天数计算器（纯内存结构，不依赖数据库）
+
+    活跃日以互不相交、按起点升序排列的闭区间 [start, end] 保存，
+    单位为 date.toordinal()。插入任意日期为 O(log n) 定位 + 至多一次相邻区间合并，
+    当前/最长连续天数可直接读取。
+    """
+
+    def __init__(self, intervals: Optional[List[List[int]]] = None):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        for start, end in sorted(intervals or []):
+            self._starts.append(start)
+            self._ends.append(end)
+        self._longest = max((e - s + 1 for s, e in zip(self._starts, self._ends)), default=0)
+
+    @classmethod
+    def from_dates(cls, days) -> 'StreakTracker':
+        """从日期集合构建"""
+        tracker = cls()
+        for day in days:
+            tracker.add(day)
+        return tracker
+
+    def add(self, day: date) -> bool:
+        """
+        记录一个活跃日
+
+        Returns:
+            bool: 该日期此前是否未被记录
+        """
+        n = day.toordinal()
+        i = bisect_right(self._starts, n) - 1
+
+        # 已包含在某个区间内
+        if i >= 0 and self._ends[i] >= n:
+            return False
+
+        joins_left = i >= 0 and self._ends[i] == n - 1
+        joins_right = i + 1 < len(self._starts) and self._starts[i + 1] == n + 1
+
+        if joins_left and joins_right:
+            # 填补两个区间之间的空隙，合并为一个区间
+            self._ends[i] = self._ends[i + 1]
+            del self._starts[i + 1]
+            del self._ends[i + 1]
+            k = i
+        elif joins_left:
+            self._ends[i] = n
+            k = i
+        elif joins_right:
+            self._starts[i + 1] = n
+            k = i + 1
+        else:
+            self._starts.insert(i + 1, n)
+            self._ends.insert(i + 1, n)
+            k = i + 1
+
+        self._longest = max(self._longest, self._ends[k] - self._starts[k] + 1)
+        return True
+
+    def __contains__(self, day: date) -> bool:
+        n = day.toordinal()
+        i = bisect_right(self._starts, n) - 1
+        return i >= 0 and self._ends[i] >= n
+
+    @property
+    def last_day(self) -> Optional[date]:
+        """最近一个活跃日"""
+        return date.fromordinal(self._ends[-1]) if self._ends else None
+
+    @property
+    def longest(self) -> int:
+        """历史最长连续天数"""
+        return self._longest
+
+    def current(self, today: date = None) -> int:
+        """
+        当前连续天数（以最近一个活跃日结尾的区间长度）
+
+        Args:
+            today: 传入时要求连续区间延续到今天或昨天，否则视为已中断返回0
+        """
+        if not self._ends:
+            return 0
+        if today is not None and self._ends[-1] < today.toordinal() - 1:
+            return 0
+        return self._ends[-1] - self._starts[-1] + 1
+
+    def to_list(self) -> List[List[int]]:
+        """序列化为 [[start, end], ...]"""
+        return [[s, e] for s, e in zip(self._starts, self._ends)]
+
+
+class ActivityStreak(db.Model):
+    """用户活跃日连续天数模型（拖延日、专注日等共用）"""
+
+    __tablename__ = 'activity_streaks'
+
+    KIND_PROCRASTINATION = 'procrastination'
+    KIND_FOCUS = 'focus'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # procrastination, focus
+
+    intervals = db.Column(db.JSON, nullable=False, default=list)  # 活跃日区间 [[start_ordinal, end_ordinal], ...]
+    current_streak = db.Column(db.Integer, default=0)
+    longest_streak = db.Column(db.Integer, default=0)
+    last_active_date = db.Column(db.Date, nullable=True)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'kind', name='uq_activity_streak_user_kind'),
+    )
+
+    def __init__(self, user_id, kind, intervals=None):
+        self.user_id = user_id
+        self.kind = kind
+        self.intervals = intervals or []
+        self._apply(StreakTracker(self.intervals))
+
+    @property
+    def tracker(self) -> StreakTracker:
+        """当前区间对应的计算器"""
+        return StreakTracker(self.intervals)
+
+    def add_day(self, day: date) -> bool:
+        """
+        记录一个活跃日并刷新连续天数
+
+        日期不早于最后一个区间的起点时（常见情况：记录今天）只原地修改末尾区间，O(1)；
+        更早的乱序日期才重建计算器合并区间。
+        """
+        n = day.toordinal()
+        intervals = self.intervals or []
+        if intervals and n < intervals[-1][0]:
+            tracker = self.tracker
+            added = tracker.add(day)
+            if added:
+                self._apply(tracker)
+            return added
+
+        if intervals and n <= intervals[-1][1]:
+            return False  # 已包含在末尾区间内
+
+        if intervals and n == intervals[-1][1] + 1:
+            intervals[-1][1] = n
+        else:
+            intervals.append([n, n])
+        self.intervals = intervals
+        flag_modified(self, 'intervals')  # 原地修改JSON列需显式标记
+
+        start, end = intervals[-1]
+        self.current_streak = end - start + 1
+        self.longest_streak = max(self.longest_streak or 0, self.current_streak)
+        self.last_active_date = day
+        return True
+
+    def current(self, today: date = None) -> int:
+        """当前连续天数，传入today时已中断的连续记录返回0"""
+        if today is not None and self.last_active_date and self.last_active_date < date.fromordinal(today.toordinal() - 1):
+            return 0
+        return self.current_streak or 0
+
+    def _apply(self, tracker: StreakTracker):
+        # JSON列需整体赋值新对象才会被标记为已修改
+        self.intervals = tracker.to_list()
+        self.current_streak = tracker.current()
+        self.longest_streak = tracker.longest
+        self.last_active_date = tracker.last_day
+
+    @staticmethod
+    def get_or_create(user_id, kind):
+        """获取用户的连续天数记录，首次使用时根据历史数据一次性回填"""
+        streak = ActivityStreak.query.filter_by(user_id=user_id, kind=kind).first()
+        if streak:
+            return streak
+
+        tracker = StreakTracker.from_dates(ActivityStreak._history_days(user_id, kind))
+        streak = ActivityStreak(user_id=user_id, kind=kind, intervals=tracker.to_list())
+        db.session.add(streak)
+        return streak
+
+    @staticmethod
+    def _history_days(user_id, kind):
+        """查询历史活跃日（仅在首次创建时调用）"""
+        if kind == ActivityStreak.KIND_PROCRASTINATION:
+            from .procrastination_diary import ProcrastinationDiary
+            rows = db.session.query(ProcrastinationDiary.procrastination_date).filter_by(
+                user_id=user_id
+            ).distinct().all()
+            return [row[0] for row in rows if row[0]]
+
+        if kind == ActivityStreak.KIND_FOCUS:
+            from .pomodoro import PomodoroSession
+            rows = db.session.query(PomodoroSession.start_time).filter_by(
+                user_id=user_id,
+                session_type='work',
+                is_completed=True
+            ).all()
+            return {row[0].date() for row in rows if row[0]}
+
+        return []
+
+    @staticmethod
+    def empty_dict(kind):
+        """尚无记录时的默认值"""
+        return {
+            'kind': kind,
+            'current_streak': 0,
+            'longest_streak': 0,
+            'last_active_date': None,
+            'active_days': 0
+        }
+
+    def to_dict(self, today: date = None):
+        """转换为字典格式"""
+        return {
+            'kind': self.kind,
+            'current_streak': self.current(today),
+            'longest_streak': self.longest_streak or 0,
+            'last_active_date': self.last_active_date.isoformat() if self.last_active_date else None,
+            'active_days': sum(e - s + 1 for s, e in (self.intervals or []))
+        }
+
+    def __repr__(self):
+        return f'<ActivityStreak {self.user_id}-{self.kind}: {self.current_streak}/{self.longest_streak}>'
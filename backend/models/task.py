@@ -3,7 +3,7 @@
 定义任务和任务步骤的数据结构
 """
 
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from enum import Enum
 from . import db
 
@@ -107,6 +107,36 @@ class Task(db.Model):
             return False
         return self.due_date < date.today() and self.status != TaskStatus.COMPLETED
     
+    @staticmethod
+    def get_stats(user_id):
+        """单条聚合查询统计各状态任务数、今日新建数与本周完成数"""
+        today = date.today()
+        today_start = datetime.combine(today, datetime.min.time())
+        week_ago = today - timedelta(days=7)
+        
+        def count_if(condition):
+            return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+        
+        row = db.session.query(
+            db.func.count(Task.id),
+            count_if(Task.status == TaskStatus.PENDING),
+            count_if(Task.status == TaskStatus.IN_PROGRESS),
+            count_if(Task.status == TaskStatus.COMPLETED),
+            count_if(Task.created_at >= today_start),
+            count_if(db.and_(Task.status == TaskStatus.COMPLETED, Task.completed_at >= week_ago))
+        ).filter(Task.user_id == user_id).one()
+        
+        total_tasks, pending_tasks, in_progress_tasks, completed_tasks, today_tasks, week_completed = (int(v) for v in row)
+        return {
+            'total_tasks': total_tasks,
+            'pending_tasks': pending_tasks,
+            'in_progress_tasks': in_progress_tasks,
+            'completed_tasks': completed_tasks,
+            'today_tasks': today_tasks,
+            'week_completed': week_completed,
+            'completion_rate': round(completed_tasks / total_tasks * 100, 1) if total_tasks > 0 else 0
+        }
+    
     def to_dict(self, include_steps=False):
         """转换为字典格式"""
         data = {
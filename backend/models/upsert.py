@@ -0,0 +1,52 @@
+"""
+累加型UPSERT工具
+按唯一键插入一行，冲突时在数据库端对计数列做原子累加
+"""
+
+from sqlalchemy.exc import IntegrityError
+from . import db
+
+
+def increment_upsert(model, keys: dict, increments: dict, **extra_values):
+    """
+    单条语句完成「不存在则插入、存在则累加」
+
+    PostgreSQL/SQLite 使用 INSERT ... ON CONFLICT DO UPDATE，
+    其他数据库退化为 UPDATE 后按需 INSERT（唯一键冲突时重试一次 UPDATE）。
+
+    Args:
+        model: 模型类，keys 对应的列上必须有唯一约束
+        keys: 唯一键列及取值
+        increments: 需要累加的列及增量
+        extra_values: 冲突时直接覆盖的其他列（如 updated_at）
+    """
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table).values(**keys, **increments, **extra_values)
+        set_ = {name: table.c[name] + stmt.excluded[name] for name in increments}
+        set_.update({name: stmt.excluded[name] for name in extra_values})
+        stmt = stmt.on_conflict_do_update(index_elements=list(keys.keys()), set_=set_)
+        db.session.execute(stmt)
+        return
+
+    # 通用回退方案
+    where = [table.c[name] == value for name, value in keys.items()]
+    values = {name: table.c[name] + delta for name, delta in increments.items()}
+    values.update(extra_values)
+    update_stmt = table.update().where(*where).values(**values)
+    if db.session.execute(update_stmt).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**keys, **increments, **extra_values))
+    except IntegrityError:
+        # 并发插入已抢先完成，改为累加
+        db.session.execute(update_stmt)
@@ -4,7 +4,6 @@
 """
 
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from . import db
 
@@ -24,7 +23,7 @@ class User(UserMixin, db.Model):
     
     # 用户偏好设置
     theme_preference = db.Column(db.String(20), default='business')  # business/cute
-    timezone = db.Column(db.String(50), default='Asia/Shanghai')
+    timezone = db.Column(db.String(50), default='Asia/Shanghai', index=True)  # 定时提醒按时区分片扫描
     language = db.Column(db.String(10), default='zh-CN')
     
     # 账户状态
@@ -46,17 +45,24 @@ class User(UserMixin, db.Model):
         self.set_password(password)
     
     def set_password(self, password):
-        """设置密码哈希"""
-        self.password_hash = generate_password_hash(password)
+        """设置密码哈希（进程池繁忙时抛出 HasherBusy）"""
+        from services.password_hasher import get_password_hasher
+        self.password_hash = get_password_hasher().hash(password)
     
     def check_password(self, password):
-        """验证密码"""
-        return check_password_hash(self.password_hash, password)
+        """验证密码（进程池繁忙时抛出 HasherBusy）"""
+        from services.password_hasher import get_password_hasher
+        return get_password_hasher().verify(self.password_hash, password)
+    
+    def needs_rehash(self):
+        """密码哈希的算法参数是否已过时"""
+        from services.password_hasher import get_password_hasher
+        return get_password_hasher().needs_rehash(self.password_hash)
     
     def update_last_login(self):
-        """更新最后登录时间"""
-        self.last_login_at = datetime.utcnow()
-        db.session.commit()
+        """更新最后登录时间（写入缓冲，由后台线程批量落库）"""
+        from services.activity_buffer import activity_buffer
+        activity_buffer.record(self.id)
     
     def is_premium_active(self):
         """检查付费会员是否有效"""
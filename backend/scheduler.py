@@ -1,122 +1,231 @@
 """
 定时任务调度器
 处理拖延检测、提醒等定时任务
+
+用户按时区的当前UTC偏移分片，每个分片在本地时间22:00发送晚间提醒、00:01检查拖延任务，
+「今天」「昨天」按分片本地日期计算；每次只扫描当前分片的用户，负载分散到全天。
+
+多个进程同时运行调度循环时，只有选主成功的进程执行任务；每次执行记录在 job_runs 表，
+同一任务同一分片同一天只执行一次（主进程切换后也不会重复；
+执行中退出的主进程留下的运行中记录超时后由新主进程接管重试）。推荐以 `flask run-scheduler` 单独进程运行。
 """
 
-import schedule
 import time
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time as dt_time
 from flask import current_app
-from models.task import Task
+from models.task import Task, TaskStatus
+from models.user import User
 from models.procrastination_diary import ProcrastinationDiary, ProcrastinationReason
-from models.push_token import UserPushToken
+from models.job_run import JobRun
 from models import db
-from sqlalchemy import func
-from services.notification_service import notification_service
+from services.reminder_service import reminder_service, TimezoneBucket
+from services.notification_outbox import notification_outbox
+from services.metrics import metrics
+from services.leader_lock import LeaderLock
+from config import Config
+
+EVENING_REMINDER_AT = dt_time(22, 0)  # 分片本地时间
+OVERDUE_CHECK_AT = dt_time(0, 1)
+FIRE_WINDOW = timedelta(minutes=30)  # 调度线程停顿后，错过触发时间多久内仍补跑
+TIMEZONE_REFRESH_SECONDS = 600  # 用户时区列表的刷新间隔
+
+metrics.describe('scheduler_bucket_seconds', '定时任务单个时区分片的执行耗时')
 
 class TaskScheduler:
     """任务调度器类"""
-    
+
     def __init__(self, app=None):
         self.app = app
         self.running = False
         self.scheduler_thread = None
-        
+        self.lock = LeaderLock('task_scheduler')
+        self._stop_event = threading.Event()
+        self._fired = {}  # (任务名, 偏移分钟) -> 已执行的分片本地日期
+        self._timezones = None
+        self._timezones_loaded_at = 0.0
+
     def init_app(self, app):
         """初始化应用"""
         self.app = app
-        
+
     def start(self):
         """启动调度器"""
         if self.running:
             return
-            
+
         self.running = True
-        
-        # 设置定时任务
-        schedule.every().day.at("22:00").do(self.send_evening_reminder)  # 晚上10点提醒
-        schedule.every().day.at("00:01").do(self.check_overdue_tasks)    # 凌晨检查拖延任务
-        
+        self._stop_event.clear()
+
         # 在单独线程中运行调度器
         self.scheduler_thread = threading.Thread(target=self._run_scheduler, daemon=True)
         self.scheduler_thread.start()
-        
+
         print("任务调度器已启动")
-        
+
     def stop(self):
         """停止调度器"""
         self.running = False
-        schedule.clear()
+        self._stop_event.set()
+        with self.app.app_context():
+            self.lock.release()
         print("任务调度器已停止")
-        
+
     def _run_scheduler(self):
         """运行调度器的内部方法"""
         while self.running:
-            schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次
-            
-    def send_evening_reminder(self):
-        """发送晚上提醒（晚上10点）"""
+            self.tick()
+            self._stop_event.wait(Config.SCHEDULER_TICK_SECONDS)
+
+    def run_forever(self):
+        """在当前线程运行调度循环直到被中断（`flask run-scheduler` 使用）"""
+        self.running = True
+        self._stop_event.clear()
+        try:
+            self._run_scheduler()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def tick(self):
+        """续期选主锁；是主进程时检查哪些时区分片到了本地的提醒/检查时间"""
+        with self.app.app_context():
+            if self.lock.acquire():
+                self.run_due_buckets()
+
+    def _user_timezones(self):
+        """用户时区列表（定期刷新，新注册的时区最多延迟一个刷新间隔）"""
+        if self._timezones is None or time.monotonic() - self._timezones_loaded_at >= TIMEZONE_REFRESH_SECONDS:
+            self._timezones = reminder_service.user_timezones()
+            self._timezones_loaded_at = time.monotonic()
+        return self._timezones
+
+    def run_due_buckets(self, now=None):
+        """执行所有到了本地触发时间、且今天尚未执行的分片任务"""
         try:
             with self.app.app_context():
-                # 查找今天未完成的任务
-                today = datetime.now().date()
-                
-                incomplete_tasks = db.session.query(
-                    Task.user_id,
-                    func.count(Task.id).label('count')
-                ).filter(
-                    Task.completed == False,
-                    func.date(Task.created_at) == today
-                ).group_by(Task.user_id).all()
-                
-                print(f"晚上10点提醒: 发现 {len(incomplete_tasks)} 个用户有未完成任务")
-                
-                # 发送推送通知
-                success_count = 0
-                for user_id, task_count in incomplete_tasks:
-                    # 检查用户是否启用了晚间提醒
-                    active_tokens = UserPushToken.get_active_tokens_for_user(user_id, 'evening')
-                    if active_tokens:
-                        success = notification_service.send_evening_reminder(user_id, task_count)
-                        if success:
-                            success_count += 1
-                            print(f"用户 {user_id} 晚间提醒发送成功: {task_count} 个未完成任务")
-                        else:
-                            print(f"用户 {user_id} 晚间提醒发送失败")
-                    else:
-                        print(f"用户 {user_id} 未启用晚间提醒或无有效设备")
-                
-                print(f"晚间提醒发送完成: {success_count}/{len(incomplete_tasks)} 成功")
-                    
+                now = now or datetime.utcnow()
+                buckets = reminder_service.timezone_buckets(self._user_timezones(), now)
+
+                for bucket in buckets:
+                    local_now = bucket.local_now(now)
+                    for job, fire_at in ((self.send_evening_reminder, EVENING_REMINDER_AT),
+                                         (self.check_overdue_tasks, OVERDUE_CHECK_AT)):
+                        due = datetime.combine(local_now.date(), fire_at)
+                        key = (job.__name__, bucket.offset_minutes)
+                        if due <= local_now < due + FIRE_WINDOW and self._fired.get(key) != local_now.date():
+                            # 登记失败（数据库异常）或其他进程仍在执行时不标记，下一次调度循环再尝试
+                            if self._run_bucket(job, bucket, local_now.date()):
+                                self._fired[key] = local_now.date()
+        except Exception as e:
+            print(f"调度时区分片失败: {str(e)}")
+
+    def _run_bucket(self, job, bucket: TimezoneBucket, local_today) -> bool:
+        """
+        执行单个分片的任务，记录执行历史并报告耗时
+
+        Returns:
+            bool: 本进程已执行，或其他进程已成功执行（今天不必再尝试）；
+                  其他进程的执行记录仍为运行中时返回False，超时后由本进程接管
+        """
+        run_key = f'{job.__name__}:{bucket.label}:{local_today.isoformat()}'
+        run = JobRun.begin(job.__name__, run_key, self.lock.holder, stale_after=Config.SCHEDULER_RUN_TIMEOUT_SECONDS)
+        if run is None:
+            return JobRun.is_succeeded(run_key)
+
+        started = time.perf_counter()
+        processed, error = None, None
+        try:
+            processed = job(bucket, local_today)
+        except Exception as e:
+            error = str(e)
+        elapsed = time.perf_counter() - started
+        JobRun.finish(run.id, processed, error)
+
+        metrics.observe('scheduler_bucket_seconds', elapsed)
+        print(f"⏱️ {job.__name__} [{bucket.label}，{len(bucket.timezones)} 个时区，本地日期 {local_today}]: "
+              f"{'失败: ' + error if error else f'处理 {processed} 行'}，耗时 {elapsed:.2f} 秒")
+        return True
+
+    def send_evening_reminder(self, bucket: TimezoneBucket = None, local_today=None):
+        """
+        发送晚上提醒（分片本地时间晚上10点）
+
+        Args:
+            bucket: 时区分片（None 表示所有用户，按UTC日期计算今天）
+            local_today: 分片本地的今天
+
+        Returns:
+            int: 入队的设备数
+        """
+        try:
+            with self.app.app_context():
+                # 分片本地今天创建且未完成的任务，一条关联查询流式读出收件人与设备token
+                if bucket is None:
+                    today_start = datetime.combine(datetime.utcnow().date(), dt_time.min)
+                    day_range, timezones = (today_start, today_start + timedelta(days=1)), None
+                else:
+                    day_range, timezones = bucket.utc_day_range(local_today), bucket.timezones
+                recipients = reminder_service.evening_recipients(*day_range, timezones=timezones)
+                result = reminder_service.send_evening_reminders(recipients)
+
+                print(f"晚间提醒已入队: {result['users']} 个用户，{result['tokens']} 个设备，"
+                      f"发件箱 {result['queued']} 行")
+                return result['tokens']
+
         except Exception as e:
             print(f"发送晚上提醒失败: {str(e)}")
-            
-    def check_overdue_tasks(self):
-        """检查并标记超时任务（凌晨执行）"""
+            raise
+
+    def check_overdue_tasks(self, bucket: TimezoneBucket = None, local_today=None):
+        """
+        检查并标记超时任务（分片本地时间凌晨执行）
+
+        Args:
+            bucket: 时区分片（None 表示所有用户，按UTC日期计算昨天）
+            local_today: 分片本地的今天
+
+        Returns:
+            int: 新建的拖延记录数
+        """
         try:
             with self.app.app_context():
-                # 获取昨天的日期
-                yesterday = (datetime.now() - timedelta(days=1)).date()
-                
+                # 获取（分片本地的）昨天及其UTC起止时间
+                if bucket is None:
+                    yesterday = datetime.utcnow().date() - timedelta(days=1)
+                    yesterday_start = datetime.combine(yesterday, dt_time.min)
+                    day_range = (yesterday_start, yesterday_start + timedelta(days=1))
+                else:
+                    yesterday = local_today - timedelta(days=1)
+                    day_range = bucket.utc_day_range(yesterday)
+
                 # 查找昨天创建但未完成的任务
-                overdue_tasks = Task.query.filter(
-                    Task.completed == False,
-                    func.date(Task.created_at) == yesterday
-                ).all()
-                
+                query = Task.query.filter(
+                    Task.status.in_([TaskStatus.PENDING, TaskStatus.IN_PROGRESS]),
+                    Task.created_at >= day_range[0],
+                    Task.created_at < day_range[1]
+                )
+                if bucket is not None:
+                    query = query.join(User, User.id == Task.user_id).filter(
+                        reminder_service.timezone_filter(bucket.timezones)
+                    )
+                overdue_tasks = query.all()
+
                 print(f"凌晨检查: 发现 {len(overdue_tasks)} 个拖延任务")
-                
-                for task in overdue_tasks:
-                    # 检查是否已经有拖延记录
-                    existing_record = ProcrastinationDiary.query.filter(
-                        ProcrastinationDiary.user_id == task.user_id,
-                        ProcrastinationDiary.task_id == task.id,
+
+                # 已有拖延记录的任务一次查出，不再逐个查询
+                recorded = set()
+                task_ids = [task.id for task in overdue_tasks]
+                for i in range(0, len(task_ids), 500):
+                    recorded.update(row[0] for row in db.session.query(ProcrastinationDiary.task_id).filter(
+                        ProcrastinationDiary.task_id.in_(task_ids[i:i + 500]),
                         ProcrastinationDiary.procrastination_date == yesterday
-                    ).first()
-                    
-                    if not existing_record:
+                    ))
+
+                created = 0
+                for task in overdue_tasks:
+                    if task.id not in recorded:
                         # 创建拖延记录，等待用户输入原因
                         diary_entry = ProcrastinationDiary(
                             user_id=task.user_id,
@@ -125,22 +234,30 @@ class TaskScheduler:
                             reason_type=ProcrastinationReason.CUSTOM,  # 临时设置，等待用户选择
                             procrastination_date=yesterday
                         )
-                        
+
                         db.session.add(diary_entry)
-                        print(f"为任务 '{task.title}' 创建拖延记录")
-                
+                        created += 1
+
                 db.session.commit()
-                print("拖延任务检查完成")
-                
+                print(f"拖延任务检查完成: 新建 {created} 条拖延记录")
+                return created
+
         except Exception as e:
-            db.session.rollback()
             print(f"检查拖延任务失败: {str(e)}")
-            
+            raise
+
     def send_push_notification(self, user_id, message):
-        """发送推送通知（待实现）"""
-        # TODO: 实现推送通知功能
-        # 可以集成Firebase Cloud Messaging (FCM) 或 Apple Push Notification Service (APNs)
-        pass
+        """发送推送通知（写入发件箱，由后台worker发送并重试）"""
+        try:
+            with self.app.app_context():
+                template = Config.get_notification_template('default')
+                return notification_outbox.enqueue_for_user(
+                    user_id, 'default', template['title'], template['body_template'].format(message=message)
+                ) > 0
+        except Exception as e:
+            db.session.rollback()
+            print(f"发送推送通知失败: {str(e)}")
+            return False
 
 # 全局调度器实例
 scheduler = TaskScheduler()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+FCM批量推送基准测试
+在本地模拟服务上对比两种方式：逐token单发（原实现）与多播批次并发发送。
+逐token方式只抽样发送一部分token并按比例推算总耗时，避免基准本身跑太久。
+
+用法：
+    python scripts/benchmark_fcm_fanout.py --tokens 100000 --latency-ms 50 --parallel 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.mock_fcm_server import start_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FCM批量推送基准测试')
+    parser.add_argument('--tokens', type=int, default=100000)
+    parser.add_argument('--invalid-ratio', type=float, default=0.01, help='失效token比例')
+    parser.add_argument('--latency-ms', type=float, default=50, help='模拟服务每个请求的延迟')
+    parser.add_argument('--parallel', type=int, default=8, help='并发批次数')
+    parser.add_argument('--sample', type=int, default=200, help='逐token方式的抽样数')
+    args = parser.parse_args()
+
+    server, stats = start_server(latency_ms=args.latency_ms)
+    os.environ['FCM_URL'] = f'http://127.0.0.1:{server.server_address[1]}/fcm/send'
+    os.environ['FCM_SERVER_KEY'] = 'mock-server-key-for-benchmark'
+    os.environ['FCM_MAX_PARALLEL'] = str(args.parallel)
+
+    # 环境变量设置完成后再导入，使配置指向模拟服务
+    from services.notification_service import NotificationService
+    from services.fcm_fanout import FCMFanout, FanoutMessage
+
+    invalid_every = int(1 / args.invalid_ratio) if args.invalid_ratio else 0
+    tokens = [
+        f'invalid-{i}' if invalid_every and i % invalid_every == 0 else f'token-{i:08d}'
+        for i in range(args.tokens)
+    ]
+    service = NotificationService()
+
+    # 逐token单发（抽样）
+    sample = tokens[:args.sample]
+    started = time.perf_counter()
+    for token in sample:
+        service._send_fcm_notification(token, '基准测试', '逐token单发')
+    per_token = (time.perf_counter() - started) / max(len(sample), 1)
+    print(f"🐢 逐token单发: 抽样 {len(sample)} 个，平均 {per_token * 1000:.1f}ms/个，"
+          f"推算 {args.tokens} 个约 {per_token * args.tokens:.0f} 秒")
+
+    # 多播批次并发发送
+    fanout = FCMFanout(service=service, max_parallel=args.parallel)
+    before = stats.to_dict()
+    result = fanout.send([FanoutMessage('基准测试', '多播批量发送', tokens, 'evening_reminder')])
+    after = stats.to_dict()
+    print(f"🚀 多播并发发送: {result.to_dict()}")
+    print(f"📊 模拟服务收到 {after['requests'] - before['requests']} 个请求，"
+          f"{after['tokens'] - before['tokens']} 个token，拒绝 {after['rejected'] - before['rejected']} 个")
+
+    if result.elapsed > 0:
+        print(f"✅ 加速比约 {per_token * args.tokens / result.elapsed:.0f} 倍")
+
+    expected_invalid = sum(1 for token in tokens if token.startswith('invalid'))
+    if len(result.invalid_tokens) != expected_invalid or result.sent != len(tokens):
+        print(f"❌ 结果不一致: 失效token {len(result.invalid_tokens)}/{expected_invalid}，发送 {result.sent}/{len(tokens)}")
+        sys.exit(1)
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
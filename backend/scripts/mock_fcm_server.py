@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+本地FCM模拟服务（旧版HTTP接口 /fcm/send）
+接受 to 或 registration_ids 请求，按FCM的格式逐token返回结果；以 invalid 开头的token返回 NotRegistered。
+可模拟网络延迟，统计收到的请求数与token数，用于联调与批量推送压测。
+
+用法：
+    python scripts/mock_fcm_server.py --port 8765 --latency-ms 50
+    FCM_URL=http://127.0.0.1:8765/fcm/send FCM_SERVER_KEY=mock-server-key-for-tests python app.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_REGISTRATION_IDS = 1000
+
+
+class MockFCMStats:
+    """模拟服务统计（线程安全）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.tokens = 0
+        self.rejected = 0
+
+    def record(self, tokens: int, rejected: bool = False):
+        with self.lock:
+            self.requests += 1
+            self.tokens += tokens
+            self.rejected += int(rejected)
+
+    def to_dict(self):
+        with self.lock:
+            return {'requests': self.requests, 'tokens': self.tokens, 'rejected': self.rejected}
+
+
+def make_handler(stats: MockFCMStats, latency: float):
+    class MockFCMHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # 支持keep-alive
+
+        def log_message(self, format, *args):
+            pass  # 压测时不逐条打印请求日志
+
+        def _reply(self, status: int, body):
+            raw = json.dumps(body).encode('utf-8') if not isinstance(body, bytes) else body
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._reply(200, stats.to_dict())
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+
+            if not (self.headers.get('Authorization') or '').startswith('key='):
+                stats.record(0, rejected=True)
+                self._reply(401, b'Unauthorized')
+                return
+
+            tokens = payload.get('registration_ids') or ([payload['to']] if payload.get('to') else [])
+            if not tokens or len(tokens) > MAX_REGISTRATION_IDS:
+                stats.record(len(tokens), rejected=True)
+                self._reply(400, b'"registration_ids" field cannot be empty or exceed 1000 entries')
+                return
+
+            if latency:
+                time.sleep(latency)
+
+            results = [
+                {'error': 'NotRegistered'} if token.startswith('invalid') else {'message_id': f'0:{i}'}
+                for i, token in enumerate(tokens)
+            ]
+            failure = sum(1 for item in results if 'error' in item)
+            stats.record(len(tokens))
+            self._reply(200, {
+                'multicast_id': int(time.time() * 1000),
+                'success': len(tokens) - failure,
+                'failure': failure,
+                'canonical_ids': 0,
+                'results': results
+            })
+
+    return MockFCMHandler
+
+
+def start_server(host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0):
+    """在后台线程启动模拟服务，返回 (server, stats)；port=0 时自动分配端口"""
+    stats = MockFCMStats()
+    server = ThreadingHTTPServer((host, port), make_handler(stats, latency_ms / 1000))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地FCM模拟服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=50, help='每个请求模拟的处理延迟')
+    args = parser.parse_args()
+
+    server, stats = start_server(args.host, args.port, args.latency_ms)
+    print(f"🚀 FCM模拟服务已启动: http://{args.host}:{server.server_address[1]}/fcm/send")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"📊 {stats.to_dict()}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+注册接口并发压测
+对运行中的后端并发发起注册请求，统计吞吐量并校验正确性：
+第一阶段每个唯一用户并发发送若干个完全相同的请求（竞争同一用户名和邮箱），
+第二阶段并发发送只重复用户名或只重复邮箱的请求（此时原用户均已存在）。
+要求每个唯一用户名、邮箱恰好一次201，其余请求全部为409；
+429（注册限流或密码哈希排队已满）按 Retry-After 重试，不计入结果。
+
+用法（后端以 RATE_LIMIT_ENABLED=false 启动，避免同一IP的注册限流）：
+    python scripts/signup_load_test.py --base-url http://localhost:5001 --users 500 --workers 32
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def build_requests(users: int, duplicate_ratio: float):
+    """
+    生成注册请求
+
+    Returns:
+        (唯一用户, 第一阶段请求, 第二阶段请求)
+    """
+    run_id = ''.join(random.choices(string.ascii_lowercase, k=6))
+    unique = [
+        {'username': f'lt_{run_id}_{i}', 'email': f'lt_{run_id}_{i}@example.com', 'password': 'loadtest123'}
+        for i in range(users)
+    ]
+
+    # 第一阶段：原请求 + 完全相同的并发副本
+    racing = list(unique)
+    for _ in range(int(users * duplicate_ratio)):
+        racing.append(dict(random.choice(unique)))
+    random.shuffle(racing)
+
+    # 第二阶段：只重复用户名（新邮箱）或只重复邮箱（新用户名）
+    partial = []
+    for i in range(int(users * duplicate_ratio)):
+        original = random.choice(unique)
+        if i % 2 == 0:
+            partial.append(dict(original, email=f'dup_{i}_{original["email"]}'))
+        else:
+            partial.append(dict(original, username=f'lt_{run_id}_d{i}'))
+    random.shuffle(partial)
+    return unique, racing, partial
+
+
+def main():
+    parser = argparse.ArgumentParser(description='注册接口并发压测')
+    parser.add_argument('--base-url', default='http://localhost:5001')
+    parser.add_argument('--users', type=int, default=500, help='唯一用户数')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.5, help='重复请求占唯一用户数的比例')
+    parser.add_argument('--workers', type=int, default=32, help='并发线程数')
+    parser.add_argument('--max-retries', type=int, default=20, help='429响应的最大重试次数')
+    args = parser.parse_args()
+
+    unique, racing, partial = build_requests(args.users, args.duplicate_ratio)
+    url = args.base_url.rstrip('/') + '/api/auth/register'
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=args.workers, pool_maxsize=args.workers)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    throttled = Counter()
+
+    def register(payload):
+        started = time.perf_counter()
+        for _ in range(args.max_retries + 1):
+            response = session.post(url, json=payload, timeout=30)
+            if response.status_code != 429:
+                break
+            throttled['count'] += 1
+            time.sleep(min(float(response.headers.get('Retry-After') or 1), 5))
+        return payload, response.status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        racing_results = list(executor.map(register, racing))
+        partial_results = list(executor.map(register, partial))
+    elapsed = time.perf_counter() - started
+    results = racing_results + partial_results
+
+    statuses = Counter(status for _, status, _ in results)
+    latencies = sorted(latency for _, _, latency in results)
+    created_by_username = Counter(payload['username'] for payload, status, _ in results if status == 201)
+    created_by_email = Counter(payload['email'] for payload, status, _ in results if status == 201)
+
+    print(f"📊 请求数: {len(results)}，耗时 {elapsed:.2f} 秒，吞吐量 {len(results) / elapsed:.1f} 次/秒")
+    print(f"⏱️ 延迟 p50={latencies[len(latencies) // 2] * 1000:.0f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms")
+    print(f"📋 状态码分布: {dict(statuses)}")
+    if throttled['count']:
+        print(f"⚠️ 共 {throttled['count']} 次429已按 Retry-After 重试")
+
+    errors = []
+    unexpected = {status: count for status, count in statuses.items() if status not in (201, 409)}
+    if unexpected:
+        errors.append(f'存在201/409以外的状态码: {unexpected}')
+    missing = [user['username'] for user in unique if created_by_username[user['username']] != 1]
+    if missing:
+        errors.append(f'{len(missing)} 个用户名未恰好创建一次，例如 {missing[:3]}')
+    missing = [user['email'] for user in unique if created_by_email[user['email']] != 1]
+    if missing:
+        errors.append(f'{len(missing)} 个邮箱未恰好创建一次，例如 {missing[:3]}')
+    if sum(created_by_username.values()) != len(unique):
+        errors.append(f'201总数 {sum(created_by_username.values())} 与唯一用户数 {len(unique)} 不符')
+    if any(status != 409 for _, status, _ in partial_results):
+        errors.append('第二阶段存在未返回409的重复请求')
+
+    if errors:
+        for error in errors:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ 并发注册结果正确：每个用户名、邮箱恰好创建一次，其余请求均为409")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,9 @@
 服务层包初始化文件
 """
 
-from .ai_service import AIService
+from .ai_service import AIService, get_ai_service
 from .auth_service import AuthService
 from .cleanup_service import CleanupService
+from .registry import ServiceRegistry, registry
 
-__all__ = ['AIService', 'AuthService', 'CleanupService']
+__all__ = ['AIService', 'get_ai_service', 'AuthService', 'CleanupService', 'ServiceRegistry', 'registry']
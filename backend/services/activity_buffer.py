@@ -0,0 +1,122 @@
+"""
+用户活跃时间写缓冲
+登录请求只在内存中记录时间戳，后台线程定期把积累的时间戳合并为一条批量UPDATE写入 users.last_login_at，
+进程退出时再写一次。同一用户多次登录只保留最新时间，且只会把时间往后更新。
+"""
+
+import atexit
+import os
+import threading
+from datetime import datetime
+from typing import Dict
+
+from flask import current_app
+from sqlalchemy import text
+
+from config import Config
+from models import db
+
+FLUSH_BATCH_SIZE = 1000  # 单条 UPDATE ... FROM (VALUES ...) 的行数上限
+
+
+class ActivityBuffer:
+    """用户活跃时间写缓冲类"""
+
+    def __init__(self):
+        self.app = None
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def record(self, user_id, at: datetime = None):
+        """记录一次活跃（不访问数据库）"""
+        at = at or datetime.utcnow()
+        with self._lock:
+            user_id = int(user_id)
+            previous = self._pending.get(user_id)
+            if previous is None or previous < at:
+                self._pending[user_id] = at
+        self._ensure_started()
+
+    def flush(self) -> int:
+        """把缓冲的时间戳写入数据库，返回写入的用户数（需在应用上下文中调用）"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = sorted(pending.items())
+        try:
+            with db.engine.begin() as conn:
+                for i in range(0, len(rows), FLUSH_BATCH_SIZE):
+                    self._write(conn, rows[i:i + FLUSH_BATCH_SIZE])
+        except Exception:
+            # 写入失败时放回缓冲，下次再试（保留较新的时间）
+            with self._lock:
+                for user_id, at in pending.items():
+                    current = self._pending.get(user_id)
+                    if current is None or current < at:
+                        self._pending[user_id] = at
+            raise
+        return len(rows)
+
+    @staticmethod
+    def _write(conn, rows):
+        if conn.dialect.name == 'postgresql':
+            # 一条语句更新整批用户
+            values = ', '.join(f'(:id{i}, :at{i})' for i in range(len(rows)))
+            params = {}
+            for i, (user_id, at) in enumerate(rows):
+                params[f'id{i}'], params[f'at{i}'] = user_id, at
+            conn.execute(text(
+                f'UPDATE users SET last_login_at = v.at '
+                f'FROM (VALUES {values}) AS v(id, at) '
+                f'WHERE users.id = v.id AND (users.last_login_at IS NULL OR users.last_login_at < v.at)'
+            ), params)
+        else:
+            # SQLite 不支持带列名的 VALUES 别名，用同一事务内的 executemany
+            conn.execute(text(
+                'UPDATE users SET last_login_at = :at '
+                'WHERE id = :id AND (last_login_at IS NULL OR last_login_at < :at)'
+            ), [{'id': user_id, 'at': at} for user_id, at in rows])
+
+    # ==================== 后台线程 ====================
+
+    def _ensure_started(self):
+        """每个工作进程在首次记录时启动自己的刷新线程（fork后重新启动）"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self.app = current_app._get_current_object()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            self._pid = pid
+
+    def _run(self):
+        while not self._stop_event.wait(Config.ACTIVITY_FLUSH_INTERVAL):
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        if self.app is None:
+            return
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"活跃时间写入失败: {str(e)}")
+
+    def stop(self):
+        """停止刷新线程并写入剩余时间戳"""
+        self._stop_event.set()
+        self._flush_in_context()
+
+
+# 全局活跃时间写缓冲实例
+activity_buffer = ActivityBuffer()
+atexit.register(activity_buffer.stop)
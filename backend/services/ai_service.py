@@ -7,6 +7,7 @@ import openai
 import json
 from typing import List, Optional, Dict
 from config import Config
+from services.registry import registry
 
 # 导入增强版拖延分析器
 try:
@@ -17,64 +18,10 @@ try:
 except ImportError:
     EnhancedProcrastinationAnalyzer = None
 
-class AIService:
-    """AI任务拆解服务类"""
-    
-    def __init__(self):
-        self.api_key = Config.DASHSCOPE_API_KEY
-        self.model = Config.AI_MODEL
-        self.provider = Config.AI_PROVIDER
-        if self.api_key and self.provider == 'openai':
-            openai.api_key = self.api_key
-        
-        # 初始化增强版拖延分析器
-        self.enhanced_analyzer = EnhancedProcrastinationAnalyzer() if EnhancedProcrastinationAnalyzer else None
-    
-    def decompose_task(self, task_description: str, context: str = "", user_preferences: Dict = None) -> List[str]:
-        """
-        将任务拆解为具体的执行步骤
-        
-        Args:
-            task_description: 任务描述
-            context: 任务上下文
-            user_preferences: 用户偏好设置
-        
-        Returns:
-            List[str]: 拆解后的步骤列表
-        """
-        try:
-            # 如果没有配置OpenAI API Key，使用预设模板
-            if not self.api_key:
-                return self._get_template_steps(task_description)
-            
-            # 构建提示词
-            prompt = self._build_prompt(task_description, context, user_preferences)
-            
-            # 调用OpenAI API
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.7
-            )
-            
-            # 解析响应
-            content = response.choices[0].message.content.strip()
-            steps = self._parse_steps(content)
-            
-            return steps[:Config.MAX_TASK_STEPS]  # 限制最大步骤数
-            
-        except Exception as e:
-            print(f"AI拆解失败: {str(e)}")
-            # 降级到模板方案
-            return self._get_template_steps(task_description)
-    
-    def _get_system_prompt(self) -> str:
-        """获取系统提示词"""
-        return """你是一个「学生任务拆分专家」，专门将任何学习任务拆分为具体、可执行的步骤。
+# ==================== 提示词与映射表（模块加载时构建一次） ====================
+
+# 任务拆解系统提示词
+TASK_DECOMPOSE_SYSTEM_PROMPT = """你是一个「学生任务拆分专家」，专门将任何学习任务拆分为具体、可执行的步骤。
 
 **你的核心使命**：
 将任务拆分为具体、可执行的步骤，每个步骤需要包含：
@@ -134,6 +81,116 @@ class AIService:
    下一步：用手指扫描第1页剩余题目
 
 记住：每个步骤都必须像操作手册一样精确，让人能一步一步照着做！"""
+
+# CBT风格拖延分析系统提示词
+CBT_SYSTEM_PROMPT = """你是一位温柔、专业的认知行为治疗师，专门帮助有拖延问题的用户。请用温柔、理解和不带判断的语气进行分析。
+
+你的分析应该：
+1. 承认拖延是人之常情，不要让用户感到羞耻
+2. 帮助用户识别背后的认知模式和情绪
+3. 提供具体可行的应对策略
+4. 关注用户的情绪变化和心理状态
+5. 鼓励自我接纳和成长型思维
+
+请按以下格式返回分析结果（用|||分隔）：
+分析|||建议1;建议2;建议3|||心情调理建议
+
+分析部分应该包含对拖延行为的理解和背后原因的洞察。
+建议部分提供3个具体可行的改善策略，用分号分隔。
+心情调理部分关注用户的情绪健康。"""
+
+# 拖延模式分析系统提示词
+PATTERN_ANALYSIS_SYSTEM_PROMPT = """你是一位专业的认知行为治疗师，专门分析用户的拖延模式。请关注：
+
+1. 任务重复性：如果某个任务反复被拖延，这通常暗示更深层的问题
+2. 拖延原因的模式：用户是否经常用相同的理由拖延
+3. 情绪模式：拖延前后的心情变化趋势
+4. 提供深刻但温柔的洞察
+5. 给出切实可行的改善方案
+
+请按以下格式返回分析结果（用|||分隔）：
+深度分析|||实用建议1;实用建议2;实用建议3|||情绪关怀建议
+
+深度分析要揭示拖延背后的认知和情绪模式。
+实用建议要针对重复拖延的任务提供具体解决方案。
+情绪关怀建议要关注用户的心理健康。"""
+
+# 拖延原因 -> 中文描述
+REASON_DISPLAY_MAP = {
+    'too_tired': '太累了',
+    'dont_know_how': '不知道怎么做',
+    'not_in_mood': '没心情',
+    'too_difficult': '太难了',
+    'no_time': '没时间',
+    'distracted': '被打断了',
+    'not_important': '不重要',
+    'perfectionism': '想做到完美',
+    'fear_of_failure': '害怕失败',
+    'procrastination_habit': '习惯性拖延',
+    'custom': '其他原因'
+}
+
+# 心情评分 -> 中文描述
+MOOD_DISPLAY_MAP = {1: "很沮丧😢", 2: "有点低落😕", 3: "一般😐", 4: "还不错🙂", 5: "很开心😊"}
+
+class AIService:
+    """AI任务拆解服务类"""
+    
+    def __init__(self):
+        self.api_key = Config.DASHSCOPE_API_KEY
+        self.model = Config.AI_MODEL
+        self.provider = Config.AI_PROVIDER
+        if self.api_key and self.provider == 'openai':
+            openai.api_key = self.api_key
+        
+        # 增强版拖延分析器为进程级单例，由服务注册表统一构建
+        self.enhanced_analyzer = registry.get('procrastination_analyzer') if EnhancedProcrastinationAnalyzer else None
+    
+    def decompose_task(self, task_description: str, context: str = "", user_preferences: Dict = None) -> List[str]:
+        """
+        将任务拆解为具体的执行步骤
+        
+        Args:
+            task_description: 任务描述
+            context: 任务上下文
+            user_preferences: 用户偏好设置
+        
+        Returns:
+            List[str]: 拆解后的步骤列表
+        """
+        try:
+            # 如果没有配置OpenAI API Key，使用预设模板
+            if not self.api_key:
+                return self._get_template_steps(task_description)
+            
+            # 构建提示词
+            prompt = self._build_prompt(task_description, context, user_preferences)
+            
+            # 调用OpenAI API
+            response = openai.ChatCompletion.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self._get_system_prompt()},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=1000,
+                temperature=0.7
+            )
+            
+            # 解析响应
+            content = response.choices[0].message.content.strip()
+            steps = self._parse_steps(content)
+            
+            return steps[:Config.MAX_TASK_STEPS]  # 限制最大步骤数
+            
+        except Exception as e:
+            print(f"AI拆解失败: {str(e)}")
+            # 降级到模板方案
+            return self._get_template_steps(task_description)
+    
+    def _get_system_prompt(self) -> str:
+        """获取系统提示词"""
+        return TASK_DECOMPOSE_SYSTEM_PROMPT
     
     def _build_prompt(self, task_description: str, context: str, user_preferences: Dict) -> str:
         """构建用户提示词"""
@@ -374,41 +431,12 @@ class AIService:
     
     def _get_cbt_system_prompt(self) -> str:
         """获取CBT风格的系统提示词"""
-        return """你是一位温柔、专业的认知行为治疗师，专门帮助有拖延问题的用户。请用温柔、理解和不带判断的语气进行分析。
-
-你的分析应该：
-1. 承认拖延是人之常情，不要让用户感到羞耻
-2. 帮助用户识别背后的认知模式和情绪
-3. 提供具体可行的应对策略
-4. 关注用户的情绪变化和心理状态
-5. 鼓励自我接纳和成长型思维
-
-请按以下格式返回分析结果（用|||分隔）：
-分析|||建议1;建议2;建议3|||心情调理建议
-
-分析部分应该包含对拖延行为的理解和背后原因的洞察。
-建议部分提供3个具体可行的改善策略，用分号分隔。
-心情调理部分关注用户的情绪健康。"""
+        return CBT_SYSTEM_PROMPT
     
     def _build_cbt_analysis_prompt(self, task_title: str, reason_type: str, custom_reason: str = None, mood_before: int = None, mood_after: int = None) -> str:
         """构建CBT分析的用户提示词"""
         
-        # 原因映射
-        reason_map = {
-            'too_tired': '太累了',
-            'dont_know_how': '不知道怎么做',
-            'not_in_mood': '没心情',
-            'too_difficult': '太难了',
-            'no_time': '没时间',
-            'distracted': '被打断了',
-            'not_important': '不重要',
-            'perfectionism': '想做到完美',
-            'fear_of_failure': '害怕失败',
-            'procrastination_habit': '习惯性拖延',
-            'custom': '其他原因'
-        }
-        
-        reason_text = reason_map.get(reason_type, reason_type)
+        reason_text = REASON_DISPLAY_MAP.get(reason_type, reason_type)
         if reason_type == 'custom' and custom_reason:
             reason_text = custom_reason
         
@@ -416,12 +444,10 @@ class AIService:
         mood_desc_after = ""
         
         if mood_before:
-            mood_map = {1: "很沮丧😢", 2: "有点低落😕", 3: "一般😐", 4: "还不错🙂", 5: "很开心😊"}
-            mood_desc_before = f"拖延前心情：{mood_map.get(mood_before, '未知')}"
+            mood_desc_before = f"拖延前心情：{MOOD_DISPLAY_MAP.get(mood_before, '未知')}"
         
         if mood_after:
-            mood_map = {1: "很沮丧😢", 2: "有点低落😕", 3: "一般😐", 4: "还不错🙂", 5: "很开心😊"}
-            mood_desc_after = f"记录后心情：{mood_map.get(mood_after, '未知')}"
+            mood_desc_after = f"记录后心情：{MOOD_DISPLAY_MAP.get(mood_after, '未知')}"
         
         prompt = f"""用户刚刚记录了一次拖延行为，需要你提供温柔的CBT风格分析：
 
@@ -463,21 +489,7 @@ class AIService:
     def _get_template_single_analysis(self, task_title: str, reason_type: str, custom_reason: str = None, mood_before: int = None, mood_after: int = None) -> Dict[str, str]:
         """获取单次拖延的模板分析"""
         
-        reason_map = {
-            'too_tired': '太累了',
-            'dont_know_how': '不知道怎么做', 
-            'not_in_mood': '没心情',
-            'too_difficult': '太难了',
-            'no_time': '没时间',
-            'distracted': '被打断了',
-            'not_important': '不重要',
-            'perfectionism': '想做到完美',
-            'fear_of_failure': '害怕失败',
-            'procrastination_habit': '习惯性拖延',
-            'custom': '其他原因'
-        }
-        
-        reason_text = reason_map.get(reason_type, reason_type)
+        reason_text = REASON_DISPLAY_MAP.get(reason_type, reason_type)
         if reason_type == 'custom' and custom_reason:
             reason_text = custom_reason
         
@@ -543,22 +555,24 @@ class AIService:
         
         return template
     
-    def analyze_procrastination_patterns(self, recent_records: List[Dict], task_repetition_data: Dict) -> Dict[str, str]:
+    def analyze_procrastination_patterns(self, recent_records: List[Dict], task_repetition_data: Dict, cohort_insights: List[str] = None, focus_hint: str = None) -> Dict[str, str]:
         """
         分析最近7天的拖延模式，包括任务重复性分析
         
         Args:
             recent_records: 最近的拖延记录列表
             task_repetition_data: 任务重复性数据，格式如 {"背单词": 3, "写作业": 2}
+            cohort_insights: 群体统计结论（来自 cohort_insights 汇总表），用于对比参考
+            focus_hint: 用户专注高峰时段描述（来自专注热力图）
         
         Returns:
             Dict: 包含深度分析和建议的结果
         """
         try:
             if not self.api_key:
-                return self._get_template_pattern_analysis(recent_records, task_repetition_data)
+                return self._get_template_pattern_analysis(recent_records, task_repetition_data, focus_hint)
             
-            prompt = self._build_pattern_analysis_prompt(recent_records, task_repetition_data)
+            prompt = self._build_pattern_analysis_prompt(recent_records, task_repetition_data, cohort_insights, focus_hint)
             
             response = openai.ChatCompletion.create(
                 model=self.model,
@@ -575,26 +589,13 @@ class AIService:
             
         except Exception as e:
             print(f"模式分析失败: {str(e)}")
-            return self._get_template_pattern_analysis(recent_records, task_repetition_data)
+            return self._get_template_pattern_analysis(recent_records, task_repetition_data, focus_hint)
     
     def _get_pattern_analysis_system_prompt(self) -> str:
         """获取模式分析的系统提示词"""
-        return """你是一位专业的认知行为治疗师，专门分析用户的拖延模式。请关注：
-
-1. 任务重复性：如果某个任务反复被拖延，这通常暗示更深层的问题
-2. 拖延原因的模式：用户是否经常用相同的理由拖延
-3. 情绪模式：拖延前后的心情变化趋势
-4. 提供深刻但温柔的洞察
-5. 给出切实可行的改善方案
-
-请按以下格式返回分析结果（用|||分隔）：
-深度分析|||实用建议1;实用建议2;实用建议3|||情绪关怀建议
-
-深度分析要揭示拖延背后的认知和情绪模式。
-实用建议要针对重复拖延的任务提供具体解决方案。
-情绪关怀建议要关注用户的心理健康。"""
+        return PATTERN_ANALYSIS_SYSTEM_PROMPT
     
-    def _build_pattern_analysis_prompt(self, recent_records: List[Dict], task_repetition_data: Dict) -> str:
+    def _build_pattern_analysis_prompt(self, recent_records: List[Dict], task_repetition_data: Dict, cohort_insights: List[str] = None, focus_hint: str = None) -> str:
         """构建模式分析提示词"""
         
         # 整理拖延记录信息
@@ -622,6 +623,18 @@ class AIService:
 3. 可能的认知偏差和情绪模式
 4. 针对重复拖延任务的根本性解决方案"""
         
+        if cohort_insights:
+            prompt += f"""
+
+供参考的群体统计（来自全体用户的匿名汇总）：
+{chr(10).join(cohort_insights)}"""
+        
+        if focus_hint:
+            prompt += f"""
+
+用户的专注高峰时段：{focus_hint}
+请结合这些时段，建议用户把反复拖延的任务安排在专注状态最好的时候。"""
+        
         return prompt
     
     def _parse_pattern_analysis(self, content: str) -> Dict[str, str]:
@@ -649,7 +662,7 @@ class AIService:
             'mood_advice': '理解自己的行为模式是改变的第一步，你已经做得很好了。'
         }
     
-    def _get_template_pattern_analysis(self, recent_records: List[Dict], task_repetition_data: Dict) -> Dict[str, str]:
+    def _get_template_pattern_analysis(self, recent_records: List[Dict], task_repetition_data: Dict, focus_hint: str = None) -> Dict[str, str]:
         """获取模式分析的模板结果"""
         
         # 分析重复任务
@@ -713,8 +726,23 @@ class AIService:
                 '建立适合自己的奖励机制，庆祝每一个小进步'
             ]
         
+        # 结合专注热力图安排任务时间
+        if focus_hint:
+            suggestions.insert(0, f'你通常在{focus_hint}最专注，试着把最容易拖延的任务安排在这些时段')
+        
         return {
             'analysis': ' '.join(analysis_parts),
             'suggestions': suggestions[:3],  # 限制为3个建议
             'mood_advice': '通过记录和反思，你已经在改善的路上了。记住，改变需要时间，对自己耐心一些。每一次的自我觉察都是宝贵的进步。'
         }
+
+
+# 注册进程级单例：首次使用时在当前工作进程内构建
+if EnhancedProcrastinationAnalyzer:
+    registry.register('procrastination_analyzer', EnhancedProcrastinationAnalyzer)
+registry.register('ai_service', AIService)
+
+
+def get_ai_service() -> AIService:
+    """获取当前进程共享的AI服务实例"""
+    return registry.get('ai_service')
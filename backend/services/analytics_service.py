@@ -0,0 +1,289 @@
+"""
+群体分析服务
+分块流式读取拖延日记与任务表，转换为NumPy列式数组后计算跨用户统计，
+结果写入 cohort_insights 汇总表；时间段按用户所在时区的本地时间划分
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+from models import db
+from models.user import User
+from models.task import Task, TaskStatus
+from models.procrastination_diary import ProcrastinationDiary, ProcrastinationReason
+from models.insight import CohortInsight
+from services.reminder_service import DEFAULT_TIMEZONE, timezone_offset_minutes
+from enhanced_procrastination_analyzer import TASK_CLASSIFIER, TASK_TYPE_KEYWORDS, TIME_OF_DAY_BINS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+REASONS = [reason.value for reason in ProcrastinationReason]
+REASON_LABELS = {item['value']: item['label'] for item in ProcrastinationDiary.get_available_reasons()}
+TASK_TYPES = list(TASK_TYPE_KEYWORDS.keys()) + ['general']
+TASK_TYPE_LABELS = {
+    'creative': '创造类',
+    'analytical': '分析类',
+    'routine': '日常事务',
+    'learning': '学习类',
+    'social': '社交类',
+    'general': '其他'
+}
+WEEKDAYS = ['周一', '周二', '周三', '周四', '周五', '周六', '周日']
+# TIME_OF_DAY_BINS 划分出的5个桶，首尾两个同属深夜
+TIME_OF_DAY_ORDER = ['morning', 'afternoon', 'evening', 'night']
+TIME_OF_DAY_LABELS = {'morning': '早晨', 'afternoon': '下午', 'evening': '晚上', 'night': '深夜'}
+_BUCKET_TO_TIME_OF_DAY = [3, 0, 1, 2, 3]
+
+# 每批读取行数
+CHUNK_SIZE = 5000
+# 生成结论所需的最少样本数与最低提升度
+MIN_SUPPORT = 20
+MIN_LIFT = 1.2
+
+INSIGHT_KEYS = (
+    'reason_task_weekday',
+    'reason_time_of_day',
+    'reason_by_task_type',
+    'task_type_completion',
+    'highlights'
+)
+
+
+class AnalyticsService:
+    """群体分析服务类"""
+
+    def __init__(self):
+        self._reason_index = {reason: i for i, reason in enumerate(REASONS)}
+        self._type_index = {task_type: i for i, task_type in enumerate(TASK_TYPES)}
+
+    def _classify_titles(self, titles: List[str], cache: Dict[str, int]) -> 'np.ndarray':
+        """任务标题 -> 任务类型序号（同一批次内缓存重复标题）"""
+        result = np.empty(len(titles), dtype=np.int8)
+        for i, title in enumerate(titles):
+            idx = cache.get(title)
+            if idx is None:
+                idx = self._type_index[TASK_CLASSIFIER.classify((title or '').lower())['type']]
+                cache[title] = idx
+            result[i] = idx
+        return result
+
+    @staticmethod
+    def _offsets(timezones: List[str], cache: Dict[str, int], now: datetime) -> 'np.ndarray':
+        """用户时区 -> 当前相对UTC的偏移分钟数（为空或无法识别的时区按默认时区处理）"""
+        result = np.empty(len(timezones), dtype=np.int16)
+        for i, tz_name in enumerate(timezones):
+            offset = cache.get(tz_name)
+            if offset is None:
+                offset = timezone_offset_minutes(tz_name, now)
+                if offset is None:
+                    offset = timezone_offset_minutes(DEFAULT_TIMEZONE, now) or 0
+                cache[tz_name] = offset
+            result[i] = offset
+        return result
+
+    def _stream(self, stmt, chunk_size: int):
+        """使用服务端游标分块读取"""
+        result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            yield rows
+
+    def compute(self, chunk_size: int = CHUNK_SIZE) -> Dict:
+        """
+        计算全部群体统计并写入汇总表
+
+        Returns:
+            Dict: 各统计项的记录数
+        """
+        if np is None:
+            raise RuntimeError('群体分析需要安装 numpy')
+
+        n_reasons, n_types = len(REASONS), len(TASK_TYPES)
+        title_cache: Dict[str, int] = {}
+        offset_cache: Dict[str, int] = {}
+        now = datetime.utcnow()
+
+        # 原因 × 任务类型 × 星期
+        reason_type_weekday = np.zeros((n_reasons, n_types, 7), dtype=np.int64)
+        # 原因 × 时间段
+        reason_tod = np.zeros((n_reasons, len(TIME_OF_DAY_ORDER)), dtype=np.int64)
+        diary_rows = 0
+
+        diary_stmt = db.select(
+            ProcrastinationDiary.reason_type,
+            ProcrastinationDiary.task_title,
+            ProcrastinationDiary.procrastination_date,
+            ProcrastinationDiary.created_at,
+            User.timezone
+        ).outerjoin(User, User.id == ProcrastinationDiary.user_id).order_by(ProcrastinationDiary.id)
+
+        for rows in self._stream(diary_stmt, chunk_size):
+            reason_idx = np.fromiter((self._reason_index[r[0].value] for r in rows), dtype=np.int8, count=len(rows))
+            type_idx = self._classify_titles([r[1] for r in rows], title_cache)
+            weekday = np.fromiter((r[2].weekday() for r in rows), dtype=np.int8, count=len(rows))
+            minutes = np.fromiter(
+                (r[3].hour * 60 + r[3].minute if r[3] else -1 for r in rows), dtype=np.int16, count=len(rows)
+            )
+
+            np.add.at(reason_type_weekday, (reason_idx, type_idx, weekday), 1)
+
+            # created_at 为UTC，按用户时区换算为本地小时后再划分时间段
+            known = minutes >= 0
+            offsets = self._offsets([r[4] for r in rows], offset_cache, now)
+            hours = (minutes[known] + offsets[known]) % (24 * 60) // 60
+            tod_idx = np.take(_BUCKET_TO_TIME_OF_DAY, np.digitize(hours, TIME_OF_DAY_BINS))
+            np.add.at(reason_tod, (reason_idx[known], tod_idx), 1)
+
+            diary_rows += len(rows)
+
+        # 任务类型 × 完成情况
+        type_totals = np.zeros(n_types, dtype=np.int64)
+        type_completed = np.zeros(n_types, dtype=np.int64)
+        task_rows = 0
+
+        task_stmt = db.select(Task.title, Task.status).order_by(Task.id)
+        for rows in self._stream(task_stmt, chunk_size):
+            type_idx = self._classify_titles([r[0] for r in rows], title_cache)
+            completed = np.fromiter((r[1] == TaskStatus.COMPLETED for r in rows), dtype=bool, count=len(rows))
+            type_totals += np.bincount(type_idx, minlength=n_types)
+            type_completed += np.bincount(type_idx[completed], minlength=n_types)
+            task_rows += len(rows)
+
+        payloads = {
+            'reason_task_weekday': self._reason_task_weekday_payload(reason_type_weekday),
+            'reason_time_of_day': self._reason_time_of_day_payload(reason_tod),
+            'reason_by_task_type': self._reason_by_task_type_payload(reason_type_weekday.sum(axis=2)),
+            'task_type_completion': self._task_type_completion_payload(
+                type_totals, type_completed, reason_type_weekday.sum(axis=(0, 2))
+            ),
+        }
+        payloads['highlights'] = self._highlights(payloads)
+
+        sizes = {
+            'reason_task_weekday': diary_rows,
+            'reason_time_of_day': int(reason_tod.sum()),
+            'reason_by_task_type': diary_rows,
+            'task_type_completion': task_rows,
+            'highlights': diary_rows,
+        }
+        for key, payload in payloads.items():
+            CohortInsight.save(key, payload, sizes[key])
+        db.session.commit()
+
+        return sizes
+
+    def _reason_task_weekday_payload(self, counts) -> Dict:
+        """原因 × 任务类型 × 星期 计数（省略全零的组合）"""
+        cells = {}
+        for r, reason in enumerate(REASONS):
+            for t, task_type in enumerate(TASK_TYPES):
+                row = counts[r, t]
+                if row.any():
+                    cells.setdefault(reason, {})[task_type] = row.tolist()
+        return {'weekdays': WEEKDAYS, 'counts': cells}
+
+    def _reason_time_of_day_payload(self, counts) -> Dict:
+        """
+        原因 × 时间段 计数与提升度
+        lift = P(时间段 | 原因) / P(时间段)，大于1说明该原因更集中在此时间段
+        """
+        total = counts.sum()
+        result = {'time_of_day': TIME_OF_DAY_ORDER, 'counts': {}, 'lift': {}}
+        if total == 0:
+            return result
+
+        overall = counts.sum(axis=0) / total
+        row_totals = counts.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            conditional = np.where(row_totals > 0, counts / row_totals, 0.0)
+            lift = np.where(overall > 0, conditional / overall, 0.0)
+
+        for r, reason in enumerate(REASONS):
+            if row_totals[r, 0] == 0:
+                continue
+            result['counts'][reason] = counts[r].tolist()
+            result['lift'][reason] = np.round(lift[r], 3).tolist()
+        return result
+
+    def _reason_by_task_type_payload(self, counts) -> Dict:
+        """各任务类型内的拖延原因占比"""
+        type_totals = counts.sum(axis=0)
+        result = {}
+        for t, task_type in enumerate(TASK_TYPES):
+            if type_totals[t] == 0:
+                continue
+            shares = counts[:, t] / type_totals[t]
+            result[task_type] = {
+                'total': int(type_totals[t]),
+                'mix': {REASONS[r]: round(float(shares[r]), 4) for r in np.flatnonzero(counts[:, t])}
+            }
+        return result
+
+    def _task_type_completion_payload(self, totals, completed, procrastinations) -> Dict:
+        """任务类型与完成率、拖延次数的对应关系，以及两者的相关系数"""
+        result = {'by_type': {}, 'correlation': None}
+        for t, task_type in enumerate(TASK_TYPES):
+            if totals[t] == 0:
+                continue
+            result['by_type'][task_type] = {
+                'tasks': int(totals[t]),
+                'completion_rate': round(float(completed[t] / totals[t]), 4),
+                'procrastinations_per_task': round(float(procrastinations[t] / totals[t]), 4)
+            }
+
+        # 各任务类型的「人均拖延次数」与「完成率」之间的皮尔逊相关系数
+        present = totals > 0
+        if present.sum() >= 3:
+            rates = completed[present] / totals[present]
+            per_task = procrastinations[present] / totals[present]
+            if rates.std() > 0 and per_task.std() > 0:
+                result['correlation'] = round(float(np.corrcoef(per_task, rates)[0, 1]), 4)
+        return result
+
+    def _highlights(self, payloads: Dict) -> List[str]:
+        """将显著的统计结果整理为可直接放入提示词的中文结论"""
+        highlights = []
+
+        tod = payloads['reason_time_of_day']
+        for reason, lifts in tod['lift'].items():
+            if sum(tod['counts'][reason]) < MIN_SUPPORT:
+                continue
+            best = max(range(len(lifts)), key=lambda i: lifts[i])
+            if lifts[best] >= MIN_LIFT:
+                highlights.append(
+                    f"因「{REASON_LABELS.get(reason, reason)}」拖延的用户，"
+                    f"在{TIME_OF_DAY_LABELS[TIME_OF_DAY_ORDER[best]]}拖延的比例是平均水平的{lifts[best]:.1f}倍"
+                )
+
+        for task_type, info in payloads['reason_by_task_type'].items():
+            if info['total'] < MIN_SUPPORT or not info['mix']:
+                continue
+            reason, share = max(info['mix'].items(), key=lambda item: item[1])
+            highlights.append(
+                f"{TASK_TYPE_LABELS[task_type]}任务最常见的拖延原因是「{REASON_LABELS.get(reason, reason)}」（占{share:.0%}）"
+            )
+
+        return highlights
+
+    @staticmethod
+    def get_insights() -> Dict:
+        """读取已计算的群体统计"""
+        return CohortInsight.get_payloads(INSIGHT_KEYS)
+
+    @staticmethod
+    def get_prompt_highlights(limit: int = 5) -> List[str]:
+        """读取可放入AI提示词的群体结论"""
+        try:
+            payloads = CohortInsight.get_payloads(['highlights'])
+        except Exception as e:
+            # 汇总表尚未创建或查询失败时不影响个人分析
+            print(f"读取群体洞察失败: {str(e)}")
+            db.session.rollback()
+            return []
+        return (payloads.get('highlights') or [])[:limit]
+
+
+# 全局群体分析服务实例
+analytics_service = AnalyticsService()
@@ -8,7 +8,7 @@ import hashlib
 import secrets
 from datetime import datetime, timedelta
 from typing import Optional, Dict
-from models.user import User, db
+from models.user import User
 from config import Config
 
 class AuthService:
@@ -105,18 +105,16 @@ class AuthService:
     
     @staticmethod
     def update_user_activity(user_id: int):
-        """更新用户活动时间"""
-        user = User.query.get(user_id)
-        if user:
-            user.last_login_at = datetime.utcnow()
-            db.session.commit()
+        """更新用户活动时间（写入缓冲，由后台线程批量落库）"""
+        from services.activity_buffer import activity_buffer
+        activity_buffer.record(user_id)
     
     @staticmethod
     def check_rate_limit(user_id: int, action: str, limit: int = 100, window: int = 3600) -> bool:
-        """检查用户操作频率限制"""
-        # 这里可以实现基于Redis的频率限制
-        # 暂时返回True，表示允许操作
-        return True
+        """检查用户操作频率限制（window 秒内最多 limit 次，令牌桶平滑补充）"""
+        from services.rate_limiter import get_rate_limiter, RatePolicy
+        result = get_rate_limiter().hit(f'{action}:user:{user_id}', RatePolicy(limit=limit, period=window))
+        return result.allowed
     
     @staticmethod
     def log_security_event(user_id: int, event_type: str, details: Dict = None):
@@ -0,0 +1,193 @@
+"""
+应用启动数据服务
+把首页需要的资料、偏好、今日语录、今日任务、任务统计、番茄钟统计、拖延统计、仪表盘汇总合并为一次请求。
+每个分区单独缓存；缓存未命中的分区在PostgreSQL上并发查询（各自独立的应用上下文与会话），SQLite上顺序执行。
+"""
+
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from flask import current_app
+
+from config import Config
+from models import db
+from models.user import User
+from models.task import Task
+from models.pomodoro import PomodoroStats
+from models.streak import ActivityStreak
+from models.procrastination_diary import ProcrastinationStats
+from models.dashboard import UserDashboard
+from services.cache_backend import get_cache
+from services.preferences_service import preferences_service
+from services.quote_service import quote_service
+
+# 分区缓存时长（秒），写接口会主动失效对应分区
+SECTION_TTLS = {
+    'profile': 300,
+    'preferences': 0,  # 由偏好服务自行缓存
+    'daily_quote': 300,
+    'today_tasks': 60,
+    'task_stats': 60,
+    'pomodoro_stats': 60,
+    'procrastination_stats': 300,
+    'dashboard': 0  # 单行按用户ID读取，写路径同步维护，无需缓存
+}
+SECTIONS = tuple(SECTION_TTLS.keys())
+TODAY_TASKS_LIMIT = 50
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=Config.BOOTSTRAP_WORKERS, thread_name_prefix='bootstrap')
+    return _executor
+
+
+def fingerprint(data) -> str:
+    """分区内容指纹（客户端可据此判断分区是否变化）"""
+    body = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()[:16]
+
+
+class BootstrapService:
+    """应用启动数据服务类"""
+
+    @staticmethod
+    def _key(section: str, user_id) -> str:
+        return f'bootstrap:{section}:{user_id}'
+
+    def invalidate(self, user_id, *sections: str):
+        """写接口提交后调用，使对应分区缓存失效（不指定时全部失效）"""
+        get_cache().delete(*[self._key(section, user_id) for section in (sections or SECTIONS)])
+
+    # ==================== 分区构建（每个分区固定1条查询） ====================
+
+    def _profile(self, user_id):
+        user = db.session.get(User, int(user_id))
+        return user.to_dict(include_sensitive=True) if user else None
+
+    def _preferences(self, user_id):
+        return preferences_service.get(user_id)
+
+    def _daily_quote(self, user_id, language=None):
+        return quote_service.get_daily(user_id, language=language)
+
+    def _today_tasks(self, user_id):
+        today_start = datetime.combine(date.today(), datetime.min.time())
+        tasks = Task.query.filter(
+            Task.user_id == user_id,
+            Task.created_at >= today_start
+        ).order_by(Task.created_at.desc()).limit(TODAY_TASKS_LIMIT).all()
+        return [task.to_dict() for task in tasks]
+
+    def _task_stats(self, user_id):
+        return Task.get_stats(user_id)
+
+    def _pomodoro_stats(self, user_id):
+        today = date.today()
+        summary = PomodoroStats.summarize(user_id, today)
+        streak = ActivityStreak.query.filter_by(user_id=user_id, kind=ActivityStreak.KIND_FOCUS).first()
+        total_sessions, total_minutes = summary['total_sessions'], summary['total_minutes']
+        return dict(
+            summary,
+            period='today',
+            total_hours=round(total_minutes / 60, 1),
+            average_session_length=round(total_minutes / total_sessions, 1) if total_sessions > 0 else 0,
+            focus_streak=streak.to_dict(today=today) if streak else None
+        )
+
+    def _procrastination_stats(self, user_id):
+        stats = ProcrastinationStats.query.filter_by(user_id=user_id).first()
+        if not stats:
+            return {
+                'user_id': int(user_id),
+                'total_procrastinations': 0,
+                'most_common_reason': None,
+                'current_streak': 0,
+                'longest_streak': 0,
+                'last_procrastination_date': None,
+                'updated_at': None
+            }
+        return stats.to_dict()
+
+    def _dashboard(self, user_id):
+        dashboard = UserDashboard.query.filter_by(user_id=user_id).first()
+        return (dashboard or UserDashboard.compute(user_id)).to_dict()
+
+    # ==================== 组装 ====================
+
+    def _build_section(self, section: str, user_id, language=None):
+        if section == 'daily_quote':
+            return self._daily_quote(user_id, language)
+        return getattr(self, f'_{section}')(user_id)
+
+    def _build_in_context(self, app, section: str, user_id, language=None):
+        """在独立的应用上下文（独立数据库会话）中构建分区"""
+        with app.app_context():
+            try:
+                return self._build_section(section, user_id, language)
+            finally:
+                db.session.remove()
+
+    def build(self, user_id, sections: Optional[Iterable[str]] = None) -> Dict:
+        """
+        组装启动数据
+
+        Returns:
+            dict: {'sections': {分区: 数据}, 'versions': {分区: 指纹}}
+        """
+        sections = [section for section in (sections or SECTIONS) if section in SECTION_TTLS]
+        cache = get_cache()
+        result, missing = {}, []
+        for section in sections:
+            data = cache.get(self._key(section, user_id)) if SECTION_TTLS[section] else None
+            if data is None:
+                missing.append(section)
+            else:
+                result[section] = data
+
+        # 语录依赖用户语言，先取偏好（通常已缓存）
+        language = None
+        if 'daily_quote' in missing:
+            preferences = result.get('preferences') or preferences_service.get(user_id)
+            language = preferences['language'] if preferences else None
+
+        result.update(self._build_missing(missing, user_id, language))
+
+        for section in missing:
+            ttl = SECTION_TTLS[section]
+            if ttl and result.get(section) is not None:
+                cache.set(self._key(section, user_id), result[section], ttl)
+
+        return {
+            'sections': {section: result.get(section) for section in sections},
+            'versions': {section: fingerprint(result.get(section)) for section in sections}
+        }
+
+    def _build_missing(self, missing: List[str], user_id, language=None) -> Dict:
+        if not missing:
+            return {}
+
+        concurrent = (
+            len(missing) > 1
+            and Config.BOOTSTRAP_WORKERS > 1
+            and db.session.get_bind().dialect.name != 'sqlite'  # SQLite 写锁与文件连接不适合并发读
+        )
+        if not concurrent:
+            return {section: self._build_section(section, user_id, language) for section in missing}
+
+        app = current_app._get_current_object()
+        futures = {
+            section: _get_executor().submit(self._build_in_context, app, section, user_id, language)
+            for section in missing
+        }
+        return {section: future.result() for section, future in futures.items()}
+
+
+# 全局启动数据服务实例
+bootstrap_service = BootstrapService()
@@ -0,0 +1,111 @@
+"""
+缓存后端
+单进程使用进程内TTL缓存；配置 REDIS_URL 后多个worker共享Redis
+"""
+
+import json
+import threading
+import time
+from typing import Any, Optional
+
+from config import Config
+from services.registry import registry
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class LocalCache:
+    """进程内TTL缓存（线程安全）"""
+
+    def __init__(self, max_entries: int = 10000):
+        self._data = {}
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if len(self._data) >= self._max_entries and key not in self._data:
+                self._evict()
+            self._data[key] = (value, expires_at)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def _evict(self):
+        """先清理过期项，仍然超限时丢弃最早写入的一批"""
+        now = time.monotonic()
+        expired = [k for k, (_, exp) in self._data.items() if exp is not None and exp < now]
+        for key in expired:
+            del self._data[key]
+        if len(self._data) >= self._max_entries:
+            for key in list(self._data.keys())[:max(self._max_entries // 10, 1)]:
+                del self._data[key]
+
+
+class RedisCache:
+    """Redis缓存（值以JSON序列化，多worker共享）"""
+
+    def __init__(self, url: str, prefix: str = 'pai:'):
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    @property
+    def client(self):
+        return self._client
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(self._prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        self._client.set(self._prefix + key, json.dumps(value, ensure_ascii=False), ex=ttl)
+
+    def delete(self, *keys: str):
+        if keys:
+            self._client.delete(*[self._prefix + key for key in keys])
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self._prefix + '*'):
+            self._client.delete(key)
+
+
+def _create_cache():
+    """根据配置选择缓存后端，Redis不可用时退回进程内缓存"""
+    if Config.REDIS_URL and redis is not None:
+        try:
+            cache = RedisCache(Config.REDIS_URL)
+            cache.client.ping()
+            print("✅ 使用Redis共享缓存")
+            return cache
+        except Exception as e:
+            print(f"⚠️ Redis不可用，使用进程内缓存: {str(e)}")
+    return LocalCache()
+
+
+registry.register('cache', _create_cache)
+
+
+def get_cache():
+    """获取当前进程的缓存后端"""
+    return registry.get('cache')
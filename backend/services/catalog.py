@@ -0,0 +1,98 @@
+"""
+静态目录缓存
+主题颜色、拖延借口、任务模板等几乎不变的接口数据只序列化一次，保存为预编码的JSON字节与内容指纹，
+响应时直接输出并带上 ETag / Cache-Control，客户端携带 If-None-Match 时返回304。
+"""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+from flask import Response, request
+
+from services.cache_backend import get_cache
+
+PUBLIC_CACHE_CONTROL = 'public, max-age=86400, stale-while-revalidate=604800'
+PRIVATE_CACHE_CONTROL = 'private, max-age=3600'
+VERSION_CHECK_INTERVAL = 30  # 秒，检查其他进程是否使目录失效
+
+
+class CatalogEntry:
+    """一份预编码的目录数据"""
+
+    __slots__ = ('body', 'etag', 'payload', 'token', 'built_at')
+
+    def __init__(self, payload, token: Optional[str]):
+        self.payload = payload
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.token = token
+        self.built_at = time.monotonic()
+
+
+class Catalog:
+    """静态目录注册表类"""
+
+    def __init__(self):
+        self._builders: Dict[str, Callable] = {}
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.RLock()  # 构建函数可能读取其他目录
+
+    @staticmethod
+    def _version_key(name: str) -> str:
+        return f'catalog:version:{name}'
+
+    def register(self, name: str, builder: Callable):
+        """注册目录构建函数（返回可JSON序列化的数据）"""
+        self._builders[name] = builder
+        self._entries.pop(name, None)
+
+    def get(self, name: str) -> CatalogEntry:
+        """获取预编码目录；其他进程使其失效后在下次检查时重建"""
+        entry = self._entries.get(name)
+        now = time.monotonic()
+        if entry is not None and now - self._checked_at.get(name, 0.0) < VERSION_CHECK_INTERVAL:
+            return entry
+
+        with self._lock:
+            token = get_cache().get(self._version_key(name))
+            entry = self._entries.get(name)
+            if entry is None or entry.token != token:
+                entry = CatalogEntry(self._builders[name](), token)
+                self._entries[name] = entry
+            self._checked_at[name] = now
+            return entry
+
+    def payload(self, name: str):
+        """目录的原始数据（只读，调用方不得修改）"""
+        return self.get(name).payload
+
+    def invalidate(self, name: str):
+        """数据源变化时调用：本进程立即丢弃，其他进程通过共享版本号感知"""
+        get_cache().set(self._version_key(name), uuid.uuid4().hex)
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def warm(self):
+        """启动时预先构建全部目录（失败的目录在首次请求时重试）"""
+        for name in list(self._builders):
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"⚠️ 目录 {name} 预构建失败: {str(e)}")
+
+    def respond(self, name: str, cache_control: str = PUBLIC_CACHE_CONTROL) -> Response:
+        """输出预编码目录，ETag 命中时返回304"""
+        entry = self.get(name)
+        response = Response(entry.body, mimetype='application/json')
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = cache_control
+        return response.make_conditional(request)
+
+
+# 全局目录注册表实例
+catalog = Catalog()
@@ -0,0 +1,161 @@
+"""
+数据导出服务
+以服务端游标分批读取用户历史数据，逐块生成JSONL/CSV，可选即时gzip压缩
+"""
+
+import csv
+import io
+import json
+import zlib
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from models import db
+from models.task import Task
+from models.procrastination_diary import ProcrastinationDiary
+from models.pomodoro import PomodoroSession
+
+# 可导出的数据类型 -> (模型, 排序字段)
+EXPORT_SOURCES = {
+    'tasks': (Task, Task.id),
+    'diary': (ProcrastinationDiary, ProcrastinationDiary.id),
+    'pomodoro': (PomodoroSession, PomodoroSession.id),
+}
+
+# CSV列（各类型字段的并集，record_type 标明行的来源）
+CSV_COLUMNS = {
+    'tasks': ['id', 'title', 'description', 'status', 'priority', 'total_steps', 'completed_steps',
+              'progress_percentage', 'is_overdue', 'created_at', 'updated_at', 'completed_at', 'due_date'],
+    'diary': ['id', 'task_id', 'task_title', 'reason_type', 'reason_display', 'custom_reason',
+              'mood_before', 'mood_after', 'procrastination_date', 'created_at'],
+    'pomodoro': ['id', 'task_id', 'session_type', 'planned_duration', 'actual_duration', 'start_time',
+                 'end_time', 'pause_time', 'is_completed', 'is_paused', 'created_at'],
+}
+
+SUPPORTED_FORMATS = ('jsonl', 'csv')
+
+# 每批从数据库读取的行数
+FETCH_SIZE = 500
+# 输出块大小，攒够后再交给WSGI服务器发送
+CHUNK_SIZE = 64 * 1024
+
+
+class ExportService:
+    """数据导出服务类"""
+
+    @staticmethod
+    def parse_types(raw: str) -> List[str]:
+        """
+        解析 types 参数
+
+        Raises:
+            ValueError: 包含不支持的数据类型
+        """
+        if not raw:
+            return list(EXPORT_SOURCES.keys())
+
+        types = []
+        for name in raw.split(','):
+            name = name.strip()
+            if not name:
+                continue
+            if name not in EXPORT_SOURCES:
+                raise ValueError(f'不支持的导出类型: {name}')
+            if name not in types:
+                types.append(name)
+        return types
+
+    @staticmethod
+    def iter_records(user_id, types: List[str]) -> Iterator[Tuple[str, Dict]]:
+        """按类型依次流式读取记录，yield_per 保证内存中只保留一批ORM对象"""
+        for record_type in types:
+            model, order_column = EXPORT_SOURCES[record_type]
+            stmt = (
+                db.select(model)
+                .filter_by(user_id=user_id)
+                .order_by(order_column)
+                .execution_options(yield_per=FETCH_SIZE)
+            )
+            for obj in db.session.execute(stmt).scalars():
+                yield record_type, obj.to_dict()
+            # 释放本类型加载的对象，避免身份映射无限增长
+            db.session.expunge_all()
+
+    @staticmethod
+    def iter_jsonl(records: Iterable[Tuple[str, Dict]]) -> Iterator[str]:
+        """每条记录一行JSON"""
+        for record_type, data in records:
+            data = dict(data, record_type=record_type)
+            yield json.dumps(data, ensure_ascii=False, default=str) + '\n'
+
+    @staticmethod
+    def iter_csv(records: Iterable[Tuple[str, Dict]], types: List[str]) -> Iterator[str]:
+        """所有类型共用一个表头，缺失字段留空"""
+        columns = ['record_type']
+        for record_type in types:
+            for column in CSV_COLUMNS[record_type]:
+                if column not in columns:
+                    columns.append(column)
+
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for record_type, data in records:
+            writer.writerow(dict(data, record_type=record_type))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        remaining = buffer.getvalue()
+        if remaining:
+            yield remaining
+
+    @staticmethod
+    def chunked(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """将小片段合并为固定大小的字节块"""
+        buffer = []
+        size = 0
+        for piece in pieces:
+            data = piece.encode('utf-8')
+            buffer.append(data)
+            size += len(data)
+            if size >= chunk_size:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+        if buffer:
+            yield b''.join(buffer)
+
+    @staticmethod
+    def gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """即时gzip压缩（wbits=31 输出带gzip头的流）"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def generate(self, user_id, types: List[str], fmt: str = 'jsonl', use_gzip: bool = False) -> Iterator[bytes]:
+        """
+        生成导出数据流
+
+        Args:
+            user_id: 用户ID
+            types: 导出的数据类型
+            fmt: jsonl 或 csv
+            use_gzip: 是否gzip压缩
+
+        Returns:
+            Iterator[bytes]: 可直接作为流式响应体的字节块
+        """
+        records = self.iter_records(user_id, types)
+        if fmt == 'csv':
+            pieces = self.iter_csv(records, types)
+        else:
+            pieces = self.iter_jsonl(records)
+
+        chunks = self.chunked(pieces)
+        return self.gzipped(chunks) if use_gzip else chunks
+
+
+# 全局导出服务实例
+export_service = ExportService()
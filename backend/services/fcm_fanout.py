@@ -0,0 +1,157 @@
+"""
+FCM批量推送
+把同一条通知的目标token按FCM单次上限（1000）切成多播批次，经 send_fcm_notification 的 registration_ids 路径发送；
+批次在有界线程池中并发执行，共用通知服务的连接池。返回逐token的失效与可重试信息，供调用方停用过期设备、安排重试。
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from config import Config
+from services.metrics import metrics
+from services.notification_service import notification_service
+
+# FCM 返回这些错误时token已永久失效
+INVALID_TOKEN_ERRORS = {'NotRegistered', 'InvalidRegistration', 'MismatchSenderId'}
+# 这些错误是暂时性的，稍后可对同一token重试
+RETRYABLE_TOKEN_ERRORS = {'Unavailable', 'InternalServerError', 'DeviceMessageRateExceeded'}
+
+metrics.describe('fcm_batch_seconds', 'FCM单个多播批次的请求耗时')
+metrics.describe('fcm_tokens_sent_total', '已提交给FCM的token数')
+metrics.describe('fcm_tokens_failed_total', 'FCM报告发送失败的token数')
+
+
+@dataclass
+class FanoutMessage:
+    """一条待发送的通知及其目标token"""
+    title: str
+    body: str
+    tokens: List[str]
+    notification_type: str = 'default'
+    data: Optional[Dict] = None
+
+
+@dataclass
+class FanoutResult:
+    """批量推送结果"""
+    batches: int = 0
+    sent: int = 0
+    success: int = 0
+    failure: int = 0
+    failed_batches: int = 0
+    invalid_tokens: List[str] = field(default_factory=list)
+    retry_tokens: List[str] = field(default_factory=list)  # 暂时性失败、可重试的token
+    error: Optional[str] = None  # 最近一次失败原因
+    elapsed: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'batches': self.batches,
+            'sent': self.sent,
+            'success': self.success,
+            'failure': self.failure,
+            'failed_batches': self.failed_batches,
+            'invalid_tokens': len(self.invalid_tokens),
+            'retry_tokens': len(self.retry_tokens),
+            'elapsed': round(self.elapsed, 3)
+        }
+
+
+class FCMFanout:
+    """FCM批量推送类"""
+
+    def __init__(self, service=None, batch_size: int = None, max_parallel: int = None):
+        self.service = service or notification_service
+        self.batch_size = batch_size or Config.FCM_BATCH_SIZE
+        self.max_parallel = max_parallel or Config.FCM_MAX_PARALLEL
+        self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix='fcm')
+        return self._executor
+
+    def _batches(self, messages: List[FanoutMessage]):
+        """按消息切分批次，同一批次只含同一条通知的token（去重）"""
+        for index, message in enumerate(messages):
+            tokens = list(dict.fromkeys(message.tokens))
+            for i in range(0, len(tokens), self.batch_size):
+                yield index, message, tokens[i:i + self.batch_size]
+
+    def _send_batch(self, message: FanoutMessage, tokens: List[str]) -> Dict:
+        started = time.perf_counter()
+        result = self.service.send_fcm_notification(
+            tokens, message.title, message.body, message.notification_type, message.data
+        )
+        metrics.observe('fcm_batch_seconds', time.perf_counter() - started)
+        return result
+
+    def send_each(self, messages: Iterable[FanoutMessage]) -> List[FanoutResult]:
+        """并发发送所有批次，阻塞直到全部完成；按消息分别返回结果（顺序与 messages 一致）"""
+        messages = list(messages)
+        started = time.perf_counter()
+        results = [FanoutResult() for _ in messages]
+        executor = self._get_executor()
+
+        futures = [
+            (results[index], tokens, executor.submit(self._send_batch, message, tokens))
+            for index, message, tokens in self._batches(messages)
+        ]
+        for summary, tokens, future in futures:
+            summary.batches += 1
+            summary.sent += len(tokens)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            self._collect(summary, tokens, result)
+
+        elapsed = time.perf_counter() - started
+        for summary in results:
+            summary.elapsed = elapsed
+        metrics.inc('fcm_tokens_sent_total', sum(summary.sent for summary in results))
+        metrics.inc('fcm_tokens_failed_total', sum(summary.failure for summary in results))
+        return results
+
+    def send(self, messages: Iterable[FanoutMessage]) -> FanoutResult:
+        """并发发送所有批次，返回合并后的结果"""
+        total = FanoutResult()
+        for summary in self.send_each(messages):
+            total.batches += summary.batches
+            total.sent += summary.sent
+            total.success += summary.success
+            total.failure += summary.failure
+            total.failed_batches += summary.failed_batches
+            total.invalid_tokens.extend(summary.invalid_tokens)
+            total.retry_tokens.extend(summary.retry_tokens)
+            total.elapsed = summary.elapsed
+            total.error = summary.error or total.error
+        return total
+
+    @staticmethod
+    def _collect(summary: FanoutResult, tokens: List[str], result: Dict):
+        """汇总单个批次的结果；FCM的 results 与 registration_ids 顺序一一对应"""
+        if not result.get('success'):
+            summary.failed_batches += 1
+            summary.failure += len(tokens)
+            summary.retry_tokens.extend(tokens)
+            summary.error = str(result.get('error'))[:500]
+            print(f"FCM批次发送失败（{len(tokens)} 个token）: {result.get('error')}")
+            return
+
+        response = result.get('response') or {}
+        summary.success += response.get('success', 0)
+        summary.failure += response.get('failure', 0)
+        for token, item in zip(tokens, response.get('results') or []):
+            error = item.get('error')
+            if error in INVALID_TOKEN_ERRORS:
+                summary.invalid_tokens.append(token)
+            elif error in RETRYABLE_TOKEN_ERRORS:
+                summary.retry_tokens.append(token)
+                summary.error = error
+
+
+# 全局FCM批量推送实例
+fcm_fanout = FCMFanout()
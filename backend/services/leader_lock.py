@@ -0,0 +1,119 @@
+"""
+调度器选主
+多个进程（gunicorn worker、独立的调度进程）同时运行调度循环时，只有持有锁的进程执行定时任务。
+Postgres 上使用会话级 advisory lock，锁绑定在一条专用连接上，进程退出或连接断开即自动释放；
+其他数据库使用 job_leases 表中的租约行，持有者每次调度循环续期，超时未续期则由其他进程接管。
+"""
+
+import hashlib
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from config import Config
+from models import db
+from models.job_run import JobLease
+
+
+class LeaderLock:
+    """调度器选主锁类"""
+
+    def __init__(self, name: str, lease_seconds: int = None):
+        self.name = name
+        self.lease_seconds = lease_seconds or Config.SCHEDULER_LEASE_SECONDS
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.is_leader = False
+        self._conn = None  # 持有 advisory lock 的专用连接
+
+    @property
+    def advisory_key(self) -> int:
+        """锁名对应的64位 advisory lock 键"""
+        return int.from_bytes(hashlib.sha1(self.name.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+    def acquire(self) -> bool:
+        """尝试成为（或继续作为）主进程，需在应用上下文中调用；每次调度循环调用一次以续期"""
+        try:
+            if db.engine.dialect.name == 'postgresql':
+                leader = self._acquire_advisory()
+            else:
+                leader = self._acquire_lease()
+        except Exception as e:
+            db.session.rollback()
+            print(f"调度器选主失败: {str(e)}")
+            leader = False
+
+        if leader != self.is_leader:
+            print(f"调度器 {self.holder} {'成为主进程' if leader else '不再是主进程'}")
+        self.is_leader = leader
+        return leader
+
+    def _acquire_advisory(self) -> bool:
+        if self._conn is not None:
+            try:
+                self._conn.execute(text('SELECT 1'))
+                self._conn.commit()
+                return True
+            except Exception:
+                # 连接已断开，锁随之释放，重新竞争
+                self._close()
+
+        conn = db.engine.connect()
+        acquired = conn.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': self.advisory_key}).scalar()
+        conn.commit()  # 会话级锁不随事务结束释放，提交避免连接停留在事务中
+        if acquired:
+            self._conn = conn
+        else:
+            conn.close()
+        return bool(acquired)
+
+    def _acquire_lease(self) -> bool:
+        now = datetime.utcnow()
+        values = {'holder': self.holder, 'lease_until': now + timedelta(seconds=self.lease_seconds), 'renewed_at': now}
+
+        # 续期自己的租约，或接管已过期的租约
+        updated = JobLease.query.filter(
+            JobLease.name == self.name,
+            db.or_(JobLease.holder == self.holder, JobLease.lease_until < now)
+        ).update(values, synchronize_session=False)
+        if updated:
+            db.session.commit()
+            return True
+
+        db.session.rollback()
+        if db.session.get(JobLease, self.name) is not None:
+            db.session.rollback()
+            return False
+
+        try:
+            db.session.add(JobLease(name=self.name, **values))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()  # 其他进程同时创建了租约
+            return False
+
+    def release(self):
+        """主动释放锁（进程正常退出时调用，其他进程无需等待租约过期）"""
+        try:
+            if self._conn is not None:
+                self._conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': self.advisory_key})
+                self._conn.commit()
+                self._close()
+            elif self.is_leader:
+                JobLease.query.filter_by(name=self.name, holder=self.holder).delete(synchronize_session=False)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"释放调度器锁失败: {str(e)}")
+        self.is_leader = False
+
+    def _close(self):
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
@@ -0,0 +1,93 @@
+"""
+进程内指标
+计数器与耗时直方图，按Prometheus文本格式导出（每个worker进程各自统计）
+"""
+
+import bisect
+import threading
+from typing import Dict, Tuple
+
+# 耗时直方图的桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    """固定桶直方图"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'total')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+
+class Metrics:
+    """进程内指标类"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[str, _Histogram] = {}
+        self._help: Dict[str, str] = {}
+
+    def describe(self, name: str, help_text: str):
+        """登记指标说明"""
+        self._help[name] = help_text
+
+    def inc(self, name: str, amount: float = 1):
+        """计数器累加"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """记录一次观测值（通常为耗时秒数）"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def snapshot(self) -> Dict:
+        """当前指标快照（计数器与直方图的次数、总和）"""
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': {
+                    name: {'count': h.count, 'sum': round(h.total, 6)}
+                    for name, h in self._histograms.items()
+                }
+            }
+
+    def render(self) -> str:
+        """导出为Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} counter')
+                lines.append(f'{name} {value}')
+
+            for name, h in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f'# TYPE {name} histogram')
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {h.count}')
+                lines.append(f'{name}_sum {h.total}')
+                lines.append(f'{name}_count {h.count}')
+        return '\n'.join(lines) + '\n'
+
+
+# 全局指标实例
+metrics = Metrics()
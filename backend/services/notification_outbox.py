@@ -0,0 +1,229 @@
+"""
+推送通知发件箱服务
+调用方通过 enqueue* 把通知写入 notification_outbox 表后立即返回；后台worker周期性认领到期的行，
+FCM 行经多播批次并发发送，APNs 行逐token发送。按推送服务逐token的结果处理：
+失效token批量停用，暂时性失败的token按指数退避重试，重试次数用尽后标记为放弃。
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from config import Config
+from models import db
+from models.notification_outbox import (
+    NotificationOutbox, STATUS_PENDING, STATUS_SENT, STATUS_DEAD, CHANNEL_FCM, CHANNEL_APNS
+)
+from models.push_token import UserPushToken, PlatformType
+from services.fcm_fanout import fcm_fanout, FanoutMessage, FanoutResult
+from services.metrics import metrics
+from services.notification_service import notification_service
+
+# 入队到送达的耗时桶（秒），包含排队与重试等待
+DELIVERY_BUCKETS = (1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0, 21600.0)
+
+metrics.describe('notification_delivery_seconds', '通知从入队到送达的耗时')
+metrics.describe('outbox_sent_total', '发件箱已送达的通知数')
+metrics.describe('outbox_retried_total', '发件箱安排重试的次数')
+metrics.describe('outbox_dead_total', '发件箱重试用尽而放弃的通知数')
+
+
+def channel_for(platform: PlatformType) -> str:
+    """设备平台对应的推送通道"""
+    return CHANNEL_APNS if platform == PlatformType.IOS else CHANNEL_FCM
+
+
+class NotificationOutboxService:
+    """推送通知发件箱服务类"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.running = False
+        self.worker_thread = None
+        self._wake_event = threading.Event()
+
+    def init_app(self, app):
+        """初始化应用"""
+        self.app = app
+
+    # ==================== 入队 ====================
+
+    def enqueue_for_user(self, user_id: int, notification_type: str, title: str, body: str,
+                         data: Dict = None, preference: str = 'all') -> int:
+        """
+        给用户的所有活跃设备入队一条通知并提交
+
+        Args:
+            preference: 按通知设置过滤设备（'evening' / 'procrastination' / 'all'）
+
+        Returns:
+            int: 写入的发件箱行数（0 表示用户没有可用设备）
+        """
+        by_channel = defaultdict(list)
+        for push_token in UserPushToken.get_active_tokens_for_user(user_id, preference):
+            by_channel[channel_for(push_token.platform)].append(push_token.token)
+
+        rows = []
+        for channel, tokens in by_channel.items():
+            rows.extend(NotificationOutbox.rows_for(
+                notification_type, channel, title, body, tokens,
+                user_id=user_id, data=data, chunk_size=Config.FCM_BATCH_SIZE
+            ))
+        NotificationOutbox.add_rows(rows)
+        db.session.commit()
+        self.wake()
+        return len(rows)
+
+    @staticmethod
+    def enqueue_tokens(notification_type: str, channel: str, title: str, body: str,
+                       tokens: List[str], data: Dict = None) -> int:
+        """把发往一组token的同一条通知写入发件箱（不提交，随调用方事务一起提交）"""
+        return NotificationOutbox.add_rows(NotificationOutbox.rows_for(
+            notification_type, channel, title, body, tokens,
+            data=data, chunk_size=Config.FCM_BATCH_SIZE
+        ))
+
+    def wake(self):
+        """通知本进程的worker立即处理（其他进程的worker在下一次轮询时处理）"""
+        self._wake_event.set()
+
+    # ==================== 发送 ====================
+
+    def process_batch(self, limit: int = None) -> Dict[str, int]:
+        """
+        认领并发送一批通知（需在应用上下文中调用）
+
+        Returns:
+            dict: 认领数、送达数、重试数、放弃数、停用的失效token数
+        """
+        rows = NotificationOutbox.claim(limit or Config.OUTBOX_BATCH_SIZE, Config.OUTBOX_LEASE_SECONDS)
+        summary = {'claimed': len(rows), 'sent': 0, 'retried': 0, 'dead': 0, 'invalid_tokens': 0}
+        if not rows:
+            return summary
+
+        fcm_rows = [row for row in rows if row.channel == CHANNEL_FCM]
+        results = fcm_fanout.send_each([
+            FanoutMessage(row.title, row.body, row.tokens, row.notification_type, row.data)
+            for row in fcm_rows
+        ])
+        outcomes = list(zip(fcm_rows, results))
+        outcomes.extend((row, self._send_apns(row)) for row in rows if row.channel == CHANNEL_APNS)
+
+        now = datetime.utcnow()
+        invalid_tokens = []
+        for row, result in outcomes:
+            invalid_tokens.extend(result.invalid_tokens)
+            status = self._record_outcome(row, result, now)
+            summary[status] += 1
+        db.session.commit()
+
+        summary['invalid_tokens'] = len(set(invalid_tokens))
+        notification_service.deactivate_invalid_tokens(invalid_tokens)
+        return summary
+
+    @staticmethod
+    def _send_apns(row: NotificationOutbox) -> FanoutResult:
+        """APNs逐token发送，结果整理成与FCM相同的格式"""
+        result = FanoutResult(batches=1, sent=len(row.tokens))
+        for token in row.tokens:
+            if notification_service._send_apns_notification(token, row.title, row.body):
+                result.success += 1
+            else:
+                result.failure += 1
+                result.retry_tokens.append(token)
+                result.error = 'APNs发送失败'
+        return result
+
+    @staticmethod
+    def _record_outcome(row: NotificationOutbox, result: FanoutResult, now: datetime) -> str:
+        """
+        写回单行的发送结果，返回 'sent' / 'retried' / 'dead'
+
+        UPDATE 条件带上本次认领标识：租约过期后被其他worker重新认领的行不会被覆盖。
+        """
+        if not result.retry_tokens:
+            values = dict(status=STATUS_SENT, sent_at=now, lease_until=None, last_error=None)
+            outcome = 'sent'
+            metrics.inc('outbox_sent_total')
+            metrics.observe('notification_delivery_seconds',
+                            (now - row.created_at).total_seconds(), buckets=DELIVERY_BUCKETS)
+        elif row.attempts >= Config.OUTBOX_MAX_ATTEMPTS:
+            values = dict(status=STATUS_DEAD, lease_until=None, last_error=result.error)
+            outcome = 'dead'
+            metrics.inc('outbox_dead_total')
+            print(f"通知 {row.id} 重试 {row.attempts} 次仍失败，已放弃: {result.error}")
+        else:
+            delay = min(Config.OUTBOX_RETRY_BASE_SECONDS * 2 ** (row.attempts - 1), Config.OUTBOX_RETRY_MAX_SECONDS)
+            values = dict(
+                status=STATUS_PENDING,
+                tokens=result.retry_tokens,  # 只重试暂时性失败的token，已送达和已失效的不再发送
+                next_attempt_at=now + timedelta(seconds=delay * random.uniform(0.8, 1.2)),
+                lease_until=None,
+                last_error=result.error
+            )
+            outcome = 'retried'
+            metrics.inc('outbox_retried_total')
+
+        db.session.execute(
+            db.update(NotificationOutbox).where(
+                NotificationOutbox.id == row.id,
+                NotificationOutbox.claimed_by == row.claimed_by
+            ).values(**values).execution_options(synchronize_session=False)
+        )
+        return outcome
+
+    # ==================== 后台线程 ====================
+
+    def start(self):
+        """启动发件箱worker"""
+        if self.running:
+            return
+
+        self.running = True
+        self._wake_event.clear()
+        self.worker_thread = threading.Thread(target=self._run_worker, daemon=True)
+        self.worker_thread.start()
+
+        print("推送发件箱worker已启动")
+
+    def stop(self):
+        """停止发件箱worker"""
+        self.running = False
+        self._wake_event.set()
+        print("推送发件箱worker已停止")
+
+    def _run_worker(self):
+        """运行worker的内部方法；认领满一批时说明还有积压，不等待直接处理下一批"""
+        while self.running:
+            backlog = False
+            with self.app.app_context():
+                try:
+                    started = time.perf_counter()
+                    result = self.process_batch()
+                    backlog = result['claimed'] >= Config.OUTBOX_BATCH_SIZE
+                    if result['claimed']:
+                        print(f"发件箱处理完成: 认领 {result['claimed']}，送达 {result['sent']}，重试 {result['retried']}，"
+                              f"放弃 {result['dead']}，停用失效token {result['invalid_tokens']}，"
+                              f"耗时 {time.perf_counter() - started:.2f} 秒")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"发件箱处理失败: {str(e)}")
+                finally:
+                    db.session.remove()
+            if not backlog:
+                self._wake_event.wait(Config.OUTBOX_POLL_INTERVAL)
+                self._wake_event.clear()
+
+
+# 全局推送发件箱实例
+notification_outbox = NotificationOutboxService()
+
+
+def init_notification_outbox(app):
+    """初始化推送发件箱worker"""
+    notification_outbox.init_app(app)
+    notification_outbox.start()
+    return notification_outbox
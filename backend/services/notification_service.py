@@ -1,6 +1,6 @@
 """
 推送通知服务
-支持iOS APNs和Android FCM推送
+支持iOS APNs和Android FCM推送；业务通知经 notification_outbox 入队后由后台worker发送
 """
 
 import json
@@ -23,49 +23,58 @@ class NotificationService:
         self.fcm_server_key = Config.FCM_SERVER_KEY
         self.fcm_url = Config.FCM_URL
         
+        # 复用连接（keep-alive），连接池大小与并发批次数一致
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=Config.FCM_MAX_PARALLEL
+        )
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+        
     def send_evening_reminder(self, user_id: int, task_count: int) -> bool:
         """
-        发送晚上提醒通知
+        发送晚上提醒通知（写入发件箱，由后台worker发送并重试）
         
         Args:
             user_id: 用户ID
             task_count: 未完成任务数量
             
         Returns:
-            bool: 发送是否成功
+            bool: 是否已入队（用户没有启用晚间提醒的设备时为False）
         """
         try:
-            user = User.query.get(user_id)
-            if not user:
-                print(f"用户 {user_id} 不存在")
-                return False
-            
-            # 构建通知内容
-            title = "📝 任务提醒"
-            body = f"你还有{task_count}个任务未完成，记得及时处理哦！"
-            
-            # 获取用户的推送token（需要在用户表中添加字段）
-            push_tokens = self._get_user_push_tokens(user_id)
+            from services.notification_outbox import notification_outbox
             
-            success_count = 0
-            for token_info in push_tokens:
-                if token_info['platform'] == 'ios':
-                    success = self._send_apns_notification(token_info['token'], title, body)
-                elif token_info['platform'] == 'android':
-                    success = self._send_fcm_notification(token_info['token'], title, body)
-                else:
-                    continue
-                    
-                if success:
-                    success_count += 1
-            
-            print(f"用户 {user_id} 推送通知发送完成: {success_count}/{len(push_tokens)} 成功")
-            return success_count > 0
+            template = Config.get_notification_template('evening_reminder')
+            queued = notification_outbox.enqueue_for_user(
+                user_id, 'evening_reminder', template['title'],
+                template['body_template'].format(task_count=task_count),
+                {'type': 'evening_reminder', 'task_count': str(task_count)},
+                preference='evening'
+            )
+            if not queued:
+                print(f"用户 {user_id} 未启用晚间提醒或无有效设备")
+            return queued > 0
             
         except Exception as e:
+            db.session.rollback()
             print(f"发送晚上提醒失败: {str(e)}")
             return False
     
+    def deactivate_invalid_tokens(self, tokens: List[str]):
+        """停用FCM报告已失效的token，并使相关用户的偏好缓存失效"""
+        if not tokens:
+            return
+        try:
+            from services.preferences_service import preferences_service
+            for user_id in UserPushToken.deactivate_tokens(tokens):
+                preferences_service.invalidate(user_id)
+            print(f"已停用 {len(tokens)} 个失效的推送token")
+        except Exception as e:
+            db.session.rollback()
+            print(f"停用失效推送token失败: {str(e)}")
+    
     def _get_user_push_tokens(self, user_id: int) -> List[Dict]:
         """
         获取用户的推送token列表
@@ -117,11 +126,11 @@ class NotificationService:
                 }
             }
             
-            response = requests.post(
+            response = self.http.post(
                 self.fcm_url,
                 headers=headers,
                 data=json.dumps(payload),
-                timeout=10
+                timeout=Config.FCM_TIMEOUT
             )
             
             if response.status_code == 200:
@@ -175,7 +184,7 @@ class NotificationService:
         }
         
         try:
-            response = requests.post(self.fcm_url, headers=headers, json=payload)
+            response = self.http.post(self.fcm_url, headers=headers, json=payload, timeout=Config.FCM_TIMEOUT)
             result = {
                 'success': response.status_code == 200,
                 'status_code': response.status_code
@@ -225,12 +234,9 @@ class NotificationService:
             return False
     
     def send_procrastination_reminder(self, user_id: int, task_title: str) -> Dict:
-        """发送拖延提醒"""
-        # 获取用户的推送token
-        tokens = self.get_user_active_tokens(user_id)
-        if not tokens:
-            return {'success': False, 'error': 'No active tokens found'}
-            
+        """发送拖延提醒（写入发件箱，由后台worker发送并重试）"""
+        from services.notification_outbox import notification_outbox
+        
         template = Config.get_notification_template('procrastination_reminder')
         title = template['title']
         body = template['body_template'].format(task_title=task_title)
@@ -241,7 +247,12 @@ class NotificationService:
             'task_title': task_title
         }
         
-        return self.send_fcm_notification(tokens, title, body, 'procrastination_reminder', data)
+        queued = notification_outbox.enqueue_for_user(
+            user_id, 'procrastination_reminder', title, body, data, preference='procrastination'
+        )
+        if not queued:
+            return {'success': False, 'error': 'No active tokens found'}
+        return {'success': True, 'queued': queued}
     
     def get_user_active_tokens(self, user_id: int) -> List[str]:
         """获取用户的活跃推送token"""
@@ -0,0 +1,136 @@
+"""
+密码哈希服务
+哈希与校验在有界进程池中执行，不占用处理请求的线程；排队数达到上限时立即拒绝（接口返回429），
+避免登录高峰把所有worker拖在CPU密集的哈希上。哈希算法可配置，旧参数的哈希在登录成功后透明升级。
+"""
+
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from config import Config
+from services.metrics import metrics
+from services.registry import registry
+
+metrics.describe('password_hash_seconds', '密码哈希/校验在进程池中的执行耗时')
+metrics.describe('password_hash_queue_wait_seconds', '密码哈希任务提交到开始执行的排队耗时')
+metrics.describe('password_hash_rejected_total', '因排队已满被拒绝的哈希请求数')
+
+
+class HasherBusy(Exception):
+    """进程池排队已满，调用方应返回429"""
+
+    def __init__(self, retry_after: int = 1):
+        super().__init__('密码服务繁忙，请稍后重试')
+        self.retry_after = retry_after
+
+
+def _timed(func, submitted_at, *args):
+    """在子进程中执行，返回 (结果, 排队耗时, 执行耗时)"""
+    started = time.time()
+    result = func(*args)
+    return result, started - submitted_at, time.time() - started
+
+
+class PasswordHasher:
+    """密码哈希服务类"""
+
+    def __init__(self, workers: int = None, queue_limit: int = None, method: str = None):
+        self.workers = Config.PASSWORD_HASH_WORKERS if workers is None else workers
+        self.queue_limit = queue_limit or Config.PASSWORD_HASH_QUEUE_LIMIT
+        self.method = method or Config.PASSWORD_HASH_METHOD
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._method_prefix = None
+
+    # ==================== 对外接口 ====================
+
+    def hash(self, password: str) -> str:
+        """按当前配置的算法生成密码哈希"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """校验密码"""
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """哈希的算法与参数与当前配置不一致时需要重新哈希"""
+        if not password_hash:
+            return False
+        return password_hash.split('$', 1)[0] != self._current_prefix()
+
+    # ==================== 内部实现 ====================
+
+    def _current_prefix(self) -> str:
+        """当前配置生成的哈希前缀（如 pbkdf2:sha256:600000），只计算一次"""
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._method_prefix
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _run(self, func, *args):
+        pool = self._get_pool()
+        if pool is None:
+            # 未启用进程池（开发环境）时在当前线程执行
+            started = time.perf_counter()
+            result = func(*args)
+            metrics.observe('password_hash_seconds', time.perf_counter() - started)
+            return result
+
+        with self._lock:
+            if self._pending >= self.queue_limit:
+                metrics.inc('password_hash_rejected_total')
+                raise HasherBusy(retry_after=max(self._pending // max(self.workers, 1), 1))
+            self._pending += 1
+
+        try:
+            future = pool.submit(_timed, func, time.time(), *args)
+        except Exception:
+            self._release()
+            raise
+        # 任务真正结束（含超时后仍在子进程里执行完的任务）才释放名额，排队计数与进程池占用保持一致
+        future.add_done_callback(lambda _: self._release())
+
+        try:
+            result, waited, elapsed = future.result(timeout=Config.PASSWORD_HASH_TIMEOUT)
+        except FutureTimeout:
+            future.cancel()  # 尚未开始的任务可取消，已在执行的只能等它结束
+            metrics.inc('password_hash_rejected_total')
+            raise HasherBusy()
+
+        metrics.observe('password_hash_queue_wait_seconds', max(waited, 0.0))
+        metrics.observe('password_hash_seconds', elapsed)
+        return result
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self):
+        """关闭进程池"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+registry.register('password_hasher', PasswordHasher)
+
+
+def get_password_hasher() -> PasswordHasher:
+    """获取当前进程的密码哈希服务实例（fork后自动重建进程池）"""
+    return registry.get('password_hasher')
@@ -0,0 +1,182 @@
+"""
+番茄钟活跃会话注册表
+缓存用户的当前会话，状态切换只需一条带条件的UPDATE，无需先SELECT。
+数据库仍是唯一可信来源（写穿），缓存缺失或条件不满足时由调用方回退到数据库路径。
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+from models import db
+from models.pomodoro import PomodoroSession, PomodoroStats
+from models.streak import ActivityStreak
+from models.focus_heatmap import FocusHeatmap
+from models.dashboard import UserDashboard
+from services.cache_backend import get_cache
+
+ACTIVE_TTL = 24 * 3600  # 活跃会话缓存1天
+
+
+class ActiveSessionRegistry:
+    """活跃会话注册表类"""
+
+    @staticmethod
+    def _active_key(user_id) -> str:
+        return f'pomodoro:active:{user_id}'
+
+    # ==================== 活跃会话 ====================
+
+    def get_active(self, user_id) -> Optional[Dict]:
+        """
+        获取当前未完成的会话
+
+        缓存中以空字典表示「确认没有活跃会话」；仅在缓存完全缺失（如冷启动）时读库一次。
+        """
+        data = get_cache().get(self._active_key(user_id))
+        if data is None:
+            data = self._load_active(user_id)
+        return data or None
+
+    def set_active(self, user_id, data: Optional[Dict]):
+        """写入当前会话；已完成或已过期的会话记为「无活跃会话」"""
+        if not data or data.get('is_completed') or data.get('is_expired'):
+            data = {}
+        get_cache().set(self._active_key(user_id), data, ACTIVE_TTL)
+
+    def invalidate(self, user_id):
+        """丢弃用户的会话缓存（事务失败时调用）"""
+        get_cache().delete(self._active_key(user_id))
+
+    def _load_active(self, user_id) -> Dict:
+        session = PomodoroSession.query.filter_by(
+            user_id=user_id,
+            is_completed=False,
+            is_expired=False
+        ).order_by(PomodoroSession.start_time.desc()).first()
+        data = session.to_dict() if session else {}
+        get_cache().set(self._active_key(user_id), data, ACTIVE_TTL)
+        return data
+
+    def _cached_session(self, user_id, session_id) -> Optional[Dict]:
+        data = get_cache().get(self._active_key(user_id))
+        if data and data.get('id') == session_id:
+            return data
+        return None
+
+    # ==================== 状态切换（不提交事务） ====================
+
+    def start(self, user_id, session_type: str, duration: int) -> Dict:
+        """创建会话，flush 后直接由内存对象生成返回数据"""
+        session = PomodoroSession(
+            user_id=user_id,
+            session_type=session_type,
+            planned_duration=duration,
+            start_time=datetime.utcnow()
+        )
+        db.session.add(session)
+        db.session.flush()
+        return session.to_dict()
+
+    def pause(self, user_id, session_id) -> Optional[Dict]:
+        """
+        暂停会话
+
+        Returns:
+            更新后的会话数据；缓存未命中或条件不满足时返回None，调用方应回退到数据库路径
+        """
+        cached = self._cached_session(user_id, session_id)
+        if not cached or cached['is_completed'] or cached['is_paused']:
+            return None
+
+        now = datetime.utcnow()
+        result = db.session.execute(
+            db.update(PomodoroSession).where(
+                PomodoroSession.id == session_id,
+                PomodoroSession.user_id == user_id,
+                PomodoroSession.is_completed == False,
+                PomodoroSession.is_paused == False
+            ).values(is_paused=True, pause_time=now).execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            self.invalidate(user_id)
+            return None
+
+        return dict(cached, is_paused=True, pause_time=now.isoformat())
+
+    def resume(self, user_id, session_id) -> Optional[Dict]:
+        """恢复会话：开始时间顺延暂停时长（以缓存中的暂停时间作为乐观并发条件）"""
+        cached = self._cached_session(user_id, session_id)
+        if not cached or not cached['is_paused'] or not cached['pause_time']:
+            return None
+
+        now = datetime.utcnow()
+        pause_time = datetime.fromisoformat(cached['pause_time'])
+        start_time = datetime.fromisoformat(cached['start_time']) + (now - pause_time)
+
+        result = db.session.execute(
+            db.update(PomodoroSession).where(
+                PomodoroSession.id == session_id,
+                PomodoroSession.user_id == user_id,
+                PomodoroSession.is_paused == True,
+                PomodoroSession.is_expired == False,
+                PomodoroSession.pause_time == pause_time
+            ).values(
+                is_paused=False,
+                pause_time=None,
+                start_time=start_time
+            ).execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            self.invalidate(user_id)
+            return None
+
+        return dict(cached, is_paused=False, pause_time=None, start_time=start_time.isoformat())
+
+    def complete(self, user_id, session_id) -> Optional[Dict]:
+        """完成会话（以缓存中的开始时间作为乐观并发条件）"""
+        cached = self._cached_session(user_id, session_id)
+        if not cached or cached['is_completed']:
+            return None
+
+        end_time = datetime.utcnow()
+        start_time = datetime.fromisoformat(cached['start_time'])
+        actual_duration = int((end_time - start_time).total_seconds() / 60)
+
+        result = db.session.execute(
+            db.update(PomodoroSession).where(
+                PomodoroSession.id == session_id,
+                PomodoroSession.user_id == user_id,
+                PomodoroSession.is_completed == False,
+                PomodoroSession.is_expired == False,
+                PomodoroSession.start_time == start_time
+            ).values(
+                end_time=end_time,
+                is_completed=True,
+                actual_duration=actual_duration
+            ).execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            self.invalidate(user_id)
+            return None
+
+        return dict(cached, end_time=end_time.isoformat(), is_completed=True, actual_duration=actual_duration)
+
+
+def record_completed_session(user_id, session_type, start_time, minutes):
+    """会话完成后的汇总：每日统计、专注连续天数、专注热力图、用户仪表盘（不提交事务）"""
+    # 累加到每日汇总
+    PomodoroStats.record_session(user_id, start_time.date(), session_type, minutes)
+    
+    # 工作会话计入专注日连续天数和专注热力图
+    if session_type == 'work':
+        streak = ActivityStreak.get_or_create(user_id, ActivityStreak.KIND_FOCUS)
+        streak.add_day(start_time.date())
+        
+        heatmap = FocusHeatmap.get_or_create(user_id, for_update=True)
+        heatmap.add_session(start_time, minutes)
+        
+        UserDashboard.record_focus_session(user_id, minutes, streak)
+
+
+# 全局活跃会话注册表实例
+active_sessions = ActiveSessionRegistry()
@@ -0,0 +1,117 @@
+"""
+用户偏好服务
+主题、番茄钟设置、通知开关、语言时区合并为一个偏好聚合，一条查询载入并按用户缓存；
+各PUT接口提交后显式失效。没有设置记录的用户在读取时直接使用默认值，不写库。
+"""
+
+from typing import Dict, Optional
+
+from models import db
+from models.user import User
+from models.theme import UserTheme
+from models.pomodoro import PomodoroSettings
+from models.push_token import UserPushToken
+from services.cache_backend import get_cache
+
+PREFERENCES_TTL = 3600  # 偏好缓存1小时
+
+DEFAULT_THEME = {
+    'id': None,
+    'color_scheme': 'blue',  # 默认蓝色主题
+    'is_dark_mode': False,
+    'custom_settings': {},
+    'updated_at': None
+}
+
+DEFAULT_POMODORO_SETTINGS = {
+    'id': None,
+    'work_duration': 25,  # 25分钟工作时间
+    'short_break_duration': 5,  # 5分钟短休息
+    'long_break_duration': 15,  # 15分钟长休息
+    'sessions_until_long_break': 4,  # 4个番茄钟后长休息
+    'sound_enabled': True,
+    'auto_start_breaks': False,
+    'auto_start_pomodoros': False,
+    'created_at': None,
+    'updated_at': None
+}
+
+
+class PreferencesService:
+    """用户偏好服务类"""
+
+    @staticmethod
+    def _key(user_id) -> str:
+        return f'prefs:{user_id}'
+
+    def get(self, user_id) -> Optional[Dict]:
+        """获取用户偏好聚合（用户不存在时返回None）"""
+        cache = get_cache()
+        data = cache.get(self._key(user_id))
+        if data is None:
+            data = self._load(user_id)
+            if data is None:
+                return None
+            cache.set(self._key(user_id), data, PREFERENCES_TTL)
+        return data
+
+    def invalidate(self, user_id):
+        """偏好相关数据提交后调用"""
+        get_cache().delete(self._key(user_id))
+
+    def _load(self, user_id) -> Optional[Dict]:
+        """一条语句外连接用户、主题、番茄钟设置及推送设备的通知开关汇总"""
+        push = db.select(
+            UserPushToken.user_id,
+            db.func.count(UserPushToken.id).label('devices'),
+            db.func.max(db.case((UserPushToken.enable_evening_reminder == True, 1), else_=0)).label('evening'),
+            db.func.max(db.case((UserPushToken.enable_procrastination_reminder == True, 1), else_=0)).label('procrastination')
+        ).where(
+            UserPushToken.user_id == user_id,
+            UserPushToken.is_active == True
+        ).group_by(UserPushToken.user_id).subquery()
+
+        stmt = db.select(
+            User.language, User.timezone, User.theme_preference,
+            UserTheme, PomodoroSettings,
+            push.c.devices, push.c.evening, push.c.procrastination
+        ).select_from(User).outerjoin(
+            UserTheme, UserTheme.user_id == User.id
+        ).outerjoin(
+            PomodoroSettings, PomodoroSettings.user_id == User.id
+        ).outerjoin(
+            push, push.c.user_id == User.id
+        ).where(User.id == user_id).limit(1)
+
+        row = db.session.execute(stmt).first()
+        if row is None:
+            return None
+
+        language, timezone, theme_preference, theme, settings, devices, evening, procrastination = row
+        return {
+            'language': language,
+            'timezone': timezone,
+            'theme_preference': theme_preference,
+            'theme': self._theme_dict(theme) if theme else dict(DEFAULT_THEME),
+            'pomodoro': settings.to_dict() if settings else dict(DEFAULT_POMODORO_SETTINGS, user_id=int(user_id)),
+            'notifications': {
+                'devices': devices or 0,
+                # 没有注册设备时按模型默认值（开启）返回
+                'enable_evening_reminder': bool(evening) if devices else True,
+                'enable_procrastination_reminder': bool(procrastination) if devices else True
+            }
+        }
+
+    @staticmethod
+    def _theme_dict(theme: UserTheme) -> Dict:
+        return {
+            'id': theme.id,
+            'color_scheme': getattr(theme.color_scheme, 'value', theme.color_scheme),
+            'is_dark_mode': theme.is_dark_mode,
+            'custom_settings': theme.custom_settings or {},
+            'updated_at': theme.updated_at.isoformat() if theme.updated_at else None
+        }
+
+
+# 全局用户偏好服务实例
+preferences_service = PreferencesService()
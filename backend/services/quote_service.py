@@ -0,0 +1,285 @@
+"""
+每日语录服务
+内置语录与自定义语录一次性载入内存，按语言、分类建立索引；今日语录由 (用户ID, 日期, 语录库版本)
+的哈希确定性地选出（每个用户一轮内按权重不重复抽取），读取时不写库。
+只有付费用户刷新（覆盖）当天语录时才写入 daily_quotes。
+"""
+
+import hashlib
+import math
+import random
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from models import db
+from models.quote import DailyQuote, CustomQuote
+from services.cache_backend import get_cache
+
+QuoteEntry = namedtuple('QuoteEntry', ['text', 'language', 'category', 'weight'])
+
+DEFAULT_LANGUAGE = 'zh'
+CUSTOM_CATEGORY = 'custom'
+CUSTOM_QUOTE_WEIGHT = 2.0  # 用户自己添加的语录在每轮中更靠前出现（每轮每条仍恰好出现一次）
+VERSION_KEY = 'quotes:corpus_version'
+VERSION_CHECK_INTERVAL = 30  # 秒，检查其他进程是否更新了语录库
+ORDER_CACHE_SIZE = 4096  # 缓存的用户抽取顺序数
+
+QUOTE_CATEGORIES = {
+    'start': '开始行动',
+    'persistence': '坚持',
+    'focus': '专注',
+    'growth': '成长',
+    'confidence': '自信',
+    CUSTOM_CATEGORY: '我的语录'
+}
+
+BUILTIN_QUOTES = (
+    QuoteEntry("每一个小步骤都是向目标迈进的勇敢尝试 💪", 'zh', 'start', 1.0),
+    QuoteEntry("今天的努力是明天成功的基石 🌟", 'zh', 'persistence', 1.0),
+    QuoteEntry("不要害怕开始，最难的部分往往是迈出第一步 🚀", 'zh', 'start', 1.5),
+    QuoteEntry("进步不在于速度，而在于方向的正确性 🎯", 'zh', 'growth', 1.0),
+    QuoteEntry("每完成一个小任务，你就离梦想更近一步 ✨", 'zh', 'start', 1.0),
+    QuoteEntry("拖延是梦想的敌人，行动是成功的朋友 🔥", 'zh', 'start', 1.5),
+    QuoteEntry("相信自己，你比想象中更有能力 💎", 'zh', 'confidence', 1.0),
+    QuoteEntry("今天的你要比昨天的你更进一步 📈", 'zh', 'growth', 1.0),
+    QuoteEntry("专注当下，一次只做一件事 🎯", 'zh', 'focus', 1.0),
+    QuoteEntry("小小的改变能带来巨大的结果 🌱", 'zh', 'growth', 1.0),
+    QuoteEntry("坚持不懈，水滴石穿 💧", 'zh', 'persistence', 1.0),
+    QuoteEntry("每一次努力都在为未来的自己投资 💰", 'zh', 'persistence', 1.0),
+    QuoteEntry("困难是成长的阶梯，挑战是能力的试金石 🏔️", 'zh', 'growth', 1.0),
+    QuoteEntry("今天是改变的最好时机 ⏰", 'zh', 'start', 1.0),
+    QuoteEntry("相信过程，享受进步的每一刻 🌈", 'zh', 'confidence', 1.0),
+    QuoteEntry("Every small step is a brave move toward your goal 💪", 'en', 'start', 1.0),
+    QuoteEntry("The hardest part is starting. Start small, start now 🚀", 'en', 'start', 1.5),
+    QuoteEntry("Progress is about direction, not speed 🎯", 'en', 'growth', 1.0),
+    QuoteEntry("Do one thing at a time, and do it fully 🎯", 'en', 'focus', 1.0),
+    QuoteEntry("Dripping water wears away stone 💧", 'en', 'persistence', 1.0),
+    QuoteEntry("You are more capable than you think 💎", 'en', 'confidence', 1.0),
+    QuoteEntry("Small changes add up to big results 🌱", 'en', 'growth', 1.0),
+    QuoteEntry("Today is the best day to begin ⏰", 'en', 'start', 1.0),
+)
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def normalize_language(language: Optional[str]) -> str:
+    """zh-CN / en-US 等取主语言代码"""
+    return (language or DEFAULT_LANGUAGE).replace('_', '-').split('-')[0].lower()
+
+
+class QuoteCorpus:
+    """
+    某一版本的语录库快照（只读）
+
+    重新载入时整体替换快照，旧快照上的抽取顺序缓存随之丢弃。
+    """
+
+    def __init__(self, entries, custom: Dict[int, Tuple[QuoteEntry, ...]], token: Optional[str]):
+        self.token = token
+        self.custom = custom
+        self.by_language: Dict[str, Dict[str, Tuple[QuoteEntry, ...]]] = {}
+        for entry in entries:
+            categories = self.by_language.setdefault(entry.language, {})
+            categories[entry.category] = categories.get(entry.category, ()) + (entry,)
+
+        # 每个 (语言, 分类) 语录池的内容版本，分类为None表示该语言全部语录
+        self._versions = {}
+        for language, categories in self.by_language.items():
+            for category, items in categories.items():
+                self._versions[(language, category)] = _digest(*(item.text for item in items))[:12]
+            self._versions[(language, None)] = _digest(*sorted(self._versions[(language, c)] for c in categories))[:12]
+
+        self.order = lru_cache(maxsize=ORDER_CACHE_SIZE)(self._order)
+
+    def languages(self) -> List[str]:
+        return sorted(self.by_language.keys())
+
+    def get_pool(self, user_id, language: str, category: Optional[str] = None) -> Tuple[Tuple[QuoteEntry, ...], str]:
+        """
+        用户可选的语录池及其版本号
+
+        内置语录按语言（无对应语言时退回中文）与分类筛选，用户自己启用的自定义语录只加入本人的语录池。
+        版本号只随该语录池的内容变化，其他用户添加语录不会改变本用户当天的语录。
+        """
+        language = language if language in self.by_language else DEFAULT_LANGUAGE
+        categories = self.by_language.get(language, {})
+        custom = self.custom.get(int(user_id), ()) if category in (None, CUSTOM_CATEGORY) else ()
+
+        if category is None:
+            builtin = tuple(entry for items in categories.values() for entry in items)
+        else:
+            builtin = categories.get(category, ())
+        version = self._versions.get((language, category), '')
+
+        if custom:
+            version = _digest(version, *(entry.text for entry in custom))[:12]
+        return builtin + custom, version
+
+    def _order(self, user_id, language: str, category: Optional[str], cycle: int) -> Tuple[QuoteEntry, ...]:
+        """
+        用户在某一轮中的抽取顺序：按权重的不放回随机排列（Efraimidis-Spirakis 键值排序）
+
+        随机数种子由 (用户ID, 语录池版本, 轮次) 决定，同一轮内每条语录恰好出现一次。
+        """
+        pool, version = self.get_pool(user_id, language, category)
+        rng = random.Random(_digest(user_id, version, cycle))
+        keyed = [(-math.log(1.0 - rng.random()) / max(entry.weight, 1e-6), i) for i, entry in enumerate(pool)]
+        keyed.sort()
+        return tuple(pool[i] for _, i in keyed)
+
+    def locate(self, user_id, language: str, day: date, category: Optional[str] = None):
+        """把日期映射为 (抽取顺序, 轮内位置, 语录池版本)；指定分类无语录时退回全部语录"""
+        pool, version = self.get_pool(user_id, language, category)
+        if not pool:
+            category = None
+            pool, version = self.get_pool(user_id, language)
+        cycle, position = divmod(day.toordinal(), len(pool))
+        return self.order(str(user_id), language, category, cycle), position, version
+
+
+class QuoteService:
+    """每日语录服务类"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._corpus: Optional[QuoteCorpus] = None
+        self._checked_at = 0.0
+
+    # ==================== 语录库 ====================
+
+    def _load(self, token: Optional[str]) -> QuoteCorpus:
+        """载入内置语录与全部启用中的自定义语录"""
+        custom = {}
+        rows = db.session.execute(
+            db.select(CustomQuote.user_id, CustomQuote.quote_text)
+            .filter_by(is_active=True)
+            .order_by(CustomQuote.id)
+        )
+        for user_id, text in rows:
+            custom.setdefault(user_id, []).append(QuoteEntry(text, None, CUSTOM_CATEGORY, CUSTOM_QUOTE_WEIGHT))
+        return QuoteCorpus(BUILTIN_QUOTES, {user_id: tuple(items) for user_id, items in custom.items()}, token)
+
+    def corpus(self) -> QuoteCorpus:
+        """当前语录库快照；每隔一段时间检查共享版本号，变化时热重载"""
+        corpus = self._corpus
+        if corpus is not None and time.monotonic() - self._checked_at < VERSION_CHECK_INTERVAL:
+            return corpus
+
+        with self._lock:
+            token = get_cache().get(VERSION_KEY)
+            if self._corpus is None or self._corpus.token != token:
+                self._corpus = self._load(token)
+            self._checked_at = time.monotonic()
+            return self._corpus
+
+    def reload(self):
+        """更新共享版本号，本进程立即重载，其他进程在下次检查时重载"""
+        token = uuid.uuid4().hex
+        get_cache().set(VERSION_KEY, token)
+        with self._lock:
+            self._corpus = self._load(token)
+            self._checked_at = time.monotonic()
+
+    # ==================== 每日语录 ====================
+
+    def pick(self, user_id, day: date, language: str = None, category: str = None) -> Tuple[str, str]:
+        """确定性地选出某天的语录，返回 (语录, 语录库版本)"""
+        order, position, version = self.corpus().locate(user_id, normalize_language(language), day, category)
+        return order[position].text, version
+
+    def get_daily(self, user_id, day: date = None, language: str = None, category: str = None) -> Dict:
+        """获取某天的语录：优先使用刷新后保存的覆盖记录，否则按哈希确定"""
+        day = day or date.today()
+        override = DailyQuote.query.filter_by(user_id=user_id, quote_date=day).first()
+        if override:
+            return self._to_dict(override.quote_text, day, override.id)
+
+        text, version = self.pick(user_id, day, language, category)
+        return dict(self._to_dict(text, day), version=version)
+
+    def get_history(self, user_id, since: date, page: int, per_page: int, language: str = None) -> Dict:
+        """
+        按天倒序返回语录历史（覆盖记录一次查询取出，其余天按哈希重新计算）
+
+        Args:
+            since: 最早的日期（一般为注册日期）
+        """
+        today = date.today()
+        total = max((today - since).days + 1, 0)
+        pages = (total + per_page - 1) // per_page if per_page else 0
+        offset = (page - 1) * per_page
+        days = [date.fromordinal(today.toordinal() - i) for i in range(offset, min(offset + per_page, total))]
+
+        overrides = {}
+        if days:
+            rows = DailyQuote.query.filter(
+                DailyQuote.user_id == user_id,
+                DailyQuote.quote_date.between(days[-1], days[0])
+            ).all()
+            overrides = {row.quote_date: row for row in rows}
+
+        quotes = []
+        for day in days:
+            row = overrides.get(day)
+            if row:
+                quotes.append(self._to_dict(row.quote_text, day, row.id))
+            else:
+                quotes.append(self._to_dict(self.pick(user_id, day, language)[0], day))
+
+        return {
+            'quotes': quotes,
+            'pagination': {
+                'page': page,
+                'pages': pages,
+                'per_page': per_page,
+                'total': total
+            }
+        }
+
+    def refresh(self, user_id, day: date = None, language: str = None) -> Dict:
+        """刷新（覆盖）当天语录：取本轮抽取顺序中的下一条，仅此时写入 daily_quotes"""
+        day = day or date.today()
+        order, position, _ = self.corpus().locate(user_id, normalize_language(language), day)
+        texts = [entry.text for entry in order]
+
+        daily_quote = DailyQuote.query.filter_by(user_id=user_id, quote_date=day).first()
+        if daily_quote and daily_quote.quote_text in texts:
+            position = texts.index(daily_quote.quote_text)
+        new_text = texts[(position + 1) % len(texts)]
+
+        if daily_quote:
+            daily_quote.quote_text = new_text
+        else:
+            daily_quote = DailyQuote(user_id=user_id, quote_text=new_text, quote_date=day)
+            db.session.add(daily_quote)
+        db.session.commit()
+
+        return self._to_dict(daily_quote.quote_text, day, daily_quote.id)
+
+    def add_custom_quote(self, user_id, quote_text: str) -> CustomQuote:
+        """保存自定义语录并重载语录库"""
+        custom_quote = CustomQuote(user_id=user_id, quote_text=quote_text)
+        db.session.add(custom_quote)
+        db.session.commit()
+        self.reload()
+        return custom_quote
+
+    @staticmethod
+    def _to_dict(text: str, day: date, quote_id: Optional[int] = None) -> Dict:
+        return {
+            'id': quote_id,
+            'quote': text,
+            'date': day.isoformat(),
+            'is_today': day == date.today()
+        }
+
+
+# 全局语录服务实例
+quote_service = QuoteService()
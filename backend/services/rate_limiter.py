@@ -0,0 +1,285 @@
+"""
+频率限制服务
+令牌桶算法，每次检查O(1)：进程内字典、Redis（Lua脚本原子执行）或数据库表（一条UPSERT）三种后端。
+按用户ID（已登录）或客户端IP计数，各接口通过 @rate_limit('策略名') 声明所用策略。
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from functools import wraps
+from typing import Callable, Dict, NamedTuple, Optional
+
+from flask import request, jsonify
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from sqlalchemy import func, case
+
+from config import Config
+from services.cache_backend import get_cache, RedisCache
+from services.metrics import metrics
+from services.registry import registry
+
+metrics.describe('rate_limit_rejected_total', '被频率限制拒绝的请求数')
+
+
+@dataclass(frozen=True)
+class RatePolicy:
+    """限流策略：period 秒内最多 limit 次，允许 burst 次突发（默认等于 limit）"""
+    limit: int
+    period: int
+    burst: Optional[int] = None
+
+    @property
+    def rate(self) -> float:
+        """每秒补充的令牌数"""
+        return self.limit / self.period
+
+    @property
+    def capacity(self) -> int:
+        return self.burst or self.limit
+
+
+# 各接口的限流策略
+POLICIES: Dict[str, RatePolicy] = {
+    'login': RatePolicy(limit=30, period=60),             # 按IP，同一教室NAT出口下多人同时登录
+    'login_account': RatePolicy(limit=10, period=600),    # 按登录名+IP，只计密码错误的次数，防止暴力破解单个账户
+    'register': RatePolicy(limit=20, period=3600),
+    'ai': RatePolicy(limit=60, period=3600, burst=10),    # 已登录用户调用大模型
+    'ai_anonymous': RatePolicy(limit=20, period=3600, burst=5)  # 无需认证的AI接口，按IP
+}
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: int  # 被拒绝时建议的等待秒数
+
+
+def _result(allowed: bool, tokens: float, policy: RatePolicy) -> RateLimitResult:
+    retry_after = 0 if allowed else max(int((1 - tokens) / policy.rate) + 1, 1)
+    return RateLimitResult(allowed, max(int(tokens), 0), retry_after)
+
+
+# ==================== 后端 ====================
+
+class MemoryBucketStore:
+    """进程内令牌桶（单worker或开发环境）"""
+
+    def __init__(self, max_keys: int = 100000):
+        self._buckets: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def hit(self, key: str, policy: RatePolicy, cost: float = 1) -> RateLimitResult:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (policy.capacity, now))
+            tokens = min(policy.capacity, tokens + (now - updated) * policy.rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            if len(self._buckets) >= self._max_keys and key not in self._buckets:
+                self._evict(now)
+            self._buckets[key] = (tokens, now)
+        return _result(allowed, tokens, policy)
+
+    def _evict(self, now: float):
+        """丢弃最早写入的一批（通常早已回满）"""
+        for key in list(self._buckets.keys())[:max(self._max_keys // 10, 1)]:
+            del self._buckets[key]
+
+
+# KEYS[1]=桶键 ARGV=容量, 每秒补充数, 当前时间, 消耗；返回 {是否放行, 剩余令牌*1000}
+_REDIS_SCRIPT = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, math.floor(tokens * 1000)}
+"""
+
+
+class RedisBucketStore:
+    """Redis令牌桶（多worker共享，脚本内原子读改写）"""
+
+    def __init__(self, client, prefix: str = 'pai:rl:'):
+        self._script = client.register_script(_REDIS_SCRIPT)
+        self._prefix = prefix
+
+    def hit(self, key: str, policy: RatePolicy, cost: float = 1) -> RateLimitResult:
+        allowed, tokens = self._script(
+            keys=[self._prefix + key],
+            args=[policy.capacity, policy.rate, time.time(), cost]
+        )
+        return _result(bool(allowed), tokens / 1000, policy)
+
+
+class DatabaseBucketStore:
+    """数据库令牌桶（SQLite/PostgreSQL，一条 INSERT ... ON CONFLICT DO UPDATE ... RETURNING）"""
+
+    def __init__(self, engine):
+        from models.rate_limit import RateLimitBucket
+        dialect = engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            self._least, self._greatest = func.least, func.greatest
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            # SQLite 的多参数 min/max 为标量函数
+            self._least, self._greatest = func.min, func.max
+        else:
+            raise ValueError(f'数据库限流后端不支持 {dialect}')
+        self._engine = engine
+        self._insert = insert
+        self._table = RateLimitBucket.__table__
+
+    def hit(self, key: str, policy: RatePolicy, cost: float = 1) -> RateLimitResult:
+        table, now = self._table, time.time()
+        refilled = self._least(
+            policy.capacity,
+            table.c.tokens + self._greatest(now - table.c.updated_at, 0) * policy.rate
+        )
+        allowed = refilled >= cost
+
+        stmt = self._insert(table).values(
+            key=key, tokens=policy.capacity - cost, updated_at=now, allowed=True
+        ).on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                'tokens': case((allowed, refilled - cost), else_=refilled),
+                'updated_at': now,
+                'allowed': allowed
+            }
+        ).returning(table.c.allowed, table.c.tokens)
+
+        # 独立连接与事务，不影响请求中的会话
+        with self._engine.begin() as conn:
+            row_allowed, tokens = conn.execute(stmt).one()
+        return _result(bool(row_allowed), tokens, policy)
+
+
+# ==================== 限流器 ====================
+
+class RateLimiter:
+    """频率限制器类"""
+
+    def __init__(self, store=None):
+        self._store = store
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = self._create_store()
+        return self._store
+
+    @staticmethod
+    def _create_store():
+        """按配置选择后端：redis / database / memory，auto 时有Redis用Redis，否则进程内"""
+        backend = Config.RATE_LIMIT_BACKEND
+        cache = get_cache()
+        if backend in ('auto', 'redis') and isinstance(cache, RedisCache):
+            return RedisBucketStore(cache.client)
+        if backend == 'database':
+            from models import db
+            try:
+                return DatabaseBucketStore(db.engine)
+            except Exception as e:
+                print(f"⚠️ 数据库限流后端不可用，使用进程内限流: {str(e)}")
+        return MemoryBucketStore()
+
+    def hit(self, key: str, policy: RatePolicy, cost: float = 1) -> RateLimitResult:
+        """消耗一个令牌；后端异常时放行（限流不应成为可用性的单点）"""
+        if not Config.RATE_LIMIT_ENABLED:
+            return RateLimitResult(True, policy.capacity, 0)
+        try:
+            result = self.store.hit(key, policy, cost)
+        except Exception as e:
+            print(f"⚠️ 频率限制检查失败，已放行: {str(e)}")
+            return RateLimitResult(True, policy.capacity, 0)
+        if not result.allowed:
+            metrics.inc('rate_limit_rejected_total')
+        return result
+
+    def check(self, policy_name: str, identity: str) -> RateLimitResult:
+        """按策略名检查，identity 形如 user:1 或 ip:1.2.3.4"""
+        return self.hit(f'{policy_name}:{identity}', POLICIES[policy_name])
+
+    def peek(self, policy_name: str, identity: str) -> RateLimitResult:
+        """只查看是否还有令牌，不消耗（用于只对失败请求计数的策略）"""
+        policy = POLICIES[policy_name]
+        result = self.hit(f'{policy_name}:{identity}', policy, cost=0)
+        if result.remaining >= 1:
+            return result
+        metrics.inc('rate_limit_rejected_total')
+        return RateLimitResult(False, 0, max(int(1 / policy.rate) + 1, 1))
+
+
+registry.register('rate_limiter', RateLimiter)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取当前进程的频率限制器"""
+    return registry.get('rate_limiter')
+
+
+# ==================== 装饰器 ====================
+
+def client_ip() -> str:
+    """
+    客户端IP
+
+    X-Forwarded-For 的第一个地址由客户端任意填写，不能用于限流；经过反向代理时由 ProxyFix
+    （见 app.py，按 TRUSTED_PROXY_COUNT 只信任最右侧的代理跳数）把 remote_addr 还原为真实地址。
+    """
+    return request.remote_addr or 'unknown'
+
+
+def default_identity() -> str:
+    """已登录按用户ID计数，否则按客户端IP"""
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception:
+        user_id = None
+    return f'user:{user_id}' if user_id else f'ip:{client_ip()}'
+
+
+def too_many_requests(result: RateLimitResult):
+    """429响应"""
+    response = jsonify({'error': '请求过于频繁，请稍后再试', 'retry_after': result.retry_after})
+    response.headers['Retry-After'] = str(result.retry_after)
+    response.headers['X-RateLimit-Remaining'] = '0'
+    return response, 429
+
+
+def rate_limit(policy_name: str, identity: Callable[[], str] = default_identity):
+    """
+    接口频率限制装饰器
+
+    Args:
+        policy_name: POLICIES 中的策略名
+        identity: 计数主体，默认已登录按用户、未登录按IP
+    """
+    if policy_name not in POLICIES:
+        raise KeyError(f'未定义的限流策略: {policy_name}')
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            result = get_rate_limiter().check(policy_name, identity())
+            if not result.allowed:
+                return too_many_requests(result)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
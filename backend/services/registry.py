@@ -0,0 +1,83 @@
+"""
+服务注册表
+进程级、线程安全的服务单例容器，每个工作进程只构建一次服务实例
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict
+
+
+class ServiceRegistry:
+    """服务注册表类"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()  # 只保护字典读写，不在持有时调用工厂
+        self._build_locks: Dict[str, threading.Lock] = {}  # 每个服务一把构建锁
+        self._pid = os.getpid()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """
+        注册服务工厂（惰性构建，首次获取时才实例化）
+
+        Args:
+            name: 服务名称
+            factory: 无参工厂函数
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """
+        获取服务实例
+
+        实例在首次调用时构建；若检测到进程已fork（如gunicorn预加载后派生worker），
+        丢弃从父进程继承的实例并在当前进程内重新构建。
+        """
+        self._check_fork()
+
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        # 工厂内可能再获取其他服务（如 ai_service 依赖 procrastination_analyzer），
+        # 因此只持有该服务自己的构建锁，不同服务的构建互不阻塞
+        with self._lock:
+            build_lock = self._build_locks.setdefault(name, threading.Lock())
+
+        with build_lock:
+            # 双重检查，避免并发请求重复构建
+            instance = self._instances.get(name)
+            if instance is None:
+                with self._lock:
+                    factory = self._factories.get(name)
+                if factory is None:
+                    raise KeyError(f"未注册的服务: {name}")
+                instance = factory()
+                with self._lock:
+                    self._instances[name] = instance
+            return instance
+
+    def reset(self, name: str = None):
+        """丢弃已构建的实例（配置变更或测试时使用）"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+    def _check_fork(self):
+        """进程号变化说明发生了fork，重建锁并清空继承的实例"""
+        pid = os.getpid()
+        if pid != self._pid:
+            self._lock = threading.Lock()
+            self._build_locks = {}
+            self._instances = {}
+            self._pid = pid
+
+
+# 全局服务注册表实例
+registry = ServiceRegistry()
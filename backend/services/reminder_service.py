@@ -0,0 +1,188 @@
+"""
+定时提醒服务
+晚间提醒的收件人（用户ID、未完成任务数、设备token、平台）由一条关联查询流式读出，
+按通知内容分组后写入推送发件箱，内存中只保留一个分块的token。
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, date, time, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from config import Config
+from models import db
+from models.user import User
+from models.task import Task, TaskStatus
+from models.push_token import UserPushToken, PlatformType
+from services.notification_outbox import notification_outbox, channel_for
+
+RECIPIENTS_YIELD_PER = 5000  # 每次从游标读取的行数
+FANOUT_CHUNK_TOKENS = 20000  # 累计到这么多token就写入一次发件箱
+
+OPEN_STATUSES = (TaskStatus.PENDING, TaskStatus.IN_PROGRESS)
+
+DEFAULT_TIMEZONE = 'Asia/Shanghai'  # 与 User.timezone 的默认值一致；为空或无法识别的时区按此处理
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+
+def timezone_offset_minutes(tz_name: Optional[str], at: datetime) -> Optional[int]:
+    """时区在指定UTC时刻相对UTC的偏移分钟数（无法识别时返回None）"""
+    if not tz_name or ZoneInfo is None:
+        return None
+    try:
+        offset = at.replace(tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo(tz_name)).utcoffset()
+    except Exception:
+        return None
+    return int(offset.total_seconds() // 60) if offset is not None else None
+
+
+@dataclass
+class TimezoneBucket:
+    """当前UTC偏移相同的一组时区（None 表示时区为空的用户）"""
+    offset_minutes: int
+    timezones: List[Optional[str]] = field(default_factory=list)
+
+    @property
+    def label(self) -> str:
+        sign = '+' if self.offset_minutes >= 0 else '-'
+        hours, minutes = divmod(abs(self.offset_minutes), 60)
+        return f'UTC{sign}{hours:02d}:{minutes:02d}'
+
+    def local_now(self, now: datetime) -> datetime:
+        """UTC时刻对应的分片本地时间"""
+        return now + timedelta(minutes=self.offset_minutes)
+
+    def utc_day_range(self, local_day: date) -> Tuple[datetime, datetime]:
+        """分片本地某一天对应的UTC起止时间（左闭右开）"""
+        start = datetime.combine(local_day, time.min) - timedelta(minutes=self.offset_minutes)
+        return start, start + timedelta(days=1)
+
+
+class ReminderService:
+    """定时提醒服务类"""
+
+    @staticmethod
+    def user_timezones() -> List[Optional[str]]:
+        """活跃用户使用的所有时区（走 timezone 索引）"""
+        return [row[0] for row in db.session.query(User.timezone).filter(User.is_active == True).distinct()]
+
+    @staticmethod
+    def timezone_buckets(timezones: List[Optional[str]], now: datetime = None) -> List[TimezoneBucket]:
+        """按当前UTC偏移给时区分片；偏移随夏令时变化，需在每次调度时重新计算"""
+        now = now or datetime.utcnow()
+        default_offset = timezone_offset_minutes(DEFAULT_TIMEZONE, now) or 0
+        buckets: Dict[int, TimezoneBucket] = {}
+        for tz_name in timezones:
+            offset = timezone_offset_minutes(tz_name, now)
+            if offset is None:
+                offset = default_offset
+            buckets.setdefault(offset, TimezoneBucket(offset)).timezones.append(tz_name)
+        return [buckets[offset] for offset in sorted(buckets)]
+
+    @staticmethod
+    def timezone_filter(timezones: List[Optional[str]]):
+        """只包含指定时区用户的过滤条件（None 匹配时区为空的用户）"""
+        names = [tz_name for tz_name in timezones if tz_name]
+        condition = User.timezone.in_(names)
+        if len(names) < len(timezones):
+            condition = db.or_(condition, User.timezone.is_(None))
+        return condition
+
+    @staticmethod
+    def evening_recipients(day_start: datetime, day_end: datetime,
+                           timezones: Optional[List[str]] = None) -> Iterator[Tuple[int, int, str, PlatformType]]:
+        """
+        流式读取晚间提醒收件人
+
+        Args:
+            day_start, day_end: 当天的起止时间（UTC，左闭右开），按范围过滤以使用 created_at 索引
+            timezones: 只包含这些时区的用户（None 表示全部）
+
+        Yields:
+            (user_id, 未完成任务数, token, 平台)，同一用户的行相邻
+        """
+        open_tasks = db.session.query(
+            Task.user_id,
+            func.count(Task.id).label('task_count')
+        ).filter(
+            Task.status.in_(OPEN_STATUSES),
+            Task.created_at >= day_start,
+            Task.created_at < day_end
+        ).group_by(Task.user_id).subquery()
+
+        query = db.session.query(
+            open_tasks.c.user_id,
+            open_tasks.c.task_count,
+            UserPushToken.token,
+            UserPushToken.platform
+        ).join(
+            User, User.id == open_tasks.c.user_id
+        ).join(
+            UserPushToken, UserPushToken.user_id == open_tasks.c.user_id
+        ).filter(
+            User.is_active == True,
+            UserPushToken.is_active == True,
+            UserPushToken.enable_evening_reminder == True
+        )
+        if timezones is not None:
+            query = query.filter(ReminderService.timezone_filter(timezones))
+
+        return iter(query.order_by(open_tasks.c.user_id).yield_per(RECIPIENTS_YIELD_PER))
+
+    def send_evening_reminders(self, recipients: Iterable[Tuple[int, int, str, PlatformType]]) -> Dict:
+        """
+        晚间提醒写入发件箱：相同未完成任务数的用户共用同一条通知内容，合并为多播批次
+
+        读取游标期间只写入不提交，全部入队后一次提交，由发件箱worker发送、重试并停用失效token。
+
+        Returns:
+            dict: 用户数、token数、写入的发件箱行数
+        """
+        template = Config.get_notification_template('evening_reminder')
+        summary = {'users': 0, 'tokens': 0, 'queued': 0}
+
+        by_channel: Dict[Tuple[str, int], List[str]] = defaultdict(list)  # (通道, 未完成任务数) -> token
+        pending = 0
+        last_user = None
+
+        for user_id, task_count, token, platform in recipients:
+            if platform not in (PlatformType.ANDROID, PlatformType.IOS):
+                continue
+            if user_id != last_user:
+                summary['users'] += 1
+                last_user = user_id
+            summary['tokens'] += 1
+
+            by_channel[(channel_for(platform), task_count)].append(token)
+            pending += 1
+            if pending >= FANOUT_CHUNK_TOKENS:
+                summary['queued'] += self._enqueue(template, by_channel)
+                pending = 0
+
+        summary['queued'] += self._enqueue(template, by_channel)
+        db.session.commit()
+        notification_outbox.wake()
+        return summary
+
+    @staticmethod
+    def _enqueue(template: Dict, by_channel: Dict[Tuple[str, int], List[str]]) -> int:
+        """把当前分块写入发件箱并清空"""
+        queued = 0
+        for (channel, task_count), tokens in by_channel.items():
+            queued += notification_outbox.enqueue_tokens(
+                'evening_reminder', channel, template['title'],
+                template['body_template'].format(task_count=task_count), tokens,
+                {'type': 'evening_reminder', 'task_count': str(task_count)}
+            )
+        by_channel.clear()
+        return queued
+
+
+# 全局定时提醒服务实例
+reminder_service = ReminderService()
@@ -0,0 +1,291 @@
+"""
+番茄钟会话清理器
+客户端中途消失时会话会一直停留在未完成状态。清理器在内存中维护一个按截止时间排序的小顶堆
+（启动时从数据库载入，之后由开始/暂停/恢复接口登记），到期后按批量UPDATE自动结束超时会话、
+标记暂停过久的会话为已过期，不再逐行检查。
+"""
+
+import heapq
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from config import Config
+from models import db
+from models.dashboard import UserDashboard
+from models.pomodoro import PomodoroSession
+from services.pomodoro_state import active_sessions, record_completed_session
+from services.bootstrap_service import bootstrap_service
+
+KIND_RUNNING = 'run'  # 截止时间 = 开始时间 + 计划时长 + 宽限期，到期自动完成
+KIND_PAUSED = 'pause'  # 截止时间 = 暂停时间 + 暂停保留时长，到期标记过期
+UPDATE_BATCH_SIZE = 500  # 单条UPDATE的 IN 列表上限
+
+
+class SessionSweeper:
+    """会话清理器类"""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.running = False
+        self.sweeper_thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._heap = []  # (截止时间, 类型, 会话ID, 计划时长)
+        self._deadlines = {}  # 会话ID -> (截止时间, 类型)，用于惰性删除堆中的过时条目
+        self._last_seed = None  # None 表示尚未载入，下一轮必定重建索引
+
+    def init_app(self, app):
+        """初始化应用"""
+        self.app = app
+
+    @property
+    def grace(self) -> timedelta:
+        return timedelta(minutes=Config.SESSION_GRACE_MINUTES)
+
+    @property
+    def paused_ttl(self) -> timedelta:
+        return timedelta(minutes=Config.PAUSED_SESSION_TTL_MINUTES)
+
+    # ==================== 时间索引 ====================
+
+    def _deadline_for(self, start_time, planned_duration, is_paused, pause_time):
+        if is_paused:
+            if not pause_time:
+                return None, None
+            return pause_time + self.paused_ttl, KIND_PAUSED
+        return start_time + timedelta(minutes=planned_duration or 0) + self.grace, KIND_RUNNING
+
+    def _push(self, session_id, deadline, kind, planned_duration):
+        self._deadlines[session_id] = (deadline, kind)
+        heapq.heappush(self._heap, (deadline, kind, session_id, planned_duration))
+
+    def track(self, session_data: Optional[Dict]):
+        """登记（或更新）会话的截止时间；已完成或已过期的会话从索引中移除"""
+        if not self.running or not session_data:
+            return
+
+        session_id = session_data['id']
+        with self._lock:
+            if session_data.get('is_completed') or session_data.get('is_expired'):
+                self._deadlines.pop(session_id, None)
+                return
+
+            pause_time = session_data.get('pause_time')
+            deadline, kind = self._deadline_for(
+                datetime.fromisoformat(session_data['start_time']),
+                session_data['planned_duration'],
+                session_data.get('is_paused'),
+                datetime.fromisoformat(pause_time) if pause_time else None
+            )
+            if deadline is not None:
+                self._push(session_id, deadline, kind, session_data['planned_duration'])
+
+    def seed(self, chunk_size=1000):
+        """
+        从数据库重建时间索引（启动时及定期执行，兼顾其他进程创建的会话）
+
+        Returns:
+            int: 索引中的会话数
+        """
+        stmt = db.select(
+            PomodoroSession.id,
+            PomodoroSession.start_time,
+            PomodoroSession.planned_duration,
+            PomodoroSession.is_paused,
+            PomodoroSession.pause_time
+        ).where(
+            PomodoroSession.is_completed == False,
+            PomodoroSession.is_expired == False
+        )
+
+        heap, deadlines = [], {}
+        result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            for session_id, start_time, planned, is_paused, pause_time in rows:
+                deadline, kind = self._deadline_for(start_time, planned, is_paused, pause_time)
+                if deadline is not None:
+                    deadlines[session_id] = (deadline, kind)
+                    heap.append((deadline, kind, session_id, planned))
+        db.session.commit()
+
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap, self._deadlines = heap, deadlines
+        self._last_seed = time.monotonic()
+        return len(deadlines)
+
+    def _pop_due(self, now: datetime):
+        """弹出所有已到期的条目，按类型分组（跳过已被更新或移除的过时条目）"""
+        running, paused = defaultdict(list), []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, kind, session_id, planned = heapq.heappop(self._heap)
+                if self._deadlines.get(session_id) != (deadline, kind):
+                    continue
+                del self._deadlines[session_id]
+                if kind == KIND_RUNNING:
+                    running[planned].append(session_id)
+                else:
+                    paused.append(session_id)
+        return running, paused
+
+    # ==================== 批量清理 ====================
+
+    def sweep(self, now: datetime = None) -> Dict[str, int]:
+        """
+        处理所有到期会话（需在应用上下文中调用）
+
+        UPDATE 条件中重新校验会话状态和截止时间，索引中的过时条目或其他进程已处理的会话不会被误改。
+
+        Returns:
+            dict: {'completed': 自动完成数, 'expired': 标记过期数}
+        """
+        now = now or datetime.utcnow()
+        running, paused = self._pop_due(now)
+        if not running and not paused:
+            return {'completed': 0, 'expired': 0}
+
+        try:
+            completed = []
+            for planned, session_ids in running.items():
+                for ids in _chunks(session_ids):
+                    completed.extend(self._complete_overdue(ids, planned, now))
+
+            expired_users = []
+            for ids in _chunks(paused):
+                expired_users.extend(self._expire_paused(ids, now))
+
+            for user_id, session_type, start_time, minutes in completed:
+                record_completed_session(user_id, session_type, start_time, minutes)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self._last_seed = None  # 弹出的条目已丢失，下一轮重新载入
+            raise
+
+        completed_users = {row[0] for row in completed}
+        for user_id in completed_users | set(expired_users):
+            active_sessions.invalidate(user_id)
+        for user_id in completed_users:
+            bootstrap_service.invalidate(user_id, 'pomodoro_stats')
+
+        return {'completed': len(completed), 'expired': len(expired_users)}
+
+    def _complete_overdue(self, ids: List[int], planned: int, now: datetime):
+        """同一计划时长的超时会话一条UPDATE自动完成，实际时长记为计划时长"""
+        conditions = [
+            PomodoroSession.id.in_(ids),
+            PomodoroSession.is_completed == False,
+            PomodoroSession.is_paused == False,
+            PomodoroSession.is_expired == False,
+            PomodoroSession.start_time <= now - timedelta(minutes=planned or 0) - self.grace
+        ]
+        columns = (PomodoroSession.user_id, PomodoroSession.session_type, PomodoroSession.start_time)
+        values = dict(is_completed=True, end_time=now, actual_duration=planned)
+
+        # 批量完成前回填还没有仪表盘的用户，否则首次回填已包含本批会话，之后逐条累加会重复计数
+        UserDashboard.backfill(db.session.execute(
+            db.select(PomodoroSession.user_id).where(*conditions, PomodoroSession.session_type == 'work').distinct()
+        ).scalars())
+
+        if _supports_returning():
+            stmt = db.update(PomodoroSession).where(*conditions).values(**values).returning(*columns)
+            rows = db.session.execute(stmt.execution_options(synchronize_session=False)).all()
+        else:
+            # 不支持 RETURNING 的数据库：先锁定命中的行，再按主键更新
+            rows = db.session.execute(
+                db.select(PomodoroSession.id, *columns).where(*conditions).with_for_update()
+            ).all()
+            if rows:
+                db.session.execute(
+                    db.update(PomodoroSession).where(
+                        PomodoroSession.id.in_([row[0] for row in rows])
+                    ).values(**values).execution_options(synchronize_session=False)
+                )
+            rows = [row[1:] for row in rows]
+
+        return [(user_id, session_type, start_time, planned) for user_id, session_type, start_time in rows]
+
+    def _expire_paused(self, ids: List[int], now: datetime):
+        """暂停超过保留时长的会话一条UPDATE标记为过期（不计入统计）"""
+        conditions = [
+            PomodoroSession.id.in_(ids),
+            PomodoroSession.is_completed == False,
+            PomodoroSession.is_paused == True,
+            PomodoroSession.is_expired == False,
+            PomodoroSession.pause_time <= now - self.paused_ttl
+        ]
+        stmt = db.update(PomodoroSession).where(*conditions).values(is_expired=True, end_time=now)
+
+        if _supports_returning():
+            result = db.session.execute(
+                stmt.returning(PomodoroSession.user_id).execution_options(synchronize_session=False)
+            )
+            return list(result.scalars())
+
+        users = db.session.execute(
+            db.select(PomodoroSession.user_id).where(*conditions).with_for_update()
+        ).scalars().all()
+        db.session.execute(stmt.execution_options(synchronize_session=False))
+        return list(users)
+
+    # ==================== 后台线程 ====================
+
+    def start(self):
+        """启动清理器"""
+        if self.running:
+            return
+
+        self.running = True
+        self._stop_event.clear()
+        self.sweeper_thread = threading.Thread(target=self._run_sweeper, daemon=True)
+        self.sweeper_thread.start()
+
+        print("会话清理器已启动")
+
+    def stop(self):
+        """停止清理器"""
+        self.running = False
+        self._stop_event.set()
+        print("会话清理器已停止")
+
+    def _run_sweeper(self):
+        """运行清理器的内部方法"""
+        while self.running:
+            with self.app.app_context():
+                try:
+                    if self._last_seed is None or time.monotonic() - self._last_seed >= Config.SESSION_RESEED_INTERVAL:
+                        self.seed()
+                    result = self.sweep()
+                    if result['completed'] or result['expired']:
+                        print(f"会话清理完成: 自动完成 {result['completed']} 个，过期 {result['expired']} 个")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"会话清理失败: {str(e)}")
+                finally:
+                    db.session.remove()
+            self._stop_event.wait(Config.SESSION_SWEEP_INTERVAL)
+
+
+def _supports_returning() -> bool:
+    return getattr(db.session.get_bind().dialect, 'update_returning', False)
+
+
+def _chunks(items: List[int]):
+    for i in range(0, len(items), UPDATE_BATCH_SIZE):
+        yield items[i:i + UPDATE_BATCH_SIZE]
+
+
+# 全局会话清理器实例
+session_sweeper = SessionSweeper()
+
+
+def init_session_sweeper(app):
+    """初始化会话清理器"""
+    session_sweeper.init_app(app)
+    session_sweeper.start()
+    return session_sweeper
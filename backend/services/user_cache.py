@@ -0,0 +1,171 @@
+"""
+用户快照缓存
+JWT身份 → 精简用户快照（是否启用、会员到期、主题、时区、语言），先查请求级缓存，再查短TTL共享缓存，
+都未命中才查库（只取快照所需的列）。User行提交变更后自动失效。
+访问令牌中另外携带会员与启用状态声明，只需判断权限的接口无需任何用户查询。
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from config import Config
+from models import db
+from models.user import User
+from services.cache_backend import get_cache
+
+SNAPSHOT_COLUMNS = (
+    'id', 'username', 'is_active', 'is_premium', 'premium_expires_at',
+    'theme_preference', 'timezone', 'language', 'created_at'
+)
+
+# 这些列的变化不影响快照与资料展示，不触发失效
+_IGNORED_COLUMNS = {'last_login_at', 'updated_at'}
+
+
+class UserSnapshot:
+    """精简用户快照（只读）"""
+
+    __slots__ = SNAPSHOT_COLUMNS
+
+    def __init__(self, **fields):
+        for name in SNAPSHOT_COLUMNS:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'UserSnapshot':
+        data = dict(data)
+        for name in ('premium_expires_at', 'created_at'):
+            if data.get(name):
+                data[name] = datetime.fromisoformat(data[name])
+        return cls(**data)
+
+    def to_dict(self) -> Dict:
+        data = {name: getattr(self, name) for name in SNAPSHOT_COLUMNS}
+        for name in ('premium_expires_at', 'created_at'):
+            if data[name]:
+                data[name] = data[name].isoformat()
+        return data
+
+    def is_premium_active(self) -> bool:
+        """检查付费会员是否有效（与 User.is_premium_active 一致）"""
+        if not self.is_premium:
+            return False
+        if self.premium_expires_at and self.premium_expires_at < datetime.utcnow():
+            return False
+        return True
+
+
+class UserCache:
+    """用户快照缓存类"""
+
+    @staticmethod
+    def _key(user_id) -> str:
+        return f'user:snapshot:{user_id}'
+
+    def get(self, user_id) -> Optional[UserSnapshot]:
+        """获取用户快照（用户不存在时返回None）"""
+        if user_id is None:
+            return None
+        user_id = int(user_id)
+
+        local = g.setdefault('user_snapshots', {}) if has_request_context() else {}
+        if user_id in local:
+            return local[user_id]
+
+        cache = get_cache()
+        data = cache.get(self._key(user_id))
+        if data is None:
+            row = db.session.execute(
+                db.select(*[getattr(User, name) for name in SNAPSHOT_COLUMNS]).where(User.id == user_id)
+            ).first()
+            if row is None:
+                local[user_id] = None
+                return None
+            snapshot = UserSnapshot(**row._asdict())
+            cache.set(self._key(user_id), snapshot.to_dict(), Config.USER_SNAPSHOT_TTL)
+        else:
+            snapshot = UserSnapshot.from_dict(data)
+
+        local[user_id] = snapshot
+        return snapshot
+
+    def invalidate(self, *user_ids):
+        """用户资料、密码或会员状态变更提交后调用"""
+        if not user_ids:
+            return
+        get_cache().delete(*[self._key(int(user_id)) for user_id in user_ids])
+        if has_request_context() and 'user_snapshots' in g:
+            for user_id in user_ids:
+                g.user_snapshots.pop(int(user_id), None)
+
+
+# 全局用户快照缓存实例
+user_cache = UserCache()
+
+
+# ==================== 令牌声明 ====================
+
+def user_claims(user) -> Dict:
+    """写入访问令牌的权限声明（User 或 UserSnapshot）"""
+    premium_until = None
+    if user.is_premium_active():
+        # 无到期时间的会员用令牌有效期兜底
+        expires_at = user.premium_expires_at or datetime.utcnow() + Config.JWT_ACCESS_TOKEN_EXPIRES
+        premium_until = int(expires_at.replace(tzinfo=timezone.utc).timestamp())
+    return {'active': bool(user.is_active), 'premium_until': premium_until}
+
+
+def premium_from_claims(user_id) -> bool:
+    """
+    从当前请求的访问令牌判断会员是否有效
+
+    旧令牌没有声明时回退到用户快照；会员状态的变更在令牌刷新后生效（最长一个令牌有效期）。
+    """
+    claims = get_jwt()
+    if 'premium_until' not in claims:
+        snapshot = user_cache.get(user_id)
+        return bool(snapshot and snapshot.is_premium_active())
+    premium_until = claims['premium_until']
+    return premium_until is not None and premium_until > datetime.now(timezone.utc).timestamp()
+
+
+# ==================== 自动失效 ====================
+
+@event.listens_for(User, 'after_update')
+def _mark_user_changed(mapper, connection, target):
+    """快照或资料相关的列变化时记录用户ID，事务提交后再使缓存失效"""
+    state = inspect(target)
+    changed = any(
+        state.attrs[attr.key].history.has_changes()
+        for attr in mapper.column_attrs if attr.key not in _IGNORED_COLUMNS
+    )
+    session = object_session(target)
+    if changed and session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(User, 'after_delete')
+def _mark_user_deleted(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    user_ids = session.info.pop('changed_user_ids', None)
+    if user_ids:
+        from services.bootstrap_service import bootstrap_service
+        user_cache.invalidate(*user_ids)
+        for user_id in user_ids:
+            bootstrap_service.invalidate(user_id, 'profile')
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('changed_user_ids', None)